@@ -0,0 +1,331 @@
+"""Replay call/SMS events through both screeners and report decision latency
+
+Events come from a JSONL file of {"type": "call" | "sms", "number": ...,
+"message": ...} records, or are generated synthetically. Results are printed
+as a summary and can be written as JSON so runs can be compared between
+releases:
+
+    python benchmark.py --events 50000 --blocklist-size 100000 --output bench.json
+    python benchmark.py --replay events.jsonl --output bench.json
+"""
+import argparse
+import json
+import os
+import platform as host_platform
+import random
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Keep Kivy from parsing our command line or logging to the console
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+
+from call_screener import CallScreener
+from sms_screener import SMSScreener
+
+SPAM_WORDS = ['win', 'cash', 'free', 'urgent', 'verify', 'offer', 'click here', 'bitcoin', 'prize']
+PERCENTILES = (50, 95, 99)
+
+
+def random_number(rng):
+    return f'+1{rng.randint(2, 9)}{rng.randint(0, 99):02d}{rng.randint(2, 9)}{rng.randint(0, 999999):06d}'
+
+
+def random_word(rng, low=3, high=9):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def random_message(rng, length, vocabulary, spam_ratio):
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(SPAM_WORDS) if rng.random() < spam_ratio else rng.choice(vocabulary)
+        words.append(word)
+        size += len(word) + 1
+    return ' '.join(words)[:length]
+
+
+def generate_events(rng, count, blocklist, sms_ratio=0.5, blocked_ratio=0.1,
+                    message_length=120, spam_ratio=0.02, senders=5000):
+    """Build a synthetic event stream with repeat senders and some blocked numbers"""
+    vocabulary = [random_word(rng) for _ in range(2000)]
+    pool = [random_number(rng) for _ in range(senders)]
+    blocked = list(blocklist[:10000])
+    events = []
+    for _ in range(count):
+        if blocked and rng.random() < blocked_ratio:
+            number = rng.choice(blocked)
+        else:
+            number = rng.choice(pool)
+        if rng.random() < sms_ratio:
+            message = random_message(rng, message_length, vocabulary, spam_ratio)
+            events.append({'type': 'sms', 'number': number, 'message': message})
+        else:
+            events.append({'type': 'call', 'number': number})
+    return events
+
+
+def load_events(path):
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_events(events, path):
+    with open(path, 'w') as f:
+        for event in events:
+            f.write(json.dumps(event) + '\n')
+
+
+class StageTimer:
+    """Collects per-stage latency samples by wrapping screener methods"""
+
+    def __init__(self):
+        self.samples = {}
+
+    def record(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, func, stage):
+        record = self.record
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(stage, clock() - start)
+        return timed
+
+
+class _TimedSet:
+    """Proxy that times membership tests on a number set"""
+
+    def __init__(self, numbers, timer, stage):
+        self._numbers = numbers
+        self._contains = timer.wrap(numbers.__contains__, stage)
+
+    def __contains__(self, number):
+        return self._contains(number)
+
+    def __getattr__(self, name):
+        return getattr(self._numbers, name)
+
+    def __iter__(self):
+        return iter(self._numbers)
+
+    def __len__(self):
+        return len(self._numbers)
+
+
+def instrument(screener, timer, prefix):
+    """Swap a screener's stage methods for timed wrappers"""
+    screener.show_notification = lambda message, reason=None: None
+    screener.normalize = timer.wrap(screener.normalize, f'{prefix}.normalize')
+    screener.whitelist = _TimedSet(screener.whitelist, timer, f'{prefix}.whitelist')
+    screener.is_blocked_number = timer.wrap(screener.is_blocked_number, f'{prefix}.blocklist')
+    screener.is_contact = timer.wrap(screener.is_contact, f'{prefix}.contacts')
+    if isinstance(screener, CallScreener):
+        screener.rule_matcher.match = timer.wrap(screener.rule_matcher.match, f'{prefix}.rules')
+    else:
+        screener.is_quiet_hours = timer.wrap(screener.is_quiet_hours, f'{prefix}.quiet_hours')
+        screener.check_message_frequency = timer.wrap(
+            screener.check_message_frequency, f'{prefix}.frequency'
+        )
+        screener.is_spam_content = timer.wrap(screener.is_spam_content, f'{prefix}.content')
+
+
+def build_screeners(rng, args):
+    """Create both screeners in the current directory with synthetic settings"""
+    blocklist = [random_number(rng) for _ in range(args.blocklist_size)]
+    call_screener = CallScreener(database=args.database)
+    sms_screener = SMSScreener(database=args.database)
+
+    for screener in (call_screener, sms_screener):
+        screener.verdict_cache.maxsize = args.verdict_cache_size
+        screener.add_blocked_numbers(blocklist)
+        screener.is_active = True
+        screener.block_non_contacts = args.block_non_contacts
+
+    # Compile once instead of after every add_rule
+    for _ in range(args.rules):
+        if rng.random() < 0.8:
+            call_screener.rules.append({'type': 'prefix', 'value': str(rng.randint(200, 999999))})
+        else:
+            call_screener.rules.append({'type': 'pattern', 'value': str(rng.randint(1000, 9999))})
+    call_screener.rule_matcher.compile(call_screener.rules)
+
+    for _ in range(args.keywords):
+        sms_screener.add_keyword_filter(random_word(rng, 6, 12))
+
+    sms_screener.quiet_schedule.enabled = args.quiet_hours
+    sms_screener.frequency_limits['enabled'] = args.frequency_limits
+    return call_screener, sms_screener, blocklist
+
+
+def replay(events, call_screener, sms_screener, timer):
+    """Run every event through its screener, timing each decision"""
+    clock = time.perf_counter
+    blocked = 0
+    start = clock()
+    for event in events:
+        began = clock()
+        if event['type'] == 'call':
+            result = call_screener.handle_incoming_call(event['number'])
+            timer.record('call.total', clock() - began)
+        else:
+            result = sms_screener.handle_incoming_sms(event['number'], event.get('message', ''))
+            timer.record('sms.total', clock() - began)
+        blocked += bool(result)
+    return clock() - start, blocked
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = max(0, int(round(pct / 100 * len(sorted_samples))) - 1)
+    return sorted_samples[min(index, len(sorted_samples) - 1)]
+
+
+def summarize(timer):
+    stages = {}
+    for stage, samples in sorted(timer.samples.items()):
+        samples = sorted(samples)
+        stats = {'count': len(samples), 'mean_us': sum(samples) / len(samples) * 1e6}
+        for pct in PERCENTILES:
+            stats[f'p{pct}_us'] = percentile(samples, pct) * 1e6
+        stages[stage] = stats
+    return stages
+
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    if args.trace_memory:
+        tracemalloc.start()
+
+    setup_started = time.perf_counter()
+    call_screener, sms_screener, blocklist = build_screeners(rng, args)
+    setup_seconds = time.perf_counter() - setup_started
+
+    if args.replay:
+        events = load_events(args.replay)
+    else:
+        events = generate_events(
+            rng, args.events, blocklist,
+            sms_ratio=args.sms_ratio, blocked_ratio=args.blocked_ratio,
+            message_length=args.message_length
+        )
+    if args.write_events:
+        write_events(events, args.write_events)
+
+    timer = StageTimer()
+    instrument(call_screener, timer, 'call')
+    instrument(sms_screener, timer, 'sms')
+    elapsed, blocked = replay(events, call_screener, sms_screener, timer)
+
+    result = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'machine': host_platform.machine(),
+        'parameters': {
+            'events': len(events),
+            'blocklist_size': args.blocklist_size,
+            'rules': args.rules,
+            'keywords': args.keywords,
+            'message_length': args.message_length,
+            'database': bool(args.database),
+            'verdict_cache_size': args.verdict_cache_size,
+            'seed': args.seed,
+        },
+        'setup_seconds': setup_seconds,
+        'elapsed_seconds': elapsed,
+        'throughput_per_second': len(events) / elapsed if elapsed else 0.0,
+        'blocked': blocked,
+        'stages': summarize(timer),
+        'verdict_cache_hit_rate': {
+            'call': call_screener.verdict_cache.hit_rate(),
+            'sms': sms_screener.verdict_cache.hit_rate(),
+        },
+        'peak_rss_kb': peak_rss_kb(),
+    }
+    if args.trace_memory:
+        result['peak_traced_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    return result
+
+
+def print_summary(result):
+    print(f"{result['parameters']['events']} events in {result['elapsed_seconds']:.3f}s "
+          f"({result['throughput_per_second']:.0f}/s), {result['blocked']} blocked, "
+          f"setup {result['setup_seconds']:.2f}s")
+    print(f"{'stage':<20}{'count':>9}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}  (us)")
+    for stage, stats in result['stages'].items():
+        print(f"{stage:<20}{stats['count']:>9}{stats['mean_us']:>10.1f}{stats['p50_us']:>10.1f}"
+              f"{stats['p95_us']:>10.1f}{stats['p99_us']:>10.1f}")
+    hit_rates = result['verdict_cache_hit_rate']
+    print(f"verdict cache hit rate: calls {hit_rates['call']:.1%}, sms {hit_rates['sms']:.1%}")
+    if result.get('peak_rss_kb'):
+        print(f"peak RSS {result['peak_rss_kb']} KB")
+    if 'peak_traced_kb' in result:
+        print(f"peak traced Python memory {result['peak_traced_kb']} KB")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the call and SMS screening engines")
+    parser.add_argument('--replay', help="JSONL file of events to replay instead of generating them")
+    parser.add_argument('--write-events', help="Save the replayed events as JSONL")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--blocklist-size', type=int, default=10000)
+    parser.add_argument('--rules', type=int, default=100)
+    parser.add_argument('--keywords', type=int, default=100)
+    parser.add_argument('--message-length', type=int, default=120)
+    parser.add_argument('--sms-ratio', type=float, default=0.5)
+    parser.add_argument('--blocked-ratio', type=float, default=0.1)
+    parser.add_argument('--database', action='store_true', help="Use the SQLite number store")
+    parser.add_argument('--verdict-cache-size', type=int, default=4096, help="0 disables the verdict cache")
+    parser.add_argument('--block-non-contacts', action='store_true')
+    parser.add_argument('--quiet-hours', action='store_true')
+    parser.add_argument('--frequency-limits', action='store_true')
+    parser.add_argument('--trace-memory', action='store_true', help="Track peak Python allocations (slower)")
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    for attr in ('replay', 'write_events', 'output'):
+        if getattr(args, attr):
+            setattr(args, attr, os.path.abspath(getattr(args, attr)))
+
+    # The screeners keep their settings in the working directory
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            args.database = os.path.join(workdir, 'numbers.db') if args.database else None
+            result = run(args)
+        finally:
+            os.chdir(original_dir)
+
+    print_summary(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+from itertools import chain
+import json
+import os
+
+from bulk_import import update_numbers
+from number_store import members
+from packed_blocklist import PackedBlocklist
+
+
+class BlocklistMixin:
+    """Blocked-number list, shared packed feeds and the Bloom filter in front
+
+    Shared by CallScreener and SMSScreener. The screener provides
+    blocked_numbers and whitelist (sets or SQLiteNumberSet), a
+    shared_blocklists dict, a number_filter, its JournaledStore as store,
+    a blocklist_version saved with the settings, a read_only flag, and normalize(), _record(), _settings_changed() and
+    save_settings(). A read_only screener keeps its filter in memory.
+    """
+    def _snapshot_numbers(self, numbers):
+        # Database-backed lists persist themselves
+        return [] if getattr(numbers, 'persistent', False) else list(numbers)
+
+    def _record_number(self, op, key, number):
+        """Journal a blocked/whitelist change unless the list persists itself"""
+        numbers = self.blocked_numbers if key == 'blocked' else self.whitelist
+        if getattr(numbers, 'persistent', False):
+            self._settings_changed()
+            return
+        if key == 'blocked':
+            # Journaled first, so a crash in between only makes the filter look stale
+            self.blocklist_version += 1
+            self._record('set', 'blocklist_version', self.blocklist_version)
+        self._record(op, key, number)
+
+    def add_blocked_number(self, number):
+        """Add a number to the blocked list"""
+        number = self.normalize(number)
+        if number not in self.blocked_numbers:
+            self.blocked_numbers.add(number)
+            self.number_filter.add(number)
+            self._record_number('add', 'blocked', number)
+            self._check_number_filter()
+
+    def remove_blocked_number(self, number):
+        """Remove a number from the blocked list"""
+        number = self.normalize(number)
+        if number in self.blocked_numbers:
+            self.blocked_numbers.remove(number)
+            self.number_filter.removed()
+            self._record_number('discard', 'blocked', number)
+            self._check_number_filter()
+
+    def add_blocked_numbers(self, numbers, progress=None):
+        """Add many numbers to the blocked list with a single save at the end"""
+        added = update_numbers(self.blocked_numbers, numbers, self.normalize, progress=progress,
+                               on_batch=self._add_to_number_filter)
+        self._settings_changed()
+        if added and not getattr(self.blocked_numbers, 'persistent', False):
+            self.blocklist_version += 1
+            self.save_settings()
+        self._check_number_filter()
+        return added
+
+    def remove_blocked_numbers(self, numbers, progress=None):
+        """Remove many numbers from the blocked list with a single save at the end"""
+        removed = update_numbers(self.blocked_numbers, numbers, self.normalize, remove=True, progress=progress)
+        self._settings_changed()
+        if removed and not getattr(self.blocked_numbers, 'persistent', False):
+            self.blocklist_version += 1
+            self.save_settings()
+        self.number_filter.removed(removed)
+        self._check_number_filter()
+        return removed
+
+    def _open_shared_blocklists(self, paths):
+        for blocklist in self.shared_blocklists.values():
+            blocklist.close()
+        self.shared_blocklists = {}
+        for path in paths:
+            try:
+                self.shared_blocklists[path] = PackedBlocklist(path)
+            except Exception as e:
+                print(f"Error opening blocklist {path}: {e}")
+
+    def attach_blocklist(self, path):
+        """Check numbers against a read-only packed blocklist file as well"""
+        if path in self.shared_blocklists:
+            return True
+        try:
+            self.shared_blocklists[path] = PackedBlocklist(path)
+        except Exception as e:
+            print(f"Error opening blocklist {path}: {e}")
+            return False
+        self._record('append', 'blocklist_files', path)
+        self.rebuild_number_filter()
+        return True
+
+    def detach_blocklist(self, path):
+        """Stop using a packed blocklist file"""
+        blocklist = self.shared_blocklists.pop(path, None)
+        if blocklist is None:
+            return False
+        blocklist.close()
+        self._record('remove', 'blocklist_files', path)
+        self.rebuild_number_filter()
+        return True
+
+    def is_blocked_number(self, number):
+        """Check a normalized number against the blocked list and shared feeds"""
+        # Most numbers are on no list; the filter rules them out without a lookup
+        if not self.number_filter.might_contain(number):
+            return False
+        if number in self.blocked_numbers:
+            return True
+        for blocklist in self.shared_blocklists.values():
+            if number in blocklist:
+                return True
+        self.number_filter.false_positive()
+        return False
+
+    def blocked_among(self, numbers):
+        """Return which of many normalized numbers are blocked, in bulk"""
+        candidates = {n for n in numbers if self.number_filter.might_contain(n)}
+        blocked = members(self.blocked_numbers, candidates)
+        for blocklist in self.shared_blocklists.values():
+            blocked.update(n for n in candidates - blocked if n in blocklist)
+        for _ in range(len(candidates) - len(blocked)):
+            self.number_filter.false_positive()
+        return blocked
+
+    def _number_filter_fingerprint(self):
+        """Identify the blocklist contents the number filter covers"""
+        version = getattr(self.blocked_numbers, 'version', None)
+        if version is None:
+            version = self.blocklist_version
+        files = [[path, os.path.getmtime(path)] for path in sorted(self.shared_blocklists)]
+        return json.dumps([version, files])
+
+    def _check_number_filter(self):
+        """Rebuild the number filter once it is overfull or holds too many removed numbers"""
+        if self.number_filter.needs_rebuild():
+            self.rebuild_number_filter()
+
+    def _add_to_number_filter(self, numbers):
+        for number in numbers:
+            self.number_filter.add(number)
+
+    def rebuild_number_filter(self):
+        """Rebuild the Bloom filter over the blocked list and shared feeds"""
+        try:
+            count = len(self.blocked_numbers) + sum(len(b) for b in self.shared_blocklists.values())
+            numbers = chain(self.blocked_numbers, *self.shared_blocklists.values())
+            self.number_filter.rebuild(numbers, count, self._number_filter_fingerprint())
+            if not self.read_only:
+                self.number_filter.save(self.number_filter.fingerprint)
+        except Exception as e:
+            print(f"Error building number filter: {e}")
+
+    def save_number_filter(self):
+        """Persist the number filter if the blocklists changed since it was saved"""
+        if self.read_only:
+            return
+        fingerprint = self._number_filter_fingerprint()
+        if self.number_filter.fingerprint != fingerprint:
+            self.number_filter.save(fingerprint)
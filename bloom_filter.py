@@ -0,0 +1,154 @@
+from hashlib import blake2b
+import math
+import os
+import struct
+
+_MAGIC = b'CSBF'
+# Magic, hash count, bit count, items added, fingerprint length
+_HEADER = struct.Struct('<4sIQQH')
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings
+
+    Sized for capacity items at the requested false-positive rate. Positions
+    come from one blake2b digest split into two 64-bit halves and combined
+    by double hashing.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hash_count)]
+
+    def add(self, item):
+        bits = self.bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self.bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def save(self, path, fingerprint=''):
+        """Write the filter, tagged with a fingerprint of its source, atomically"""
+        tag = fingerprint.encode('utf-8')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, self.hash_count, self.size, self.count, len(tag)))
+            f.write(tag)
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, error_rate=0.01):
+        """Return (filter, fingerprint) read from a file written by save"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, hash_count, size, count, tag_length = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a Bloom filter file")
+        offset = _HEADER.size
+        fingerprint = data[offset:offset + tag_length].decode('utf-8')
+        bloom = cls.__new__(cls)
+        bloom.error_rate = error_rate
+        bloom.hash_count = hash_count
+        bloom.size = size
+        bloom.capacity = max(1, int(round(size * math.log(2) ** 2 / -math.log(error_rate))))
+        bloom.count = count
+        bloom.bits = bytearray(data[offset + tag_length:])
+        return bloom, fingerprint
+
+
+class BlocklistFilter:
+    """Bloom filter front for blocked-number lookups
+
+    A negative answer proves the number is on no blocklist, so the store
+    lookup is skipped. Additions are applied in place. Removals leave stale
+    bits behind, which only cost false positives, so the filter is rebuilt
+    once they pile up or it outgrows its capacity. Without a built filter
+    every number passes through to the store.
+    """
+
+    def __init__(self, path, error_rate=0.01):
+        self.path = path
+        self.error_rate = error_rate
+        self.bloom = None
+        self.fingerprint = None
+        self._removed = 0
+        self.stats = {'checks': 0, 'filtered': 0, 'passed': 0, 'false_positives': 0}
+
+    def load(self, fingerprint):
+        """Use the saved filter if it was built from the current blocklists"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            bloom, saved = BloomFilter.load(self.path, self.error_rate)
+        except Exception as e:
+            print(f"Error loading number filter: {e}")
+            return False
+        if saved != fingerprint:
+            return False
+        self.bloom, self.fingerprint, self._removed = bloom, fingerprint, 0
+        return True
+
+    def rebuild(self, numbers, count, fingerprint):
+        """Build a fresh filter over numbers with headroom for growth"""
+        bloom = BloomFilter(max(1024, int(count * 1.25)), self.error_rate)
+        for number in numbers:
+            bloom.add(number)
+        self.bloom, self.fingerprint, self._removed = bloom, fingerprint, 0
+
+    def save(self, fingerprint):
+        if self.bloom is None:
+            return
+        try:
+            self.bloom.save(self.path, fingerprint)
+            self.fingerprint = fingerprint
+        except Exception as e:
+            print(f"Error saving number filter: {e}")
+
+    def add(self, number):
+        if self.bloom is not None:
+            self.bloom.add(number)
+
+    def removed(self, count=1):
+        self._removed += count
+
+    def needs_rebuild(self):
+        if self.bloom is None:
+            return True
+        return (self.bloom.count > self.bloom.capacity or
+                self._removed > self.bloom.capacity // 4)
+
+    def might_contain(self, number):
+        """False means the number is definitely not blocked"""
+        self.stats['checks'] += 1
+        if self.bloom is not None and number not in self.bloom:
+            self.stats['filtered'] += 1
+            return False
+        self.stats['passed'] += 1
+        return True
+
+    def false_positive(self):
+        self.stats['false_positives'] += 1
+
+    def hit_rate(self):
+        """Fraction of checks the filter answered without a store lookup"""
+        checks = self.stats['checks']
+        return self.stats['filtered'] / checks if checks else 0.0
@@ -0,0 +1,115 @@
+import csv
+import json
+import os
+
+BATCH_SIZE = 5000
+
+
+def _first_number(values):
+    """Pick the first value that looks like a phone number"""
+    for value in values:
+        if value is not None and any(char.isdigit() for char in str(value)):
+            return str(value)
+    return None
+
+
+def iter_feed_numbers(path, column=None):
+    """Stream raw numbers from a blocklist feed without loading it whole
+
+    The format follows the file extension: .csv (a column name or index, or
+    the first cell holding digits), .jsonl/.ndjson (strings, or objects with
+    a 'number' or 'phone' field) and anything else as plain text with one
+    number per line and '#' comments.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if extension == '.csv':
+            reader = csv.reader(f)
+            index = column if isinstance(column, int) else None
+            for row in reader:
+                if isinstance(column, str) and index is None:
+                    # The header row names the column to read
+                    if column not in row:
+                        raise ValueError(f"{path} has no column named {column!r}")
+                    index = row.index(column)
+                    continue
+                if index is not None:
+                    number = row[index] if index < len(row) else None
+                else:
+                    number = _first_number(row)
+                if number:
+                    yield number
+        elif extension in ('.jsonl', '.ndjson'):
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    record = record.get(column or 'number', record.get('phone'))
+                if record is not None:
+                    yield str(record)
+        else:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    yield line
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def update_numbers(numbers_set, numbers, normalize, remove=False, batch_size=BATCH_SIZE,
+                   progress=None, on_batch=None):
+    """Normalize, de-duplicate and apply numbers to a set in batches
+
+    Database-backed sets get one statement per batch and a single commit at
+    the end. progress, if given, is called as progress(processed, changed)
+    after every batch, and on_batch with each batch of normalized numbers.
+    Returns how many numbers were added or removed.
+    """
+    persistent = getattr(numbers_set, 'persistent', False)
+    processed = 0
+    changed = 0
+    for batch in _batches(numbers, batch_size):
+        processed += len(batch)
+        normalized = {normalize(number) for number in batch}
+        normalized.discard('')
+        if on_batch:
+            on_batch(normalized)
+        if persistent:
+            if remove:
+                changed += numbers_set.difference_update(normalized, commit=False)
+            else:
+                changed += numbers_set.update(normalized, commit=False)
+        else:
+            before = len(numbers_set)
+            if remove:
+                numbers_set.difference_update(normalized)
+            else:
+                numbers_set.update(normalized)
+            changed += abs(len(numbers_set) - before)
+        if progress:
+            progress(processed, changed)
+    if persistent:
+        numbers_set.commit()
+    return changed
+
+
+def import_blocklist(screener, path, column=None, remove=False, progress=None):
+    """Stream a CSV/text/JSONL feed into a screener's blocked list"""
+    numbers = iter_feed_numbers(path, column)
+    if remove:
+        return screener.remove_blocked_numbers(numbers, progress=progress)
+    return screener.add_blocked_numbers(numbers, progress=progress)
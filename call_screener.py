@@ -1,152 +1,234 @@
-from kivy.utils import platform
-from plyer import notification
-import json
-import os
-
-class CallScreener:
-    def __init__(self):
+import threading
+
+from bloom_filter import BlocklistFilter
+from contacts import shared_contacts_index
+from event_history import shared_history
+from instrumentation import ScreeningStats
+from matchers import RuleMatcher
+from notifications import shared_dispatcher
+from number_store import SQLiteNumberSet, members
+from phone_numbers import default_normalizer
+from pipeline import Check, CheckPipeline
+from screener_base import ScreenerBase
+from settings_store import JournaledStore
+from verdict_cache import MISSING, VerdictCache
+
+class CallScreener(ScreenerBase):
+    _decision_method = 'check_call'
+
+    def __init__(self, normalizer=None, contacts=None, database=None, notifier=None, history=None,
+                 defer_load=False, read_only=False):
+        self.normalizer = normalizer or default_normalizer
+        self.database = database  # Optional SQLite file for the number lists
+        self.read_only = read_only  # Never write settings, caches or the database
+        self.contacts = contacts if contacts is not None else shared_contacts_index()
+        self.notifier = notifier if notifier is not None else shared_dispatcher()
+        self.history = history if history is not None else shared_history()
         self.is_active = False
         self.block_non_contacts = False  # New flag for blocking non-contacts
         self.blocked_numbers = set()
+        self.blocklist_version = 0  # Bumped by every change to a blocked list kept in JSON
         self.whitelist = set()
+        self.shared_blocklists = {}  # Read-only packed feeds by path
         self.rules = []
-        self.load_settings()
+        self.rule_matcher = RuleMatcher(
+            prefix_key=self.normalizer.normalize_prefix,
+            pattern_key=self.normalizer.normalize_fragment
+        )
+        # Whitelisted numbers are always allowed, so that check stays first;
+        # the blocking checks commute and are reordered by measured cost
+        self.pipeline = CheckPipeline([
+            Check('whitelist', self._whitelist_check, cost=0.2),
+            [
+                Check('blocklist', self._blocklist_check, cost=1.0),
+                Check('contacts', self._contacts_check, cost=1.0),
+                Check('rules', self._rules_check, cost=2.0),
+            ],
+        ])
+        self.store = JournaledStore('blocked_numbers.json', read_only=read_only)
+        self.number_filter = BlocklistFilter(self.store.path + '.bloom')
+        self.settings_version = 0  # Bumped by every change that can alter a verdict
+        self.verdict_cache = VerdictCache()
+        self.stats = ScreeningStats()  # Off until enable_stats()
+        self._stats_dumper = None
+        self.ready = threading.Event()  # Set once load_settings() has finished
+        self.ready_timeout = 0.5  # How long an early decision waits for settings
+        if not defer_load:
+            self.load_settings()
 
     def load_settings(self):
         """Load blocked numbers and rules from storage"""
+        migrated = False
         try:
-            if os.path.exists('blocked_numbers.json'):
-                with open('blocked_numbers.json', 'r') as f:
-                    data = json.load(f)
-                    self.blocked_numbers = set(data.get('blocked', []))
-                    self.whitelist = set(data.get('whitelist', []))
-                    self.rules = data.get('rules', [])
-                    self.block_non_contacts = data.get('block_non_contacts', False)
+            data = self.store.load()
+            if self.database:
+                self.blocked_numbers = SQLiteNumberSet(self.database, 'call_blocked')
+                self.whitelist = SQLiteNumberSet(self.database, 'call_whitelist')
+                # Move lists left in the JSON store into the database once
+                if (data.get('blocked') or data.get('whitelist')) and not self.read_only:
+                    self.blocked_numbers.update(self.normalize(n) for n in data.get('blocked', []))
+                    self.whitelist.update(self.normalize(n) for n in data.get('whitelist', []))
+                    migrated = True
+            else:
+                self.blocked_numbers = {self.normalize(n) for n in data.get('blocked', [])}
+                self.whitelist = {self.normalize(n) for n in data.get('whitelist', [])}
+            self.blocklist_version = data.get('blocklist_version', 0)
+            self.rules = data.get('rules', [])
+            self.block_non_contacts = data.get('block_non_contacts', False)
+            self._open_shared_blocklists(data.get('blocklist_files', []))
         except Exception as e:
             print(f"Error loading settings: {e}")
+        if migrated:
+            self.save_settings()
+        if not self.number_filter.load(self._number_filter_fingerprint()):
+            self.rebuild_number_filter()
+        self._settings_changed()
+        self.rule_matcher.compile(self.rules)
+        # The first contact lookup would otherwise run the full provider query
+        self.contacts.refresh()
+        self.ready.set()
 
     def save_settings(self):
         """Save blocked numbers and rules to storage"""
         try:
-            with open('blocked_numbers.json', 'w') as f:
-                json.dump({
-                    'blocked': list(self.blocked_numbers),
-                    'whitelist': list(self.whitelist),
-                    'rules': self.rules,
-                    'block_non_contacts': self.block_non_contacts
-                }, f)
+            self.store.compact({
+                'blocked': self._snapshot_numbers(self.blocked_numbers),
+                'blocklist_version': self.blocklist_version,
+                'whitelist': self._snapshot_numbers(self.whitelist),
+                'blocklist_files': list(self.shared_blocklists),
+                'rules': self.rules,
+                'block_non_contacts': self.block_non_contacts
+            })
         except Exception as e:
             print(f"Error saving settings: {e}")
 
-    def add_blocked_number(self, number):
-        """Add a number to the blocked list"""
-        self.blocked_numbers.add(number)
-        self.save_settings()
-
-    def remove_blocked_number(self, number):
-        """Remove a number from the blocked list"""
-        if number in self.blocked_numbers:
-            self.blocked_numbers.remove(number)
-            self.save_settings()
+    def add_rule(self, rule_type, value):
+        """Add a 'prefix' or 'pattern' rule and recompile the matcher"""
+        if rule_type not in ('prefix', 'pattern'):
+            return False
+        rule = {'type': rule_type, 'value': value}
+        if rule not in self.rules:
+            self.rules.append(rule)
+            self.rule_matcher.compile(self.rules)
+            self._record('append', 'rules', rule)
+        return True
+
+    def remove_rule(self, rule_type, value):
+        """Remove a rule and recompile the matcher"""
+        rule = {'type': rule_type, 'value': value}
+        if rule in self.rules:
+            self.rules.remove(rule)
+            self.rule_matcher.compile(self.rules)
+            self._record('remove', 'rules', rule)
+            return True
+        return False
 
-    def add_to_whitelist(self, number):
-        """Add a number to the whitelist"""
-        self.whitelist.add(number)
-        if number in self.blocked_numbers:
-            self.blocked_numbers.remove(number)
-        self.save_settings()
+    def match_rule(self, number):
+        """Return the custom rule that matches a number, or None"""
+        return self.rule_matcher.match(self.normalize(number))
 
     def is_contact(self, number):
         """Check if a number is in the phone's contacts"""
-        if platform == "android":
-            try:
-                from android.permissions import request_permissions, Permission
-                from android import activity
-                from jnius import autoclass, cast
-
-                # Request contacts permission if not already granted
-                request_permissions([Permission.READ_CONTACTS])
-
-                # Get the Android Context and ContentResolver
-                PythonActivity = autoclass('org.kivy.android.PythonActivity')
-                context = PythonActivity.mActivity
-                resolver = context.getContentResolver()
-
-                # Define the URI for contacts
-                ContactsContract = autoclass('android.provider.ContactsContract')
-                uri = ContactsContract.CommonDataKinds.Phone.CONTENT_URI
-
-                # Prepare the query
-                projection = ['data1']  # data1 is the phone number
-                selection = 'data1 = ?'
-                selection_args = [number]
-
-                # Execute query
-                cursor = resolver.query(uri, projection, selection, selection_args, None)
-                
-                if cursor is not None:
-                    exists = cursor.getCount() > 0
-                    cursor.close()
-                    return exists
-                return False
-            except Exception as e:
-                print(f"Error checking contacts: {e}")
-                return False
-        return True  # Default to true for non-Android platforms during testing
+        return self.contacts.is_contact(number)
 
     def toggle_block_non_contacts(self):
         """Toggle blocking of non-contact numbers"""
         self.block_non_contacts = not self.block_non_contacts
-        self.save_settings()
+        self._record('set', 'block_non_contacts', self.block_non_contacts)
         return self.block_non_contacts
 
+    def check_call(self, number):
+        """Determine if a call should be blocked and why
+
+        A call verdict depends only on the number and the settings, so it is
+        cached per normalized number until the settings next change.
+        """
+        if not self.is_active:
+            return False, None
+        if not self.settings_ready():
+            return False, None
+
+        number = self.normalize(number)
+        version = self._verdict_version()
+        verdict = self.verdict_cache.get(number, version)
+        if verdict is MISSING:
+            verdict = self._evaluate_call(number)
+            self.verdict_cache.put(number, verdict, version)
+        return verdict
+
+    def _evaluate_call(self, number):
+        """Run the uncached checks for a normalized number"""
+        return self.pipeline.run(number) or (False, None)
+
+    def _rules_check(self, number):
+        if self.rule_matcher.match(number) is not None:
+            return True, 'custom_rule'
+        return None
+
     def should_block_call(self, number):
         """Determine if a call should be blocked"""
-        if not self.is_active:
-            return False
-        
-        # Always allow whitelisted numbers
-        if number in self.whitelist:
-            return False
-            
-        # Block if number is in blocked list
-        if number in self.blocked_numbers:
-            return True
-            
-        # Check if we should block non-contacts
-        if self.block_non_contacts and not self.is_contact(number):
-            return True
-            
-        # Apply custom rules
-        for rule in self.rules:
-            if rule['type'] == 'prefix' and number.startswith(rule['value']):
-                return True
-            elif rule['type'] == 'pattern' and rule['value'] in number:
-                return True
-                
-        return False
+        return self.check_call(number)[0]
+
+    def screen_calls(self, numbers):
+        """Screen many calls at once, returning (should_block, reason) for each
+
+        Meant for re-screening a call log after a rules change. Each distinct
+        number is decided once, with whitelist, blocklist and contact
+        membership resolved in bulk. Like single calls, the batch fails open
+        while settings are still loading.
+        """
+        numbers = [self.normalize(n) for n in numbers]
+        if not self.is_active or not self.settings_ready():
+            return [(False, None)] * len(numbers)
+
+        unique = set(numbers)
+        whitelisted = members(self.whitelist, unique)
+        candidates = unique - whitelisted
+        blocked = self.blocked_among(candidates)
+        contacts = self.contacts.contacts_among(candidates - blocked) if self.block_non_contacts else None
+
+        verdicts = {number: (False, None) for number in whitelisted}
+        for number in candidates:
+            if number in blocked:
+                verdicts[number] = (True, 'blocked_number')
+            elif contacts is not None and number not in contacts:
+                verdicts[number] = (True, 'unknown_number')
+            elif self.rule_matcher.match(number) is not None:
+                verdicts[number] = (True, 'custom_rule')
+            else:
+                verdicts[number] = (False, None)
+        return [verdicts[number] for number in numbers]
 
     def handle_incoming_call(self, number):
         """Handle an incoming call"""
-        if self.should_block_call(number):
-            message = "Blocked call from unknown number" if self.block_non_contacts else f"Blocked call from {number}"
-            self.show_notification(message)
+        should_block, reason = self.check_call(number)
+        if should_block:
+            if reason == 'custom_rule':
+                rule = self.match_rule(number)
+                message = f"Blocked call from {number} ({rule['type']} rule {rule['value']})"
+            else:
+                message = "Blocked call from unknown number" if self.block_non_contacts else f"Blocked call from {number}"
+            self.show_notification(message, reason)
+            self.history.record('call', self.normalize(number), reason, message)
             return True  # Block the call
         return False  # Allow the call
 
-    def show_notification(self, message):
-        """Show a notification when a call is blocked"""
-        try:
-            notification.notify(
-                title='Call Screener',
-                message=message,
-                app_icon=None,
-                timeout=10,
-            )
-        except Exception as e:
-            print(f"Error showing notification: {e}")
+    def show_notification(self, message, reason=None):
+        """Queue a notification that a call was blocked; bursts are merged"""
+        self.notifier.post('Call Screener', message, reason, 'calls')
 
     def toggle_screening(self):
         """Toggle call screening on/off"""
         self.is_active = not self.is_active
         return self.is_active
+
+    def _stat_stages(self):
+        return [
+            ('whitelist', self, 'is_whitelisted'),
+            ('blocklist', self, 'is_blocked_number'),
+            ('contacts', self, 'is_contact'),
+            ('rules', self.rule_matcher, 'match'),
+        ]
+
+    def _pipeline_stats(self):
+        return self.pipeline.snapshot()
\ No newline at end of file
@@ -0,0 +1,291 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    from kivy.utils import platform
+except ImportError:
+    # Headless runs, such as the screening daemon, do without Kivy
+    platform = 'android' if 'ANDROID_ARGUMENT' in os.environ else sys.platform
+
+from phone_numbers import default_normalizer
+
+CONTACTS_FILE = 'contacts.json'
+
+
+class AndroidContactsProvider:
+    """Bulk reader for the Android contacts provider"""
+
+    def _resolver(self):
+        from android.permissions import check_permission, Permission
+        from jnius import autoclass
+
+        if not check_permission(Permission.READ_CONTACTS):
+            raise PermissionError("READ_CONTACTS has not been granted")
+        PythonActivity = autoclass('org.kivy.android.PythonActivity')
+        return PythonActivity.mActivity.getContentResolver()
+
+    def _query(self, uri, projection, selection=None, selection_args=None):
+        """Run a query and return its rows as lists of strings"""
+        cursor = self._resolver().query(uri, projection, selection, selection_args, None)
+        rows = []
+        if cursor is None:
+            return rows
+        try:
+            while cursor.moveToNext():
+                rows.append([cursor.getString(i) for i in range(len(projection))])
+        finally:
+            cursor.close()
+        return rows
+
+    def _phone_rows(self, selection=None, selection_args=None):
+        from jnius import autoclass
+
+        ContactsContract = autoclass('android.provider.ContactsContract')
+        uri = ContactsContract.CommonDataKinds.Phone.CONTENT_URI
+        # data1 is the number as typed, data4 the E.164 normalized number
+        rows = self._query(uri, ['contact_id', 'data1', 'data4'], selection, selection_args)
+        contacts = {}
+        for contact_id, number, normalized in rows:
+            contacts.setdefault(contact_id, []).append(normalized or number)
+        return contacts
+
+    def load_all(self):
+        """Return ({contact_id: [numbers]}, sync cursor)"""
+        now = int(time.time() * 1000)
+        return self._phone_rows(), now
+
+    def load_changes(self, since):
+        """Return ({contact_id: [numbers]}, [deleted ids], sync cursor) since a cursor"""
+        from jnius import autoclass
+
+        now = int(time.time() * 1000)
+        ContactsContract = autoclass('android.provider.ContactsContract')
+        args = [str(since)]
+
+        # A contact whose last number was removed has no phone rows left,
+        # so start every updated contact from an empty list
+        updated = {
+            row[0]: [] for row in self._query(
+                ContactsContract.Contacts.CONTENT_URI, ['_id'],
+                'contact_last_updated_timestamp > ?', args
+            )
+        }
+        if updated:
+            updated.update(self._phone_rows('contact_last_updated_timestamp > ?', args))
+
+        deleted = [
+            row[0] for row in self._query(
+                ContactsContract.DeletedContacts.CONTENT_URI, ['contact_id'],
+                'contact_deleted_timestamp > ?', args
+            )
+        ]
+        return updated, deleted, now
+
+
+class FileContactsProvider:
+    """Contacts read from a JSON file of {contact_id: [numbers]}
+
+    Stands in for the platform provider off-device, so the index can be
+    exercised on a desktop or in tests.
+    """
+
+    def __init__(self, path=CONTACTS_FILE):
+        self.path = path
+        self._snapshot = {}
+
+    def _read(self):
+        """Return the file's bytes and their digest, the sync cursor"""
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        # Edits within one mtime tick would slip past a timestamp check
+        return raw, hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    def _parse(self, raw):
+        data = json.loads(raw)
+        contacts = {str(contact_id): list(numbers) for contact_id, numbers in data.items()}
+        self._snapshot = contacts
+        return contacts
+
+    def load_all(self):
+        if not os.path.exists(self.path):
+            self._snapshot = {}
+            return {}, None
+        raw, digest = self._read()
+        return dict(self._parse(raw)), digest
+
+    def load_changes(self, since):
+        if not os.path.exists(self.path):
+            deleted = list(self._snapshot)
+            self._snapshot = {}
+            return {}, deleted, None
+        raw, digest = self._read()
+        if digest == since:
+            return {}, [], since
+
+        previous = self._snapshot
+        current = self._parse(raw)
+        updated = {
+            contact_id: numbers for contact_id, numbers in current.items()
+            if previous.get(contact_id) != numbers
+        }
+        deleted = [contact_id for contact_id in previous if contact_id not in current]
+        return updated, deleted, digest
+
+
+def default_provider():
+    """Pick the contacts provider for the current platform"""
+    if platform == "android":
+        return AndroidContactsProvider()
+    if os.path.exists(CONTACTS_FILE):
+        return FileContactsProvider(CONTACTS_FILE)
+    return None
+
+
+class ContactsIndex:
+    """In-memory set of normalized contact numbers
+
+    The whole address book is loaded once in bulk and then refreshed
+    incrementally, so a lookup is a set membership test instead of a
+    provider query. Lookups never query the provider themselves: at most
+    every refresh_interval seconds they start a refresh on a background
+    thread, which also retries a load that failed, for instance because
+    the contacts permission was not granted yet. Without a provider
+    (desktop runs), or until the first load succeeds, every number counts
+    as a contact, so a missing address book never blocks a caller.
+    version goes up whenever the set of contact numbers may have changed.
+    """
+
+    def __init__(self, provider=None, normalizer=None, refresh_interval=60):
+        self.provider = provider
+        self.normalizer = normalizer or default_normalizer
+        self.refresh_interval = refresh_interval
+        self.loaded = False
+        self.version = 0
+        self._numbers = {}      # number -> how many contacts hold it
+        self._by_contact = {}   # contact id -> set of numbers
+        self._cursor = None
+        self._checked_at = 0
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._numbers)
+
+    def __contains__(self, number):
+        return self.is_contact(number)
+
+    def _set_contact(self, contact_id, numbers):
+        self._drop_contact(contact_id)
+        normalized = {self.normalizer.normalize(n) for n in numbers if n}
+        normalized.discard('')
+        if not normalized:
+            return
+        self._by_contact[contact_id] = normalized
+        for number in normalized:
+            self._numbers[number] = self._numbers.get(number, 0) + 1
+
+    def _drop_contact(self, contact_id):
+        for number in self._by_contact.pop(contact_id, ()):
+            remaining = self._numbers[number] - 1
+            if remaining:
+                self._numbers[number] = remaining
+            else:
+                del self._numbers[number]
+
+    def load(self):
+        """Load every contact number in one bulk query"""
+        if self.provider is None:
+            return False
+        self._checked_at = time.monotonic()
+        try:
+            contacts, cursor = self.provider.load_all()
+        except Exception as e:
+            print(f"Error loading contacts: {e}")
+            return False
+        # Fill a fresh index and swap it in, so lookups never see half of it
+        index = ContactsIndex(normalizer=self.normalizer)
+        for contact_id, numbers in contacts.items():
+            index._set_contact(contact_id, numbers)
+        self._numbers, self._by_contact = index._numbers, index._by_contact
+        self._cursor = cursor
+        self.loaded = True
+        self.version += 1
+        return True
+
+    def refresh(self):
+        """Apply contacts added, changed or deleted since the last sync"""
+        with self._refresh_lock:
+            return self._refresh()
+
+    def _refresh(self):
+        if not self.loaded:
+            return self.load()
+        self._checked_at = time.monotonic()
+        try:
+            updated, deleted, cursor = self.provider.load_changes(self._cursor)
+        except Exception as e:
+            print(f"Error refreshing contacts: {e}")
+            return False
+        for contact_id in deleted:
+            self._drop_contact(contact_id)
+        for contact_id, numbers in updated.items():
+            self._set_contact(contact_id, numbers)
+        if updated or deleted:
+            self.version += 1
+        self._cursor = cursor
+        return True
+
+    def refresh_in_background(self):
+        """Run refresh() on a worker thread unless one is already running"""
+        if self.provider is None:
+            return None
+        self._checked_at = time.monotonic()
+        thread = threading.Thread(target=self._background_refresh, name='contacts-refresh', daemon=True)
+        thread.start()
+        return thread
+
+    def _background_refresh(self):
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self._refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def refresh_if_stale(self):
+        if time.monotonic() - self._checked_at >= self.refresh_interval:
+            self.refresh_in_background()
+
+    def is_contact(self, number):
+        """Check if a number belongs to any contact"""
+        if self.provider is None:
+            return True
+        self.refresh_if_stale()
+        if not self.loaded:
+            return True
+        return self.normalizer.normalize(number) in self._numbers
+
+    def contacts_among(self, numbers):
+        """Return which of the given numbers belong to contacts"""
+        numbers = set(numbers)
+        if self.provider is None:
+            return numbers
+        self.refresh_if_stale()
+        if not self.loaded:
+            return numbers
+        normalize = self.normalizer.normalize
+        return {number for number in numbers if normalize(number) in self._numbers}
+
+
+_shared_index = None
+
+
+def shared_contacts_index():
+    """Return the contacts index shared by the call and SMS screeners"""
+    global _shared_index
+    if _shared_index is None:
+        _shared_index = ContactsIndex(default_provider())
+    return _shared_index
@@ -0,0 +1,255 @@
+from urllib.parse import urlsplit
+import csv
+import os
+import sys
+
+ALLOW = 'allow'
+DENY = 'deny'
+
+# Multi-label public suffixes most often seen in links; PublicSuffixes.load()
+# adds the rest from a public suffix list file
+DEFAULT_PUBLIC_SUFFIXES = (
+    'co.uk', 'org.uk', 'me.uk', 'ltd.uk', 'plc.uk', 'net.uk', 'ac.uk', 'gov.uk', 'nhs.uk',
+    'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au', 'co.nz', 'org.nz', 'net.nz',
+    'co.in', 'net.in', 'org.in', 'gov.in', 'co.jp', 'ne.jp', 'or.jp', 'co.kr', 'com.cn',
+    'com.br', 'com.mx', 'com.ar', 'com.tr', 'com.sg', 'com.hk', 'co.za', 'co.il',
+    'com.ru', 'com.ua', 'com.pl', 'co.id', 'com.my', 'com.ph', 'com.vn', 'com.ng',
+    'github.io', 'blogspot.com', 'herokuapp.com', 'appspot.com', 'web.app', 'firebaseapp.com',
+    'pages.dev', 'workers.dev', 'netlify.app', 'vercel.app', 'azurewebsites.net',
+    'cloudfront.net', 'amazonaws.com', 'ngrok.io', 'duckdns.org', 'no-ip.org',
+)
+
+
+def _ascii_domain(domain):
+    """Feeds list internationalized domains in their ASCII (punycode) form"""
+    if domain.isascii():
+        return domain
+    try:
+        return domain.encode('idna').decode('ascii')
+    except UnicodeError:
+        return domain
+
+
+def url_host(url):
+    """Return the lower-case host name of a URL or bare domain, or None"""
+    if '://' not in url:
+        url = '//' + url
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    return _ascii_domain(host.rstrip('.')) or None
+
+
+def iter_feed_domains(path):
+    """Stream domains from a feed file without loading it whole
+
+    Lines may hold a domain, a URL or a hosts-file entry ("0.0.0.0
+    example.com"); '#' starts a comment. In .csv files the first cell that
+    looks like a domain or URL is used.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if extension == '.csv':
+            for row in csv.reader(f):
+                for value in row:
+                    if '.' in value and ' ' not in value.strip():
+                        host = url_host(value.strip())
+                        if host:
+                            yield host
+                        break
+        else:
+            for line in f:
+                fields = line.split('#', 1)[0].split()
+                if not fields:
+                    continue
+                host = url_host(fields[-1])
+                if host:
+                    yield host
+
+
+class DomainTrie:
+    """Domains keyed by their labels in reverse, "com" -> "example" -> "www"
+
+    Every stored domain that covers a host, itself or a parent domain, lies
+    on the path the host's labels take from the root, so the most specific
+    one is found in one walk of at most as many steps as the host has labels.
+    """
+
+    def __init__(self):
+        self._root = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, domain, value):
+        node = self._root
+        for label in reversed(domain.split('.')):
+            node = node.setdefault(sys.intern(label), {})
+        if None not in node:
+            self._size += 1
+        # The None key holds the value of the domain ending at this node
+        node[None] = value
+
+    def remove(self, domain):
+        node = self._root
+        for label in reversed(domain.split('.')):
+            node = node.get(label)
+            if node is None:
+                return False
+        if None not in node:
+            return False
+        del node[None]
+        self._size -= 1
+        return True
+
+    def longest_match(self, host):
+        """Return (domain, value) of the most specific stored domain covering host"""
+        labels = host.split('.')
+        node = self._root
+        match = None
+        for depth, label in enumerate(reversed(labels), 1):
+            node = node.get(label)
+            if node is None:
+                break
+            if None in node:
+                match = depth, node[None]
+        if match is None:
+            return None
+        depth, value = match
+        return '.'.join(labels[-depth:]), value
+
+
+class PublicSuffixes:
+    """Public suffix rules for finding the domain a host was registered under
+
+    Follows the public suffix list format: "co.uk" is a suffix, "*.ck"
+    makes every label under ck one and "!www.ck" is an exception. Hosts
+    under an unlisted top-level domain fall back to the last label.
+    """
+
+    def __init__(self, rules=DEFAULT_PUBLIC_SUFFIXES):
+        self._trie = DomainTrie()
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule):
+        if rule.startswith('!'):
+            self._trie.add(rule[1:], 'exception')
+        else:
+            self._trie.add(rule, 'suffix')
+
+    def load(self, path):
+        """Add the rules of a public suffix list file"""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                if fields and not fields[0].startswith('//'):
+                    self.add(_ascii_domain(fields[0].lower()))
+
+    def registrable_domain(self, host):
+        """Return the public suffix plus one label, or None if host is a suffix"""
+        if ':' in host or host.replace('.', '').isdigit():
+            return host  # IP addresses are not under a domain
+        labels = host.split('.')
+        suffix = 1
+        node = self._trie._root
+        for depth, label in enumerate(reversed(labels), 1):
+            if '*' in node:
+                suffix = max(suffix, depth)
+            node = node.get(label)
+            if node is None:
+                break
+            kind = node.get(None)
+            if kind == 'exception':
+                suffix = depth - 1
+                break
+            if kind == 'suffix':
+                suffix = max(suffix, depth)
+        if len(labels) <= suffix:
+            return None
+        return '.'.join(labels[-suffix - 1:])
+
+
+class DomainReputation:
+    """Allow and deny rules for the domains SMS links point to
+
+    A rule covers a domain and all its subdomains; when rules for a
+    domain and a parent domain both cover a host, the more specific one
+    wins, so "login.bank.example" can be allowed under a denied
+    "bank.example". Rules come from the user or from feed files, and the
+    source of each is kept for reporting. Hosts are also reduced to their
+    registrable domain, the name the owner registered, which is what the
+    checks report.
+    """
+
+    def __init__(self, suffixes=None):
+        self.suffixes = suffixes or PublicSuffixes()
+        self.rules = DomainTrie()
+
+    def __len__(self):
+        return len(self.rules)
+
+    def add(self, domain, verdict, source='user'):
+        host = url_host(domain)
+        if host:
+            self.rules.add(host, (verdict, source))
+        return host
+
+    def remove(self, domain):
+        host = url_host(domain)
+        return bool(host) and self.rules.remove(host)
+
+    def clear(self):
+        self.rules = DomainTrie()
+
+    def load_feed(self, path, verdict=DENY, source=None):
+        """Add every domain in a feed file with one verdict; returns the count"""
+        source = source or os.path.basename(path)
+        value = (verdict, source)
+        count = 0
+        for host in iter_feed_domains(path):
+            self.rules.add(host, value)
+            count += 1
+        return count
+
+    def check_url(self, url):
+        """Return the rule covering a link as a dict, or None if no rule does
+
+        The dict holds the url, its host and registrable domain, the
+        verdict, the rule domain that matched and the rule's source.
+        """
+        host = url_host(url)
+        if host is None:
+            return None
+        match = self.rules.longest_match(host)
+        if match is None:
+            return None
+        rule, (verdict, source) = match
+        return {
+            'url': url,
+            'host': host,
+            'domain': self.suffixes.registrable_domain(host) or host,
+            'verdict': verdict,
+            'rule': rule,
+            'source': source,
+        }
+
+    def check_urls(self, urls):
+        """Return the first denied link, else the last allowed one, else None
+
+        An allowed result means every link in urls is allowed.
+        """
+        allowed = None
+        for url in urls:
+            result = self.check_url(url)
+            if result is None:
+                allowed = False
+            elif result['verdict'] == DENY:
+                return result
+            elif allowed is not False:
+                allowed = result
+        return allowed or None
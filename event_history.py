@@ -0,0 +1,278 @@
+from array import array
+from bisect import bisect_left, bisect_right
+import json
+import os
+import threading
+import time
+
+HISTORY_DIR = 'history'
+_SEGMENT_PREFIX = 'events-'
+_SEGMENT_SUFFIX = '.jsonl'
+
+
+def _day(timestamp):
+    return time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+
+class EventHistory:
+    """Append-only record of blocked calls and SMS
+
+    Events are numbered, buffered in memory and written to the current
+    segment file in batches of flush_every. A segment holds up to
+    segment_size events; once there are more than max_segments the oldest
+    file is deleted. Indexes from number and from day/reason to event
+    numbers, plus the byte offset of every event, let queries read just
+    the events they return. The files are scanned once to rebuild the
+    indexes, by an early load() call off the ringing path or else by the
+    first query. Events recorded before the scan finishes are held apart
+    and numbered after it, so record() never waits for the scan.
+    """
+
+    def __init__(self, directory=HISTORY_DIR, segment_size=5000, max_segments=20,
+                 flush_every=64, clock=time.time):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.flush_every = flush_every
+        self.clock = clock
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._early_lock = threading.Lock()
+        self._early = []            # events recorded before load() finished
+        self._pending = []          # events not yet written
+        self._segments = []         # first event number of each segment file
+        self._offsets = {}          # segment start -> array of byte offsets
+        self._by_number = {}        # number -> array of event numbers
+        self._by_day = {}           # day -> {reason: array of event numbers}
+        self._next_seq = 0
+
+    def _segment_path(self, start):
+        return os.path.join(self.directory, f'{_SEGMENT_PREFIX}{start:010d}{_SEGMENT_SUFFIX}')
+
+    def _index(self, event):
+        seq = event['seq']
+        self._by_number.setdefault(event['number'], array('Q')).append(seq)
+        reasons = self._by_day.setdefault(_day(event['time']), {})
+        reasons.setdefault(event['reason'], array('Q')).append(seq)
+
+    def load(self):
+        """Rebuild the indexes from the segment files
+
+        A segment that cannot be read in full is skipped whole, so the
+        stored event numbers may have gaps.
+        """
+        with self._lock:
+            if self.loaded:
+                return
+            if os.path.isdir(self.directory):
+                starts = sorted(
+                    int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+                    for name in os.listdir(self.directory)
+                    if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX)
+                )
+                for start in starts:
+                    try:
+                        self._load_segment(start)
+                    except Exception as e:
+                        print(f"Error loading history segment {start}: {e}")
+            with self._early_lock:
+                self.loaded = True
+                early, self._early = self._early, []
+            for event in early:
+                self._add(event)
+
+    def _load_segment(self, start):
+        path = self._segment_path(start)
+        offsets = array('Q')
+        events = []
+        with open(path, 'rb+') as f:
+            offset = 0
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("incomplete record")
+                    event = json.loads(line)
+                except ValueError:
+                    # A write cut short by a crash; drop it so appends stay aligned
+                    f.truncate(offset)
+                    break
+                if event['seq'] != start + len(offsets):
+                    raise ValueError(f"unexpected event number {event['seq']}")
+                offsets.append(offset)
+                events.append(event)
+                offset += len(line)
+        if not offsets:
+            os.remove(path)
+            return
+        # Index only a segment read in full, so a damaged one leaves no trace
+        for event in events:
+            self._index(event)
+        self._segments.append(start)
+        self._offsets[start] = offsets
+        self._next_seq = max(self._next_seq, start + len(offsets))
+
+    def record(self, kind, number, reason, detail=None):
+        """Add a blocked event; kind is 'call' or 'sms'
+
+        The event is numbered once the files have been scanned, so its seq
+        is None when it is recorded before load() has finished.
+        """
+        event = {
+            'seq': None,
+            'time': self.clock(),
+            'kind': kind,
+            'number': number,
+            'reason': reason,
+            'detail': detail,
+        }
+        with self._early_lock:
+            if not self.loaded:
+                self._early.append(event)
+                return event
+        with self._lock:
+            self._add(event)
+        return event
+
+    def _add(self, event):
+        event['seq'] = self._next_seq
+        self._next_seq += 1
+        self._pending.append(event)
+        self._index(event)
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Write buffered events to the segment files"""
+        with self._lock:
+            # Events recorded before the scan are only numbered by it
+            self.load()
+            try:
+                while self._pending:
+                    self._write_batch()
+            except Exception as e:
+                print(f"Error saving history: {e}")
+
+    def _write_batch(self):
+        if not self._segments or len(self._offsets[self._segments[-1]]) >= self.segment_size:
+            self._start_segment(self._pending[0]['seq'])
+        start = self._segments[-1]
+        offsets = self._offsets[start]
+        batch = self._pending[:self.segment_size - len(offsets)]
+        lines = [json.dumps(event, separators=(',', ':')).encode('utf-8') + b'\n' for event in batch]
+        with open(self._segment_path(start), 'ab') as f:
+            offset = f.tell()
+            f.write(b''.join(lines))
+        for line in lines:
+            offsets.append(offset)
+            offset += len(line)
+        del self._pending[:len(batch)]
+
+    def _start_segment(self, start):
+        os.makedirs(self.directory, exist_ok=True)
+        self._segments.append(start)
+        self._offsets[start] = array('Q')
+        while len(self._segments) > self.max_segments:
+            self._drop_segment()
+
+    def _drop_segment(self):
+        """Delete the oldest segment and forget its events"""
+        oldest = self._segments.pop(0)
+        del self._offsets[oldest]
+        try:
+            os.remove(self._segment_path(oldest))
+        except OSError as e:
+            print(f"Error removing history segment: {e}")
+        first = self._segments[0]
+        for index in [self._by_number] + list(self._by_day.values()):
+            for key, seqs in list(index.items()):
+                del seqs[:bisect_left(seqs, first)]
+                if not seqs:
+                    del index[key]
+        for day, reasons in list(self._by_day.items()):
+            if not reasons:
+                del self._by_day[day]
+
+    def _all_seqs(self):
+        """Ascending numbers of every stored and pending event"""
+        ranges = [range(start, start + len(self._offsets[start])) for start in self._segments]
+        if self._pending:
+            ranges.append(range(self._pending[0]['seq'], self._next_seq))
+        if not ranges:
+            return range(0)
+        if all(before.stop == after.start for before, after in zip(ranges, ranges[1:])):
+            return range(ranges[0].start, ranges[-1].stop)
+        # A damaged segment was skipped on load, leaving a gap in the numbers
+        return [seq for numbers in ranges for seq in numbers]
+
+    def _fetch(self, seqs):
+        """Read events by number, keeping the given order"""
+        events = {}
+        pending_start = self._pending[0]['seq'] if self._pending else self._next_seq
+        by_segment = {}
+        for seq in seqs:
+            if seq >= pending_start:
+                events[seq] = self._pending[seq - pending_start]
+            else:
+                start = self._segments[bisect_right(self._segments, seq) - 1]
+                by_segment.setdefault(start, []).append(seq)
+        for start, wanted in by_segment.items():
+            offsets = self._offsets[start]
+            with open(self._segment_path(start), 'rb') as f:
+                for seq in sorted(wanted):
+                    f.seek(offsets[seq - start])
+                    events[seq] = json.loads(f.readline())
+        return [events[seq] for seq in seqs]
+
+    def _page(self, seqs, limit, offset):
+        """Newest-first page of events out of an ascending list of event numbers"""
+        total = len(seqs)
+        end = max(total - offset, 0)
+        wanted = [seqs[i] for i in range(end - 1, max(end - limit, 0) - 1, -1)]
+        return self._fetch(wanted), total
+
+    def recent(self, limit=50, offset=0):
+        """Return (events newest first, total) across all numbers"""
+        with self._lock:
+            self.load()
+            return self._page(self._all_seqs(), limit, offset)
+
+    def for_number(self, number, limit=50, offset=0):
+        """Return (events newest first, total) for one normalized number"""
+        with self._lock:
+            self.load()
+            return self._page(self._by_number.get(number, ()), limit, offset)
+
+    def for_day(self, day=None, reason=None, limit=50, offset=0):
+        """Return (events newest first, total) for a 'YYYY-MM-DD' day, today by default"""
+        with self._lock:
+            self.load()
+            reasons = self._by_day.get(day or _day(self.clock()), {})
+            if reason is not None:
+                seqs = reasons.get(reason, ())
+            else:
+                seqs = sorted(seq for seqs in reasons.values() for seq in seqs)
+            return self._page(seqs, limit, offset)
+
+    def counts_by_reason(self, day=None):
+        """Return {reason: blocked count} for a day, today by default"""
+        with self._lock:
+            self.load()
+            reasons = self._by_day.get(day or _day(self.clock()), {})
+            return {reason: len(seqs) for reason, seqs in reasons.items()}
+
+    def days(self):
+        """Days that have history, newest first"""
+        with self._lock:
+            self.load()
+            return sorted(self._by_day, reverse=True)
+
+
+_shared_history = None
+
+
+def shared_history():
+    """Return the blocked-event history shared by the call and SMS screeners"""
+    global _shared_history
+    if _shared_history is None:
+        _shared_history = EventHistory()
+    return _shared_history
@@ -0,0 +1,182 @@
+from bisect import bisect_left
+from collections import Counter
+import json
+import os
+import threading
+import time
+
+# Histogram bucket upper bounds in microseconds; slower samples overflow
+BUCKET_BOUNDS_US = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000,
+                    10000, 20000, 50000, 100000, 200000, 500000, 1000000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram that records in constant time"""
+
+    _bounds = [bound / 1e6 for bound in BUCKET_BOUNDS_US]
+
+    def __init__(self):
+        self.counts = [0] * (len(self._bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect_left(self._bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile, in microseconds"""
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index < len(BUCKET_BOUNDS_US):
+                    return float(BUCKET_BOUNDS_US[index])
+                break
+        return self.max * 1e6
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean_us': self.total / self.count * 1e6 if self.count else 0.0,
+            'max_us': self.max * 1e6,
+            'p50_us': self.percentile(50),
+            'p95_us': self.percentile(95),
+            'p99_us': self.percentile(99),
+            'buckets': [[bound, count] for bound, count in
+                        zip(BUCKET_BOUNDS_US + (None,), self.counts) if count],
+        }
+
+
+class ScreeningStats:
+    """Per-stage timings and decision counters for a screener
+
+    Nothing is measured until enable() wraps the screener's stage methods
+    with timers; disable() removes the wrappers again, so a screener with
+    instrumentation off runs exactly the same code as before.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.enabled = False
+        self._wrapped = []
+        self.reset()
+
+    def reset(self):
+        self.stages = {}
+        self.decisions = 0
+        self.blocks = Counter()
+        self.spam_categories = Counter()
+
+    def enable(self, stages, decision):
+        """Time every (stage, owner, attribute) in stages and count the decision's verdicts
+
+        decision is an (owner, attribute) pair naming the method that
+        returns (should_block, reason).
+        """
+        if self.enabled:
+            return
+        for stage, owner, attr in stages:
+            self._wrap(owner, attr, self._timed(getattr(owner, attr), stage))
+        owner, attr = decision
+        self._wrap(owner, attr, self._counted(getattr(owner, attr)))
+        self.enabled = True
+
+    def disable(self):
+        for owner, attr in self._wrapped:
+            # Dropping the instance attribute uncovers the class method again
+            owner.__dict__.pop(attr, None)
+        self._wrapped = []
+        self.enabled = False
+
+    def _wrap(self, owner, attr, wrapper):
+        setattr(owner, attr, wrapper)
+        self._wrapped.append((owner, attr))
+
+    def _histogram(self, stage):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram()
+        return histogram
+
+    def _timed(self, func, stage):
+        clock = self.clock
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._histogram(stage).record(clock() - start)
+        return timed
+
+    def _counted(self, func):
+        clock = self.clock
+
+        def counted(*args, **kwargs):
+            start = clock()
+            verdict = func(*args, **kwargs)
+            self._histogram('decision').record(clock() - start)
+            self.decisions += 1
+            should_block, reason = verdict
+            if should_block:
+                self.blocks[reason] += 1
+                if reason.startswith('spam_'):
+                    self.spam_categories[reason[len('spam_'):]] += 1
+            return verdict
+        return counted
+
+    def snapshot(self):
+        return {
+            'enabled': self.enabled,
+            'decisions': self.decisions,
+            'blocked': sum(self.blocks.values()),
+            'blocks': dict(self.blocks),
+            'spam_categories': dict(self.spam_categories),
+            'stages': {stage: histogram.snapshot() for stage, histogram in list(self.stages.items())},
+        }
+
+
+class StatsDumper:
+    """Writes a stats snapshot to a JSON file every interval seconds"""
+
+    def __init__(self, path, collect, interval=300):
+        self.path = path
+        self.collect = collect
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='stats-dumper', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the thread after writing one last snapshot"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+        self.dump()
+
+    def dump(self):
+        try:
+            snapshot = dict(self.collect(), timestamp=time.time())
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving stats: {e}")
@@ -1,26 +1,69 @@
+import os
+import re
+import threading
+import time
+
+_IMPORTS_STARTED = time.perf_counter()
+
+# Dialogs, pickers and the SMS screen widgets are imported where first used
 from kivymd.app import MDApp
 from kivymd.uix.button import MDFlatButton
-from kivymd.uix.dialog import MDDialog
-from kivymd.uix.list import MDList, OneLineIconListItem
-from kivymd.uix.list import IconLeftWidget
 from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.uix.screen import MDScreen
 from kivymd.uix.screenmanager import MDScreenManager
 from kivymd.uix.toolbar import MDTopAppBar
-from kivymd.uix.floatlayout import MDFloatLayout
-from kivymd.uix.textfield import MDTextField
-from kivymd.uix.selectioncontrol import MDSwitch
-from kivymd.uix.menu import MDDropdownMenu
-from kivymd.uix.label import MDLabel
-from kivymd.uix.pickers import MDTimePicker
+from kivy.clock import Clock
 from kivy.core.window import Window
 from kivy.utils import platform
-from kivy.metrics import dp
 from datetime import datetime
 
 from services.call_screener import CallScreener
 from services.sms_screener import SMSScreener
 
+HISTORY_PAGE_SIZE = 20
+
+
+def format_minutes(minutes):
+    """'10:30 PM' for a number of minutes after midnight"""
+    return datetime(2000, 1, 1, minutes // 60 % 24, minutes % 60).strftime('%I:%M %p')
+
+
+def _process_started():
+    """perf_counter() reading at process start, or now if the OS won't say"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Field 22, counted from after the parenthesised command name
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return time.perf_counter() - (uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.perf_counter()
+
+
+class StartupTrace:
+    """Startup milestones from process start to the first frame"""
+
+    def __init__(self, started):
+        self.started = started
+        self.marks = []
+
+    def mark(self, label, at=None):
+        self.marks.append((label, time.perf_counter() if at is None else at))
+
+    def report(self):
+        previous = self.started
+        steps = []
+        for label, at in self.marks:
+            steps.append(f"{label} {(at - previous) * 1000:.0f}ms")
+            previous = at
+        print(f"Startup: {', '.join(steps)}; first frame after {(previous - self.started) * 1000:.0f}ms")
+
+
+startup_trace = StartupTrace(_process_started())
+startup_trace.mark('interpreter', _IMPORTS_STARTED)
+startup_trace.mark('imports')
+
 class CallScreen(MDScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -47,9 +90,21 @@ class CallScreen(MDScreen):
             on_release=lambda x: self.app.show_add_number_dialog('call')
         )
         
+        history_btn = MDFlatButton(
+            text="Blocked History",
+            pos_hint={'center_x': .5},
+            on_release=lambda x: self.app.show_history()
+        )
+        
+        # Controls that change settings wait until the settings have loaded
+        self.settings_buttons = [self.block_non_contacts_btn, add_blocked_number_btn]
+        for button in self.settings_buttons:
+            button.disabled = not self.app.settings_loaded
+        
         layout.add_widget(self.call_status_btn)
         layout.add_widget(self.block_non_contacts_btn)
         layout.add_widget(add_blocked_number_btn)
+        layout.add_widget(history_btn)
         
         self.add_widget(layout)
 
@@ -59,6 +114,12 @@ class SMSScreen(MDScreen):
         self.app = None
         
     def setup_ui(self):
+        from kivymd.uix.label import MDLabel
+        from kivymd.uix.selectioncontrol import MDSwitch
+
+        # Built once settings have loaded, so controls can show them
+        screener = self.app.sms_screener
+
         # Main layout with padding for better spacing
         layout = MDBoxLayout(orientation='vertical', spacing=8, padding=[15, 10, 15, 10])
         
@@ -73,7 +134,7 @@ class SMSScreen(MDScreen):
         )
         
         self.sms_block_non_contacts_btn = MDFlatButton(
-            text="Block Non-Contact SMS: OFF",
+            text="Block Non-Contact SMS: ON" if screener.block_non_contacts else "Block Non-Contact SMS: OFF",
             size_hint_x=1,
             on_release=self.app.toggle_sms_block_non_contacts
         )
@@ -112,6 +173,7 @@ class SMSScreen(MDScreen):
         )
         
         self.quiet_hours_switch = MDSwitch(
+            active=screener.quiet_schedule.enabled,
             size_hint_x=0.3,
             pos_hint={'center_y': .5}
         )
@@ -127,14 +189,15 @@ class SMSScreen(MDScreen):
             height="40dp"
         )
         
+        quiet_start, quiet_end = screener.quiet_schedule.daily_window()
         self.quiet_start_btn = MDFlatButton(
-            text="Start: 10 PM",
+            text=f"Start: {format_minutes(quiet_start)}",
             size_hint_x=0.5,
             on_release=lambda x: self.app.show_time_picker('start')
         )
         
         self.quiet_end_btn = MDFlatButton(
-            text="End: 7 AM",
+            text=f"End: {format_minutes(quiet_end)}",
             size_hint_x=0.5,
             on_release=lambda x: self.app.show_time_picker('end')
         )
@@ -173,6 +236,7 @@ class SMSScreen(MDScreen):
         )
         
         self.freq_limit_switch = MDSwitch(
+            active=screener.frequency_limits['enabled'],
             size_hint_x=0.3,
             pos_hint={'center_y': .5}
         )
@@ -214,11 +278,15 @@ class SMSScreen(MDScreen):
 class CallScreenApp(MDApp):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.call_screener = CallScreener()
-        self.sms_screener = SMSScreener()
+        # Settings load on a worker thread once the app has started
+        self.call_screener = CallScreener(defer_load=True)
+        self.sms_screener = SMSScreener(defer_load=True)
+        self.settings_loaded = False
+        startup_trace.mark('screeners')
         self.dialog = None
         self.menu = None
         self.time_picker = None
+        self.sms_screen = None  # Built on first navigation
         Window.softinput_mode = "below_target"  
 
     def build(self):
@@ -230,24 +298,19 @@ class CallScreenApp(MDApp):
         layout = MDBoxLayout(orientation='vertical')
         
         # Create toolbar for navigation
-        toolbar = MDTopAppBar(title="Call Screen")
-        layout.add_widget(toolbar)
+        self.toolbar = MDTopAppBar(title="Call Screen (loading...)")
+        layout.add_widget(self.toolbar)
         
         # Create screen manager
         self.screen_manager = MDScreenManager()
         
-        # Create screens
-        call_screen = CallScreen(name="call")
+        # Create the call screen; the SMS screen waits until it is opened
+        call_screen = self.call_screen = CallScreen(name="call")
         call_screen.app = self
         call_screen.setup_ui()  
         
-        sms_screen = SMSScreen(name="sms")
-        sms_screen.app = self
-        sms_screen.setup_ui()  
-        
         # Add screens to manager
         self.screen_manager.add_widget(call_screen)
-        self.screen_manager.add_widget(sms_screen)
         
         # Create navigation buttons
         nav_box = MDBoxLayout(
@@ -263,20 +326,52 @@ class CallScreenApp(MDApp):
             on_release=lambda x: self.screen_manager.switch_to(call_screen, direction='right')
         )
         
-        sms_nav_btn = MDFlatButton(
+        self.sms_nav_btn = MDFlatButton(
             text="SMS Screening",
-            on_release=lambda x: self.screen_manager.switch_to(sms_screen, direction='left')
+            disabled=True,
+            on_release=lambda x: self.show_sms_screen()
         )
         
         nav_box.add_widget(call_nav_btn)
-        nav_box.add_widget(sms_nav_btn)
+        nav_box.add_widget(self.sms_nav_btn)
         
         # Add widgets to main layout
         layout.add_widget(self.screen_manager)
         layout.add_widget(nav_box)
         
+        startup_trace.mark('build')
         return layout
 
+    def load_settings(self):
+        """Load both screeners' settings off the UI thread"""
+        # One after the other, as they may share a database connection
+        self.call_screener.load_settings()
+        self.sms_screener.load_settings()
+        # Scan the blocked-event history here rather than on the first block
+        self.call_screener.history.load()
+        Clock.schedule_once(self.on_settings_loaded)
+
+    def on_settings_loaded(self, dt):
+        """Unlock the settings controls and show the loaded state"""
+        self.settings_loaded = True
+        print(f"Settings loaded {(time.perf_counter() - startup_trace.started) * 1000:.0f}ms after start")
+        self.toolbar.title = "Call Screen"
+        for button in self.call_screen.settings_buttons:
+            button.disabled = False
+        self.call_screen.block_non_contacts_btn.text = (
+            "Block Non-Contacts: ON" if self.call_screener.block_non_contacts else "Block Non-Contacts: OFF"
+        )
+        self.sms_nav_btn.disabled = False
+
+    def show_sms_screen(self):
+        """Switch to the SMS screen, building it the first time"""
+        if self.sms_screen is None:
+            self.sms_screen = SMSScreen(name="sms")
+            self.sms_screen.app = self
+            self.sms_screen.setup_ui()
+            self.screen_manager.add_widget(self.sms_screen)
+        self.screen_manager.switch_to(self.sms_screen, direction='left')
+
     def toggle_call_screening(self, instance):
         is_active = self.call_screener.toggle_screening()
         self.screen_manager.get_screen('call').call_status_btn.text = "Disable Call Screening" if is_active else "Enable Call Screening"
@@ -305,6 +400,8 @@ class CallScreenApp(MDApp):
 
     def show_time_picker(self, time_type):
         """Show time picker dialog for quiet hours start/end time."""
+        from kivymd.uix.pickers import MDTimePicker
+
         self.time_picker = MDTimePicker()
         self.time_picker.bind(on_save=lambda instance, time: self.set_time(time_type, time))
         self.time_picker.open()
@@ -313,10 +410,10 @@ class CallScreenApp(MDApp):
         """Set the quiet hours start/end time."""
         if time_type == 'start':
             self.screen_manager.get_screen('sms').quiet_start_btn.text = f"Start: {time.strftime('%I:%M %p')}"
-            self.sms_screener.set_quiet_hours(start_hour=time.hour, end_hour=None)
+            self.sms_screener.set_quiet_hours(start_hour=time.hour, start_minute=time.minute)
         else:
             self.screen_manager.get_screen('sms').quiet_end_btn.text = f"End: {time.strftime('%I:%M %p')}"
-            self.sms_screener.set_quiet_hours(start_hour=None, end_hour=time.hour)
+            self.sms_screener.set_quiet_hours(end_hour=time.hour, end_minute=time.minute)
         self.time_picker = None
 
     def toggle_filter_category(self, category):
@@ -329,6 +426,9 @@ class CallScreenApp(MDApp):
 
     def show_filter_categories(self, instance):
         """Show dialog to manage spam filter categories"""
+        from kivymd.uix.dialog import MDDialog
+        from kivymd.uix.list import IconLeftWidget, MDList, OneLineIconListItem
+
         content = MDList()
         
         # Add list items for each category
@@ -368,8 +468,11 @@ class CallScreenApp(MDApp):
     
     def show_add_number_dialog(self, dialog_type):
         """Show dialog to add blocked number or keyword"""
+        from kivymd.uix.dialog import MDDialog
+        from kivymd.uix.textfield import MDTextField
+
         title = "Add Number to Block List" if dialog_type == 'call' else "Add Custom Filter"
-        hint = "Enter phone number" if dialog_type == 'call' else "Enter keyword or phrase"
+        hint = "Enter phone numbers, comma separated" if dialog_type == 'call' else "Enter keyword or phrase"
         
         content = MDBoxLayout(
             orientation='vertical',
@@ -405,6 +508,47 @@ class CallScreenApp(MDApp):
         )
         self.dialog.open()
 
+    def show_history(self, offset=0):
+        """Show a page of blocked calls and SMS, newest first"""
+        from kivymd.uix.dialog import MDDialog
+        from kivymd.uix.list import MDList, OneLineIconListItem, TwoLineListItem
+
+        if self.dialog:
+            self.dialog.dismiss()
+        events, total = self.call_screener.history.recent(HISTORY_PAGE_SIZE, offset)
+        
+        content = MDList()
+        for event in events:
+            when = datetime.fromtimestamp(event['time']).strftime('%b %d, %I:%M %p')
+            kind = "Call" if event['kind'] == 'call' else "SMS"
+            content.add_widget(TwoLineListItem(
+                text=f"{kind} from {event['number']}",
+                secondary_text=f"{when} - {event['reason'].replace('_', ' ')}"
+            ))
+        if not events:
+            content.add_widget(OneLineIconListItem(text="Nothing blocked yet"))
+        
+        buttons = []
+        if offset + HISTORY_PAGE_SIZE < total:
+            buttons.append(MDFlatButton(
+                text="Older",
+                on_release=lambda x: self.show_history(offset + HISTORY_PAGE_SIZE)
+            ))
+        if offset > 0:
+            buttons.append(MDFlatButton(
+                text="Newer",
+                on_release=lambda x: self.show_history(max(offset - HISTORY_PAGE_SIZE, 0))
+            ))
+        buttons.append(MDFlatButton(text="Close", on_release=self.close_dialog))
+        
+        self.dialog = MDDialog(
+            title=f"Blocked History ({total})",
+            type="custom",
+            content_cls=content,
+            buttons=buttons
+        )
+        self.dialog.open()
+
     def close_dialog(self, *args):
         self.dialog.dismiss()
         self.dialog = None
@@ -416,15 +560,15 @@ class CallScreenApp(MDApp):
             if keyword:
                 self.sms_screener.add_keyword_filter(keyword)
         else:
-            number = self.dialog_text.text.strip()
-            if number:
-                if dialog_type == 'call':
-                    self.call_screener.add_blocked_number(number)
-                else:
-                    self.sms_screener.add_blocked_number(number)
+            # Several numbers can be pasted at once, separated by commas or semicolons
+            numbers = [n.strip() for n in re.split(r'[,;\n]+', self.dialog_text.text) if n.strip()]
+            if numbers:
+                self.call_screener.add_blocked_numbers(numbers)
         self.close_dialog()
 
     def on_start(self):
+        Window.bind(on_flip=self._on_first_frame)
+        threading.Thread(target=self.load_settings, name='settings-loader', daemon=True).start()
         # Check permissions when app starts
         if platform == "android":
             from android.permissions import request_permissions, Permission
@@ -434,7 +578,45 @@ class CallScreenApp(MDApp):
                 Permission.READ_SMS,
                 Permission.RECEIVE_SMS,
                 Permission.READ_CONTACTS  
-            ])
+            ], self.on_permissions_result)
+
+    def on_permissions_result(self, permissions, grants):
+        """Load the contacts once the app may read them"""
+        from android.permissions import Permission
+        if Permission.READ_CONTACTS in permissions and grants[permissions.index(Permission.READ_CONTACTS)]:
+            # The settings loader may have tried before the grant came in
+            self.call_screener.contacts.refresh_in_background()
+
+    def _on_first_frame(self, *args):
+        Window.unbind(on_flip=self._on_first_frame)
+        startup_trace.mark('first frame')
+        startup_trace.report()
+
+    def on_pause(self):
+        self.save_state()
+        # The app may be killed while paused, so show held digests now
+        self.call_screener.notifier.flush()
+        return True
+
+    def on_stop(self):
+        self.save_state()
+        self.call_screener.notifier.shutdown()
+
+    def save_state(self):
+        """Persist runtime state that is not saved on every change"""
+        if not self.settings_loaded:
+            # Saving now would overwrite the files with half-loaded state
+            return
+        self.sms_screener.save_rate_limits()
+        self.sms_screener.save_classifier()
+        self.call_screener.history.flush()
+        self.call_screener.save_number_filter()
+        self.sms_screener.save_number_filter()
+
+    def on_resume(self):
+        # Contacts may have been edited while the app was in the background
+        self.call_screener.contacts.refresh_in_background()
+        return True
 
 if __name__ == '__main__':
     CallScreenApp().run()
@@ -0,0 +1,287 @@
+from collections import deque
+import re
+
+from text_normalizer import normalize_message
+
+# A whole pattern of the form \b(alternative|alternative)\b
+_WORD_LIST = re.compile(r'\\b\((.+)\)\\b')
+_PLAIN_WORDS = re.compile(r'[a-z0-9]+(?: [a-z0-9]+)*')
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher that finds every pattern in one pass"""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._values = [None]
+        self._dict_link = [0]
+        self._nodes = {}
+        self._removed = 0
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, pattern):
+        return pattern in self._nodes
+
+    def add(self, pattern, value=None):
+        """Add a pattern (or replace its value); failure links are rebuilt lazily"""
+        if not pattern:
+            return
+        node = 0
+        for char in pattern:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._values.append(None)
+                self._dict_link.append(0)
+            node = child
+        self._values[node] = (pattern, value)
+        self._nodes[pattern] = node
+        self._dirty = True
+
+    def remove(self, pattern):
+        """Remove a pattern, returning True if it was present"""
+        node = self._nodes.pop(pattern, None)
+        if node is None:
+            return False
+        self._values[node] = None
+        self._removed += 1
+        self._dirty = True
+        # Dead branches are only reclaimed once they outweigh the live ones
+        if self._removed > len(self._nodes):
+            self._compact()
+        return True
+
+    def clear(self):
+        self.__init__()
+
+    def _compact(self):
+        """Rebuild the trie from the live patterns, dropping dead nodes"""
+        live = [self._values[node] for node in self._nodes.values()]
+        self.__init__()
+        for pattern, value in live:
+            self.add(pattern, value)
+
+    def _build(self):
+        """Compute failure and dictionary-suffix links breadth first"""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            self._dict_link[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                fail = self._fail[child]
+                self._dict_link[child] = fail if self._values[fail] is not None else self._dict_link[fail]
+                queue.append(child)
+
+        self._dirty = False
+
+    def iter_matches(self, text):
+        """Yield (end_index, pattern, value) for every occurrence in text"""
+        if not self._nodes:
+            return
+        if self._dirty:
+            self._build()
+
+        goto = self._goto
+        fail = self._fail
+        values = self._values
+        dict_link = self._dict_link
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            hit = node if values[node] is not None else dict_link[node]
+            while hit:
+                pattern, value = values[hit]
+                yield index, pattern, value
+                hit = dict_link[hit]
+
+    def find_all(self, text):
+        """Return the distinct values of every pattern found in text"""
+        found = {}
+        for _, pattern, value in self.iter_matches(text):
+            found.setdefault(pattern, value)
+        return list(found.values())
+
+
+class DigitTrie:
+    """Prefix trie over number strings; lookups walk at most len(number) nodes"""
+
+    def __init__(self):
+        self._root = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, prefix, value):
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        if None not in node:
+            self._size += 1
+        # The None key holds the values terminating at this node
+        node.setdefault(None, []).append(value)
+
+    def iter_prefixes(self, number):
+        """Yield the values of every stored prefix of number, shortest first"""
+        node = self._root
+        if None in node:
+            yield from node[None]
+        for char in number:
+            node = node.get(char)
+            if node is None:
+                return
+            if None in node:
+                yield from node[None]
+
+
+class RuleMatcher:
+    """Compiled form of CallScreener.rules
+
+    'prefix' rules live in a DigitTrie and 'pattern' rules in an Aho-Corasick
+    automaton, so matching a number costs O(len(number)) regardless of how
+    many rules are loaded. When several rules match, the one listed first in
+    the rules list wins, as it did with the old linear scan.
+
+    prefix_key and pattern_key canonicalize rule values so they line up with
+    the normalized numbers being matched.
+    """
+
+    def __init__(self, rules=None, prefix_key=None, pattern_key=None):
+        self.rules = []
+        self.prefix_key = prefix_key
+        self.pattern_key = pattern_key
+        self._prefixes = DigitTrie()
+        self._patterns = AhoCorasick()
+        self.compile(rules or [])
+
+    def compile(self, rules):
+        """Rebuild the matcher from a list of {'type', 'value'} rules"""
+        self.rules = list(rules)
+        self._prefixes = DigitTrie()
+        self._patterns = AhoCorasick()
+        for index, rule in enumerate(self.rules):
+            rule_type = rule.get('type')
+            value = rule.get('value', '')
+            if rule_type == 'prefix' and self.prefix_key:
+                value = self.prefix_key(value)
+            elif rule_type == 'pattern' and self.pattern_key:
+                value = self.pattern_key(value)
+            # An empty pattern occurs in every number, same as an empty prefix
+            if rule_type == 'prefix' or (rule_type == 'pattern' and not value):
+                self._prefixes.add(value, index)
+            elif rule_type == 'pattern' and value not in self._patterns:
+                self._patterns.add(value, index)
+
+    def match(self, number):
+        """Return the first rule matching number, or None"""
+        best = None
+        for index in self._prefixes.iter_prefixes(number):
+            if best is None or index < best:
+                best = index
+        for _, _, index in self._patterns.iter_matches(number):
+            if best is None or index < best:
+                best = index
+        return self.rules[best] if best is not None else None
+
+    def __len__(self):
+        return len(self.rules)
+
+
+class CategoryMatcher:
+    """Spam pattern categories compiled into word sets and combined regexes
+
+    Patterns of the form \\b(word|word|two words)\\b are word lists: their
+    single words go into a set tested against the message's token set and
+    their phrases into substring tests on its words, so they survive the
+    spacing and punctuation tricks normalization undoes. Alternatives that
+    are not plain words, and all other patterns, are joined into one regex
+    per category run over the folded text. Categories keep the priority of
+    their order in the pattern dict.
+    """
+
+    def __init__(self, spam_patterns=None, active_categories=None):
+        self._categories = []
+        if spam_patterns is not None:
+            self.compile(spam_patterns, active_categories)
+
+    def compile(self, spam_patterns, active_categories=None):
+        """Rebuild the word sets and regexes from the active categories"""
+        self._categories = []
+        for category, patterns in spam_patterns.items():
+            if active_categories is not None and category not in active_categories:
+                continue
+            words = set()
+            phrases = []
+            regexes = []
+            for pattern in patterns:
+                pattern_words, pattern_phrases, regex = _split_word_list(pattern)
+                words.update(pattern_words)
+                phrases.extend(pattern_phrases)
+                if regex is not None:
+                    regexes.append(f'(?:{regex})')
+            if not (words or phrases or regexes):
+                continue
+            regex = re.compile('|'.join(regexes)) if regexes else None
+            self._categories.append((category, frozenset(words), tuple(phrases), regex))
+
+    def _matches(self, message, words, phrases, regex):
+        if not words.isdisjoint(message.tokens):
+            return True
+        for phrase in phrases:
+            if phrase in message.phrase_text:
+                return True
+        return regex is not None and regex.search(message.text) is not None
+
+    def first(self, message, exclude=()):
+        """Return the highest-priority category found in a message, or None"""
+        message = normalize_message(message)
+        for category, words, phrases, regex in self._categories:
+            if category in exclude:
+                continue
+            if self._matches(message, words, phrases, regex):
+                return category
+        return None
+
+    def all(self, message):
+        """Return every category found in a message, in priority order"""
+        message = normalize_message(message)
+        return [category for category, words, phrases, regex in self._categories
+                if self._matches(message, words, phrases, regex)]
+
+
+def _split_word_list(pattern):
+    """Split a \\b(...)\\b pattern into (words, ' phrases ', leftover regex or None)"""
+    match = _WORD_LIST.fullmatch(pattern)
+    if match is None or '(' in match.group(1):
+        return (), (), pattern
+    words = []
+    phrases = []
+    leftover = []
+    for alternative in match.group(1).split('|'):
+        if not _PLAIN_WORDS.fullmatch(alternative):
+            leftover.append(alternative)
+        elif ' ' in alternative:
+            phrases.append(f' {alternative} ')
+        else:
+            words.append(alternative)
+    regex = r'\b(?:' + '|'.join(leftover) + r')\b' if leftover else None
+    return words, phrases, regex
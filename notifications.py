@@ -0,0 +1,154 @@
+import queue
+import threading
+import time
+
+try:
+    from plyer import notification
+except ImportError:
+    # Headless runs, such as the screening daemon, have no desktop notifications
+    notification = None
+
+_FLUSH = object()
+_STOP = object()
+
+
+def _describe_window(seconds):
+    if seconds == 60:
+        return 'minute'
+    if seconds % 60 == 0:
+        return f'{seconds // 60} minutes'
+    return f'{seconds} seconds'
+
+
+def _notify(title, message):
+    if notification is None:
+        print(f"{title}: {message}")
+        return
+    notification.notify(title=title, message=message, app_icon=None, timeout=10)
+
+
+class _Digest:
+    """Blocked events held back while a burst is in progress"""
+
+    def __init__(self, label, started):
+        self.label = label
+        self.started = started
+        self.reasons = set()
+        self.messages = []
+
+    def add(self, reason, message):
+        self.reasons.add(reason)
+        self.messages.append(message)
+
+
+class NotificationDispatcher:
+    """Shows blocked-call/SMS notifications from a background thread
+
+    post() only queues the event, so a slow notification backend never
+    delays a screening decision. The first event for a reason is shown at
+    once; further events under the same title within reason_interval
+    seconds are held and shown as one digest ("12 SMS blocked in the last
+    minute") once window seconds have passed.
+    """
+
+    def __init__(self, notify=None, window=60, reason_interval=60, clock=time.monotonic):
+        self.notify = notify or _notify
+        self.window = window
+        self.reason_interval = reason_interval
+        self.clock = clock
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pending = {}    # title -> _Digest
+        self._last_sent = {}  # (title, reason) -> when it was last shown
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='notification-dispatcher', daemon=True
+                )
+                self._thread.start()
+
+    def post(self, title, message, reason=None, label='events'):
+        """Queue a notification and return immediately"""
+        self._ensure_started()
+        self._queue.put((title, message, reason, label))
+
+    def flush(self):
+        """Show held digests now instead of waiting for their window"""
+        if self._thread is not None:
+            self._queue.put(_FLUSH)
+
+    def shutdown(self, timeout=5):
+        """Show everything still queued or held, then stop the thread"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self._next_due())
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush_due(force=True)
+                return
+            if item is _FLUSH:
+                self._flush_due(force=True)
+            elif item is not None:
+                self._accept(*item)
+            self._flush_due()
+
+    def _next_due(self):
+        """Seconds until the oldest held digest is due, or None to wait indefinitely"""
+        if not self._pending:
+            return None
+        started = min(digest.started for digest in self._pending.values())
+        return max(0, started + self.window - self.clock())
+
+    def _accept(self, title, message, reason, label):
+        now = self.clock()
+        digest = self._pending.get(title)
+        last = self._last_sent.get((title, reason))
+        if digest is None and (last is None or now - last >= self.reason_interval):
+            self._last_sent[(title, reason)] = now
+            self._send(title, message)
+            return
+        if digest is None:
+            digest = self._pending[title] = _Digest(label, now)
+        digest.add(reason, message)
+
+    def _flush_due(self, force=False):
+        now = self.clock()
+        for title, digest in list(self._pending.items()):
+            if not force and now - digest.started < self.window:
+                continue
+            del self._pending[title]
+            for reason in digest.reasons:
+                self._last_sent[(title, reason)] = now
+            if len(digest.messages) == 1:
+                self._send(title, digest.messages[0])
+            else:
+                self._send(title, f"{len(digest.messages)} {digest.label} blocked in the last "
+                                  f"{_describe_window(self.window)}")
+
+    def _send(self, title, message):
+        try:
+            self.notify(title, message)
+        except Exception as e:
+            print(f"Error showing notification: {e}")
+
+
+_shared_dispatcher = None
+
+
+def shared_dispatcher():
+    """Return the notification dispatcher shared by the call and SMS screeners"""
+    global _shared_dispatcher
+    if _shared_dispatcher is None:
+        _shared_dispatcher = NotificationDispatcher()
+    return _shared_dispatcher
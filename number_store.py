@@ -0,0 +1,192 @@
+from collections import OrderedDict
+from collections.abc import MutableSet
+import sqlite3
+import threading
+
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+def open_database(path):
+    """Return the shared connection for a number database, creating the schema"""
+    with _connections_lock:
+        connection = _connections.get(path)
+        if connection is None:
+            connection = sqlite3.connect(path, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            # The primary key doubles as the lookup index
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS numbers ('
+                'list TEXT NOT NULL, number TEXT NOT NULL, '
+                'PRIMARY KEY (list, number)) WITHOUT ROWID'
+            )
+            # Per-list change counters let derived caches detect edits
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS list_versions ('
+                'list TEXT PRIMARY KEY, version INTEGER NOT NULL)'
+            )
+            connection.commit()
+            _connections[path] = connection
+        return connection
+
+
+def members(numbers_set, numbers):
+    """Return which of numbers are in a plain set or a SQLiteNumberSet"""
+    if isinstance(numbers_set, SQLiteNumberSet):
+        return numbers_set.contains_many(numbers)
+    return {number for number in numbers if number in numbers_set}
+
+
+def close_database(path):
+    with _connections_lock:
+        connection = _connections.pop(path, None)
+    if connection is not None:
+        connection.close()
+
+
+class SQLiteNumberSet(MutableSet):
+    """A set of normalized numbers kept in an indexed SQLite table
+
+    Behaves like the plain sets the screeners used before, but membership
+    checks go to the index instead of holding the whole list in RAM. A small
+    LRU of recent answers saves the query for repeat numbers. Several named
+    lists share one database file.
+    """
+
+    persistent = True
+
+    def __init__(self, path, list_name, cache_size=4096):
+        self.path = path
+        self.list_name = list_name
+        self.cache_size = cache_size
+        self._db = open_database(path)
+        self._lock = threading.RLock()
+        self._cache = OrderedDict()
+
+    def _remember(self, number, present):
+        self._cache[number] = present
+        self._cache.move_to_end(number)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _bump_version(self):
+        self._db.execute(
+            'INSERT OR IGNORE INTO list_versions (list, version) VALUES (?, 0)',
+            (self.list_name,)
+        )
+        self._db.execute(
+            'UPDATE list_versions SET version = version + 1 WHERE list = ?',
+            (self.list_name,)
+        )
+
+    @property
+    def version(self):
+        """Counter bumped in the same transaction as every change to the list"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT version FROM list_versions WHERE list = ?', (self.list_name,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def __contains__(self, number):
+        with self._lock:
+            present = self._cache.get(number)
+            if present is not None:
+                self._cache.move_to_end(number)
+                return present
+            row = self._db.execute(
+                'SELECT 1 FROM numbers WHERE list = ? AND number = ?',
+                (self.list_name, number)
+            ).fetchone()
+            self._remember(number, row is not None)
+            return row is not None
+
+    def contains_many(self, numbers, chunk_size=500):
+        """Return the subset of numbers in the list, querying in chunks"""
+        numbers = list(numbers)
+        found = set()
+        with self._lock:
+            for start in range(0, len(numbers), chunk_size):
+                chunk = numbers[start:start + chunk_size]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._db.execute(
+                    f'SELECT number FROM numbers WHERE list = ? AND number IN ({placeholders})',
+                    [self.list_name] + chunk
+                ).fetchall()
+                found.update(row[0] for row in rows)
+        return found
+
+    def __iter__(self):
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT number FROM numbers WHERE list = ?', (self.list_name,)
+            ).fetchall()
+        return (row[0] for row in rows)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(
+                'SELECT COUNT(*) FROM numbers WHERE list = ?', (self.list_name,)
+            ).fetchone()[0]
+
+    def add(self, number):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR IGNORE INTO numbers (list, number) VALUES (?, ?)',
+                (self.list_name, number)
+            )
+            self._bump_version()
+            self._db.commit()
+            self._remember(number, True)
+
+    def discard(self, number):
+        with self._lock:
+            self._db.execute(
+                'DELETE FROM numbers WHERE list = ? AND number = ?',
+                (self.list_name, number)
+            )
+            self._bump_version()
+            self._db.commit()
+            self._remember(number, False)
+
+    def update(self, numbers, commit=True):
+        """Insert many numbers in one statement, returning how many were new
+
+        With commit=False the rows stay in the open transaction so a bulk
+        import can finish with a single commit().
+        """
+        with self._lock:
+            cursor = self._db.executemany(
+                'INSERT OR IGNORE INTO numbers (list, number) VALUES (?, ?)',
+                ((self.list_name, number) for number in numbers)
+            )
+            self._bump_version()
+            if commit:
+                self._db.commit()
+            self._cache.clear()
+            return cursor.rowcount
+
+    def difference_update(self, numbers, commit=True):
+        """Delete many numbers in one statement, returning how many were removed"""
+        with self._lock:
+            cursor = self._db.executemany(
+                'DELETE FROM numbers WHERE list = ? AND number = ?',
+                ((self.list_name, number) for number in numbers)
+            )
+            self._bump_version()
+            if commit:
+                self._db.commit()
+            self._cache.clear()
+            return cursor.rowcount
+
+    def commit(self):
+        with self._lock:
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM numbers WHERE list = ?', (self.list_name,))
+            self._bump_version()
+            self._db.commit()
+            self._cache.clear()
@@ -0,0 +1,146 @@
+from array import array
+from bisect import bisect_left, bisect_right
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+from bulk_import import iter_feed_numbers
+from phone_numbers import default_normalizer
+
+_MAGIC = b'CSPB'
+_VERSION = 1
+# Magic, version, fence stride, entry count
+_HEADER = struct.Struct('<4sHHQ')
+FENCE_STRIDE = 512
+# 18 digits plus the kind marker still fit in an unsigned 64-bit integer
+_MAX_DIGITS = 18
+
+
+def encode_number(number):
+    """Pack a normalized number into an int, or None if it is not numeric
+
+    The leading marker digit keeps '+12345' and the short code '12345'
+    apart and preserves leading zeros.
+    """
+    if number.startswith('+'):
+        marker, digits = '1', number[1:]
+    else:
+        marker, digits = '2', number
+    if not digits.isdigit() or len(digits) > _MAX_DIGITS:
+        return None
+    return int(marker + digits)
+
+
+def decode_number(key):
+    """Turn a key made by encode_number back into the normalized number"""
+    text = str(key)
+    return '+' + text[1:] if text[0] == '1' else text[1:]
+
+
+def write_packed_blocklist(numbers, path, normalize=None, fence_stride=FENCE_STRIDE):
+    """Write numbers as a sorted array of 64-bit keys followed by a fence index
+
+    Every fence_stride-th key is repeated in the fence so a lookup can
+    narrow to one block before its binary search touches the main array.
+    Returns the number of entries written.
+    """
+    normalize = normalize or default_normalizer.normalize
+    keys = set()
+    for number in numbers:
+        key = encode_number(normalize(number))
+        if key is not None:
+            keys.add(key)
+    values = array('Q', sorted(keys))
+    fence = values[::fence_stride] if fence_stride else array('Q')
+    if sys.byteorder == 'big':
+        values.byteswap()
+        fence.byteswap()
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, fence_stride, len(values)))
+        f.write(values.tobytes())
+        f.write(fence.tobytes())
+    os.replace(tmp_path, path)
+    return len(values)
+
+
+class PackedBlocklist:
+    """Read-only blocklist memory-mapped from a file written by write_packed_blocklist
+
+    Costs 8 bytes per number, opens in constant time and is shared between
+    processes through the page cache. Lookups are a binary search over the
+    mapped array, narrowed first by the fence index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.fence_stride, self.count = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a packed blocklist")
+
+        start = _HEADER.size
+        end = start + self.count * 8
+        fence_count = -(-self.count // self.fence_stride) if self.fence_stride else 0
+        if sys.byteorder == 'little':
+            self._view = memoryview(self._map)
+            self._values = self._view[start:end].cast('Q')
+            self._fence = self._view[end:end + fence_count * 8].cast('Q')
+        else:
+            # Big-endian hosts pay for a byte-swapped copy instead of the mapping
+            self._values = array('Q')
+            self._values.frombytes(self._map[start:end])
+            self._values.byteswap()
+            self._fence = array('Q')
+            self._fence.frombytes(self._map[end:end + fence_count * 8])
+            self._fence.byteswap()
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return (decode_number(key) for key in self._values)
+
+    def __contains__(self, number):
+        key = encode_number(number)
+        if key is None:
+            return False
+        low, high = 0, self.count
+        if len(self._fence):
+            block = bisect_right(self._fence, key) - 1
+            if block < 0:
+                return False
+            low = block * self.fence_stride
+            high = min(low + self.fence_stride, self.count)
+        index = bisect_left(self._values, key, low, high)
+        return index < high and self._values[index] == key
+
+    def close(self):
+        # Views into the mapping must be released before it can close
+        for view in ('_values', '_fence', '_view'):
+            value = getattr(self, view, None)
+            if isinstance(value, memoryview):
+                value.release()
+        self._map.close()
+        self._file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack a blocklist feed for memory-mapped lookups")
+    parser.add_argument('feed', help="CSV, JSONL or text feed of numbers")
+    parser.add_argument('output', help="Packed blocklist file to write")
+    parser.add_argument('--country', default='US', help="Default country for national numbers")
+    args = parser.parse_args()
+
+    default_normalizer.set_default_country(args.country)
+    count = write_packed_blocklist(iter_feed_numbers(args.feed), args.output)
+    print(f"Wrote {count} numbers to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+from functools import lru_cache
+import re
+
+# Calling code, trunk prefix and international dialing prefix per region
+COUNTRIES = {
+    'US': ('1', '1', '011'),
+    'CA': ('1', '1', '011'),
+    'GB': ('44', '0', '00'),
+    'IE': ('353', '0', '00'),
+    'DE': ('49', '0', '00'),
+    'FR': ('33', '0', '00'),
+    'ES': ('34', '', '00'),
+    'IT': ('39', '', '00'),
+    'NL': ('31', '0', '00'),
+    'IN': ('91', '0', '00'),
+    'AU': ('61', '0', '0011'),
+    'NZ': ('64', '0', '00'),
+}
+
+# Numbers this short without a '+' are SMS short codes, not subscriber numbers
+MAX_SHORT_CODE_LENGTH = 6
+
+_NON_DIGITS = re.compile(r'\D')
+_SEPARATORS = re.compile(r'[\s\-().]')
+
+
+class PhoneNumberNormalizer:
+    """Reduce phone numbers to one canonical E.164-style key
+
+    "+1 (555) 123-4567", "5551234567" and "15551234567" all become
+    "+15551234567". Short codes stay as bare digits and alphanumeric sender
+    IDs are upper-cased. Recent inputs are memoized in a bounded LRU so
+    repeat callers skip re-parsing.
+    """
+
+    def __init__(self, default_country='US', cache_size=4096):
+        self.cache_size = cache_size
+        self.set_default_country(default_country)
+
+    def set_default_country(self, country):
+        """Change the region used for numbers dialed without a country code"""
+        country = country.upper()
+        if country not in COUNTRIES:
+            raise ValueError(f"Unsupported country: {country}")
+        self.default_country = country
+        self.calling_code, self.trunk_prefix, self.international_prefix = COUNTRIES[country]
+        # Cached results depend on the region, so start a fresh cache
+        self.normalize = lru_cache(maxsize=self.cache_size)(self._normalize)
+
+    def _normalize(self, number):
+        if number is None:
+            return ''
+        text = str(number).strip()
+        if any(char.isalpha() for char in text):
+            return text.upper()
+
+        digits = _NON_DIGITS.sub('', text)
+        if not digits:
+            return text
+        if text.startswith('+'):
+            return '+' + digits
+        if digits.startswith(self.international_prefix):
+            return '+' + digits[len(self.international_prefix):]
+        if len(digits) <= MAX_SHORT_CODE_LENGTH:
+            return digits
+        return '+' + self._national_to_international(digits)
+
+    def _national_to_international(self, digits):
+        if self.calling_code == '1':
+            # NANP area codes never start with 1, so a leading 1 is the country code
+            return digits if digits.startswith('1') else '1' + digits
+        if self.trunk_prefix and digits.startswith(self.trunk_prefix):
+            return self.calling_code + digits[len(self.trunk_prefix):]
+        return self.calling_code + digits
+
+    def normalize_prefix(self, prefix):
+        """Canonicalize a number prefix the same way as a full number"""
+        text = str(prefix).strip()
+        digits = _NON_DIGITS.sub('', text)
+        if not digits:
+            return ''
+        if text.startswith('+'):
+            return '+' + digits
+        if digits.startswith(self.international_prefix):
+            return '+' + digits[len(self.international_prefix):]
+        return '+' + self._national_to_international(digits)
+
+    def normalize_fragment(self, fragment):
+        """Strip formatting from a substring pattern"""
+        return _SEPARATORS.sub('', str(fragment))
+
+    def cache_info(self):
+        return self.normalize.cache_info()
+
+
+default_normalizer = PhoneNumberNormalizer()
+
+
+def normalize_number(number):
+    """Normalize a number with the shared default normalizer"""
+    return default_normalizer.normalize(number)
+
+
+def set_default_country(country):
+    """Set the default region used by both screeners"""
+    default_normalizer.set_default_country(country)
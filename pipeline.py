@@ -0,0 +1,105 @@
+import time
+
+
+class Check:
+    """One screening check in a pipeline
+
+    run(*args) returns a verdict (should_block, reason) when the check
+    decides the outcome, or None to pass to the next check. cost is the
+    estimated cost in microseconds, used until real timings come in.
+    """
+
+    def __init__(self, name, run, cost=1.0):
+        self.name = name
+        self.run = run
+        self.cost = cost
+        self.runs = 0
+        self.decided = 0
+        self.timed = 0
+        self.elapsed = 0.0
+
+    def decision_rate(self):
+        # Smoothed so a check that has not run yet is neither always nor never decisive
+        return (self.decided + 1) / (self.runs + 2)
+
+    def mean_cost(self):
+        """Measured cost per run in microseconds, or the estimate before any timing"""
+        return self.elapsed / self.timed * 1e6 if self.timed else self.cost
+
+    def rank(self):
+        """Expected cost per decision; running the lowest first minimizes total cost"""
+        return self.mean_cost() / self.decision_rate()
+
+    def decay(self):
+        """Halve the counters so old traffic weighs less than new"""
+        self.runs /= 2
+        self.decided /= 2
+        self.timed /= 2
+        self.elapsed /= 2
+
+
+class CheckPipeline:
+    """Runs screening checks in order until one returns a verdict
+
+    stages lists the checks in their declared order. An item is either a
+    single Check, which keeps its position, or a list of Checks that
+    commute (any order gives the same blocked/allowed outcome, though with
+    several matches the reported reason is the first to run). Commuting
+    checks are reordered every reorder_every runs so that those with the
+    lowest measured cost per decision run first. Timing is sampled on one
+    run in sample_every to keep the clock off the common path.
+    """
+
+    def __init__(self, stages, sample_every=16, reorder_every=1024, clock=time.perf_counter):
+        self.stages = [(list(stage), True) if isinstance(stage, (list, tuple)) else ([stage], False)
+                       for stage in stages]
+        self.sample_every = sample_every
+        self.reorder_every = reorder_every
+        self.clock = clock
+        self.evaluations = 0
+        self.order = [check for checks, _ in self.stages for check in checks]
+
+    def run(self, *args):
+        """Return the first verdict any check gives, or None"""
+        self.evaluations += 1
+        if self.evaluations % self.reorder_every == 0:
+            self.reorder()
+        if self.evaluations % self.sample_every:
+            for check in self.order:
+                check.runs += 1
+                verdict = check.run(*args)
+                if verdict is not None:
+                    check.decided += 1
+                    return verdict
+            return None
+
+        clock = self.clock
+        for check in self.order:
+            check.runs += 1
+            started = clock()
+            verdict = check.run(*args)
+            check.elapsed += clock() - started
+            check.timed += 1
+            if verdict is not None:
+                check.decided += 1
+                return verdict
+        return None
+
+    def reorder(self):
+        """Sort each group of commuting checks by expected cost per decision"""
+        order = []
+        for checks, commute in self.stages:
+            if commute:
+                checks.sort(key=Check.rank)
+            order.extend(checks)
+        for check in order:
+            check.decay()
+        self.order = order
+
+    def snapshot(self):
+        return [{
+            'name': check.name,
+            'runs': check.runs,
+            'decision_rate': check.decision_rate(),
+            'cost_us': check.mean_cost(),
+        } for check in self.order]
@@ -0,0 +1,157 @@
+import datetime
+import time
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+ALL_DAYS = (0, 1, 2, 3, 4, 5, 6)  # Monday first, as in time.localtime()
+
+# Senders that can be let through during quiet hours
+EXEMPTIONS = ('contacts', 'short_codes')
+
+_QUIET = b'\x01'
+_AWAKE = b'\x00'
+
+
+def _fill(slots, begin, length):
+    """Mark length slots quiet from begin, wrapping around the end"""
+    size = len(slots)
+    begin %= size
+    end = begin + length
+    if end <= size:
+        slots[begin:end] = _QUIET * length
+    else:
+        slots[begin:] = _QUIET * (size - begin)
+        slots[:end - size] = _QUIET * (end - size)
+
+
+def _span(start, end):
+    """Length of a window; [0, 1440] is a whole day, equal ends an empty one"""
+    if end >= start:
+        return end - start
+    return end - start + MINUTES_PER_DAY
+
+
+def _split(windows):
+    """Quiet minutes of the [start, end] windows of one day: (that day, spill into the next)"""
+    slots = bytearray(2 * MINUTES_PER_DAY)
+    for start, end in windows:
+        _fill(slots, start, min(_span(start, end), MINUTES_PER_DAY))
+    return slots[:MINUTES_PER_DAY], slots[MINUTES_PER_DAY:]
+
+
+class QuietSchedule:
+    """Weekly quiet hours at minute resolution
+
+    windows are {'days': [weekday, ...], 'start': minute, 'end': minute}
+    with minutes counted from midnight; a window whose end is before its
+    start runs past midnight into the next day. holidays map 'YYYY-MM-DD'
+    to the [start, end] windows that replace the weekly ones starting on
+    that date ([[0, 1440]] is quiet all day, an empty list not at all);
+    they run past midnight the same way. The weekly windows compile into
+    one slot per minute of the week, a holiday and the day after it into
+    one slot per minute of that date, and is_quiet() remembers its answer
+    until the next minute the state changes (or the next hour, so
+    daylight saving changes are picked up), so most calls are a single
+    comparison.
+    """
+
+    def __init__(self, enabled=False, windows=None, holidays=None, exempt=(), clock=time.time):
+        self.enabled = enabled
+        self.windows = [dict(window) for window in windows or ()]
+        self.holidays = {date: [list(window) for window in day]
+                         for date, day in (holidays or {}).items()}
+        self.exempt = set(exempt)
+        self.clock = clock
+        self.compile()
+
+    @classmethod
+    def from_dict(cls, data, clock=time.time):
+        return cls(data.get('enabled', False), data.get('windows'), data.get('holidays'),
+                   data.get('exempt', ()), clock)
+
+    @classmethod
+    def from_hours(cls, enabled, start_hour, end_hour, clock=time.time):
+        """Build the schedule equivalent to the old daily start/end hour setting"""
+        window = {'days': list(ALL_DAYS), 'start': start_hour * 60, 'end': end_hour * 60}
+        return cls(enabled, [window], clock=clock)
+
+    def to_dict(self):
+        return {
+            'enabled': self.enabled,
+            'windows': self.windows,
+            'holidays': self.holidays,
+            'exempt': sorted(self.exempt),
+        }
+
+    def compile(self):
+        """Rebuild the slot tables after the windows or holidays change"""
+        week = bytearray(MINUTES_PER_WEEK)
+        for window in self.windows:
+            length = _span(window['start'], window['end'])
+            for day in window['days']:
+                _fill(week, day * MINUTES_PER_DAY + window['start'], length)
+        self._week = week
+
+        # A date's minutes are its own windows plus those spilling over
+        # from the day before, either of which may be a holiday
+        self._dates = {}
+        for date in self.holidays:
+            try:
+                holiday = datetime.date.fromisoformat(date)
+            except ValueError:
+                continue  # Never matches a real date
+            for day in (holiday, holiday + datetime.timedelta(days=1)):
+                own, _ = self._split_date(day)
+                _, spill = self._split_date(day - datetime.timedelta(days=1))
+                self._dates[day.isoformat()] = bytearray(a | b for a, b in zip(own, spill))
+        self._valid_from = self._valid_until = 0.0
+        self._quiet = False
+
+    def _split_date(self, day):
+        """_split() of the windows that start on a datetime.date"""
+        windows = self.holidays.get(day.isoformat())
+        if windows is None:
+            weekday = day.weekday()
+            windows = [(window['start'], window['end']) for window in self.windows
+                       if weekday in window['days']]
+        return _split(windows)
+
+    def daily_window(self):
+        """(start, end) of the first window, for settings shown as one daily range"""
+        if self.windows:
+            return self.windows[0]['start'], self.windows[0]['end']
+        return 22 * 60, 7 * 60
+
+    def is_quiet(self, now=None):
+        """Check if a moment, by default now, falls within quiet hours"""
+        if not self.enabled:
+            return False
+        if now is None:
+            now = self.clock()
+        if self._valid_from <= now < self._valid_until:
+            return self._quiet
+        return self._evaluate(now)
+
+    def _evaluate(self, now):
+        local = time.localtime(now)
+        minute = local.tm_hour * 60 + local.tm_min
+        slots = self._dates.get(time.strftime('%Y-%m-%d', local)) if self._dates else None
+        if slots is None:
+            slots = self._week
+            offset = local.tm_wday * MINUTES_PER_DAY
+        else:
+            offset = 0
+        quiet = slots[offset + minute] == 1
+
+        # Look for the next change no further than the top of the hour
+        position = offset + minute
+        hour_end = offset + (local.tm_hour + 1) * 60
+        change = slots.find(_AWAKE if quiet else _QUIET, position, hour_end)
+        minutes_left = (change if change != -1 else hour_end) - position
+
+        # Time zone offsets are whole minutes, so local minutes start on UTC ones
+        minute_start = now - now % 60
+        self._valid_from = minute_start
+        self._valid_until = minute_start + minutes_left * 60
+        self._quiet = quiet
+        return quiet
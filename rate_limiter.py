@@ -0,0 +1,160 @@
+from array import array
+from collections import OrderedDict
+import os
+import struct
+import sys
+import time
+
+SLOT_SECONDS = 300          # 5-minute slots
+HOUR_SLOTS = 12             # 12 x 5 minutes make the hourly window
+DAY_BUCKETS = 24            # 24 x 1 hour make the daily window
+SLOTS_PER_BUCKET = 3600 // SLOT_SECONDS
+
+_MAGIC = b'SRL1'
+_HEADER = struct.Struct('<4sI')
+_KEY_LENGTH = struct.Struct('<H')
+# Per sender: last slot seen, then the hourly and daily counters
+_STATE_SIZE = 1 + HOUR_SLOTS + DAY_BUCKETS
+
+
+class SenderRateLimiter:
+    """Sliding-window message counters per sender
+
+    Each sender costs one fixed-size array of counters: twelve 5-minute
+    slots for the hourly window and twenty-four 1-hour buckets for the daily
+    one, so the windows are accurate to one slot. Time comes from a
+    monotonic clock anchored to wall time at startup, which keeps the
+    counters immune to clock changes while still letting saved state line
+    up after a restart. Senders are kept in LRU order and the least recently
+    seen are evicted past max_senders.
+    """
+
+    def __init__(self, max_senders=5000, clock=time.monotonic):
+        self.max_senders = max_senders
+        self._clock = clock
+        self._offset = time.time() - clock()
+        self._senders = OrderedDict()
+
+    def __len__(self):
+        return len(self._senders)
+
+    def _current_slot(self):
+        return int((self._clock() + self._offset) // SLOT_SECONDS)
+
+    def _advance(self, state, slot):
+        """Clear the counters that fell out of the windows since the last message
+
+        Returns the slot to count a new message in. A slot behind the last
+        one seen, as when the wall clock was set back between a save and a
+        load, is clamped to it, since its counter may already hold a newer
+        slot.
+        """
+        last = state[0]
+        if slot <= last:
+            return last
+        if slot - last >= HOUR_SLOTS:
+            for i in range(HOUR_SLOTS):
+                state[1 + i] = 0
+        else:
+            for s in range(last + 1, slot + 1):
+                state[1 + s % HOUR_SLOTS] = 0
+
+        bucket, last_bucket = slot // SLOTS_PER_BUCKET, last // SLOTS_PER_BUCKET
+        if bucket - last_bucket >= DAY_BUCKETS:
+            for i in range(DAY_BUCKETS):
+                state[1 + HOUR_SLOTS + i] = 0
+        else:
+            for b in range(last_bucket + 1, bucket + 1):
+                state[1 + HOUR_SLOTS + b % DAY_BUCKETS] = 0
+        state[0] = slot
+        return slot
+
+    def _is_idle(self, state, slot):
+        return slot - state[0] >= DAY_BUCKETS * SLOTS_PER_BUCKET
+
+    def _evict(self, slot):
+        """Drop senders idle for a full day, then the oldest past the cap"""
+        while self._senders:
+            sender, state = next(iter(self._senders.items()))
+            if len(self._senders) > self.max_senders or self._is_idle(state, slot):
+                del self._senders[sender]
+            else:
+                break
+
+    def counts(self, sender):
+        """Return (messages in the last hour, messages in the last day)"""
+        state = self._senders.get(sender)
+        if state is None:
+            return 0, 0
+        # Advance a copy: a lookup must not make an idle sender look recent
+        state = array('I', state)
+        self._advance(state, self._current_slot())
+        return sum(state[1:1 + HOUR_SLOTS]), sum(state[1 + HOUR_SLOTS:])
+
+    def record(self, sender):
+        """Count a message, returning the (hour, day) counts before it"""
+        slot = self._current_slot()
+        state = self._senders.get(sender)
+        if state is None:
+            state = array('I', [0] * _STATE_SIZE)
+            state[0] = slot
+            self._senders[sender] = state
+            self._evict(slot)
+        else:
+            self._senders.move_to_end(sender)
+            slot = self._advance(state, slot)
+
+        hour, day = sum(state[1:1 + HOUR_SLOTS]), sum(state[1 + HOUR_SLOTS:])
+        state[1 + slot % HOUR_SLOTS] += 1
+        state[1 + HOUR_SLOTS + (slot // SLOTS_PER_BUCKET) % DAY_BUCKETS] += 1
+        return hour, day
+
+    def clear(self):
+        self._senders.clear()
+
+    def save(self, path):
+        """Write the counters to a compact binary file via an atomic rename"""
+        slot = self._current_slot()
+        self._evict(slot)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, len(self._senders)))
+            for sender, state in self._senders.items():
+                key = sender.encode('utf-8')
+                f.write(_KEY_LENGTH.pack(len(key)))
+                f.write(key)
+                if sys.byteorder == 'big':
+                    state = array('I', state)
+                    state.byteswap()
+                f.write(state.tobytes())
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Restore counters written by save, skipping senders gone idle"""
+        if not os.path.exists(path):
+            return False
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a rate limiter state file")
+
+        slot = self._current_slot()
+        state_bytes = _STATE_SIZE * array('I').itemsize
+        offset = _HEADER.size
+        senders = OrderedDict()
+        for _ in range(count):
+            (key_length,) = _KEY_LENGTH.unpack_from(data, offset)
+            offset += _KEY_LENGTH.size
+            sender = data[offset:offset + key_length].decode('utf-8')
+            offset += key_length
+            state = array('I')
+            state.frombytes(data[offset:offset + state_bytes])
+            offset += state_bytes
+            if sys.byteorder == 'big':
+                state.byteswap()
+            if not self._is_idle(state, slot):
+                senders[sender] = state
+        self._senders = senders
+        self._evict(slot)
+        return True
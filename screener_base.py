@@ -0,0 +1,121 @@
+from blocklists import BlocklistMixin
+from instrumentation import StatsDumper
+
+
+class ScreenerBase(BlocklistMixin):
+    """Settings plumbing and list handling shared by the call and SMS screeners
+
+    The screener sets up normalizer, contacts, whitelist, store,
+    block_non_contacts, settings_version, ready and ready_timeout, the
+    verdict_cache and stats, and provides save_settings() and is_contact().
+    For statistics it names its _decision_method and lists the checks to
+    time in _stat_stages() and its pipelines' state in _pipeline_stats().
+    """
+
+    def _record(self, op, key, value=None):
+        """Journal a single settings change, compacting when the journal grows"""
+        self._settings_changed()
+        try:
+            self.store.append(op, key, value)
+        except Exception as e:
+            print(f"Error saving settings: {e}")
+            return
+        if self.store.needs_compaction():
+            self.save_settings()
+
+    def settings_ready(self):
+        """Wait briefly for settings still loading in the background
+
+        Until they are loaded, decisions fail open: letting one unwanted
+        call or message through beats blocking a wanted one on a
+        half-loaded rule set.
+        """
+        return self.ready.is_set() or self.ready.wait(self.ready_timeout)
+
+    def _settings_changed(self):
+        """Invalidate every cached verdict"""
+        self.settings_version += 1
+
+    def _verdict_version(self):
+        """Return the state cached verdicts are valid for"""
+        if not self.block_non_contacts:
+            return self.settings_version
+        # Cache hits skip is_contact, so check the index for changes here
+        self.contacts.refresh_if_stale()
+        return self.settings_version, self.contacts.version
+
+    def normalize(self, number):
+        """Reduce a number to its canonical form"""
+        return self.normalizer.normalize(number)
+
+    def is_whitelisted(self, number):
+        """Check a normalized number against the whitelist"""
+        return number in self.whitelist
+
+    def add_to_whitelist(self, number):
+        """Add a number to the whitelist"""
+        number = self.normalize(number)
+        if number not in self.whitelist:
+            self.whitelist.add(number)
+            self._record_number('add', 'whitelist', number)
+        if number in self.blocked_numbers:
+            self.blocked_numbers.remove(number)
+            self.number_filter.removed()
+            self._record_number('discard', 'blocked', number)
+            self._check_number_filter()
+
+    # Sender checks for the screeners' pipelines
+    def _whitelist_check(self, number):
+        if self.is_whitelisted(number):
+            return False, None
+        return None
+
+    def _blocklist_check(self, number):
+        if self.is_blocked_number(number):
+            return True, 'blocked_number'
+        return None
+
+    def _contacts_check(self, number):
+        if self.block_non_contacts and not self.is_contact(number):
+            return True, 'unknown_number'
+        return None
+
+    def enable_stats(self, dump_path=None, dump_interval=300):
+        """Start timing each check and counting verdicts
+
+        With dump_path set, a snapshot of get_stats() is also written there
+        every dump_interval seconds.
+        """
+        self.stats.enable(self._stat_stages(), (self, self._decision_method))
+        if dump_path and self._stats_dumper is None:
+            self._stats_dumper = StatsDumper(dump_path, self.get_stats, dump_interval)
+            self._stats_dumper.start()
+
+    def disable_stats(self):
+        """Stop instrumenting; counters collected so far are kept"""
+        self.stats.disable()
+        if self._stats_dumper is not None:
+            self._stats_dumper.stop()
+            self._stats_dumper = None
+
+    def get_stats(self):
+        """Return stage timings, block counts and cache hit rates"""
+        stats = self.stats.snapshot()
+        stats['pipeline'] = self._pipeline_stats()
+        normalizer = self.normalizer.cache_info()
+        normalizer_lookups = normalizer.hits + normalizer.misses
+        stats['caches'] = {
+            'verdicts': {
+                'hits': self.verdict_cache.hits,
+                'misses': self.verdict_cache.misses,
+                'hit_rate': self.verdict_cache.hit_rate(),
+                'size': len(self.verdict_cache),
+            },
+            'number_filter': dict(self.number_filter.stats, hit_rate=self.number_filter.hit_rate()),
+            'normalizer': {
+                'hits': normalizer.hits,
+                'misses': normalizer.misses,
+                'hit_rate': normalizer.hits / normalizer_lookups if normalizer_lookups else 0.0,
+            },
+        }
+        return stats
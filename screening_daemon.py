@@ -0,0 +1,518 @@
+"""Headless screening server for running the call and SMS rules off-device
+
+Serves verdicts as JSON over HTTP on a Unix socket (the default) or a TCP
+port, with no Kivy dependency. Settings files are read from --data-dir, as
+the app writes them:
+
+    python screening_daemon.py --data-dir /var/lib/screener --socket screener.sock
+    curl --unix-socket screener.sock -d '{"number": "+15551234567", "message": "hi"}' http://localhost/sms
+
+Endpoints: POST /sms {"number", "message"}, POST /call {"number"},
+POST /sms/batch {"messages": [{"number", "message"}, ...]}, GET /metrics
+and GET /health. Verdicts are {"block": bool, "reason": str or null}.
+
+Requests are decided by a pool of worker processes forked from one loaded
+copy of the screeners, so the compiled rules are shared copy-on-write.
+Each sender number always goes to the same worker, which keeps its rate
+limits and cached verdicts consistent. The workers never write the
+settings, the number filter caches or the database; rate limit counters
+live only in their memory. With --database, number lists the app left in
+the JSON files are moved into the database once, before the workers start.
+"""
+from collections import Counter, deque
+from functools import partial
+from zlib import crc32
+import argparse
+import asyncio
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from call_screener import CallScreener
+from instrumentation import LatencyHistogram
+from number_store import close_database
+from phone_numbers import default_normalizer
+from sms_screener import SMSScreener
+
+DEFAULT_SOCKET = 'screener.sock'
+MAX_BODY = 4 * 1024 * 1024
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+def load_screeners(database=None, read_only=True):
+    """Load both screeners from the settings files in the working directory"""
+    call_screener = CallScreener(database=database, read_only=read_only)
+    sms_screener = SMSScreener(database=database, read_only=read_only)
+    call_screener.is_active = True
+    sms_screener.is_active = True
+    return call_screener, sms_screener
+
+
+def _screen_call(call_screener, sms_screener, number):
+    return call_screener.check_call(number)
+
+
+def _screen_sms(call_screener, sms_screener, number, message):
+    return sms_screener.should_block_sms(number, message)
+
+
+def _screen_sms_batch(call_screener, sms_screener, messages):
+    # Messages reaching the gateway are new traffic, so they count towards limits
+    return sms_screener.screen_sms(messages, check_frequency=True)
+
+
+def _worker_stats(call_screener, sms_screener):
+    return {'pid': os.getpid(), 'calls': call_screener.get_stats(), 'sms': sms_screener.get_stats()}
+
+
+_OPERATIONS = {
+    'call': _screen_call,
+    'sms': _screen_sms,
+    'sms_batch': _screen_sms_batch,
+    'stats': _worker_stats,
+}
+
+
+def _worker_main(conn, screeners, loader, inherited=()):
+    """Answer (operation, args) requests from the server until told to stop"""
+    # The server stops the workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Pipes to the workers forked earlier would otherwise stay open in this one
+    for other in inherited:
+        other.close()
+    if screeners is None:
+        screeners = loader()
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        operation, args = request
+        try:
+            reply = True, _OPERATIONS[operation](*screeners, *args)
+        except Exception as e:
+            reply = False, f"{type(e).__name__}: {e}"
+        conn.send(reply)
+
+
+class _Worker:
+    def __init__(self, process, conn, max_pending):
+        self.process = process
+        self.conn = conn
+        self.pending = deque()  # Futures in request order; replies come back in order
+        self.slots = asyncio.Semaphore(max_pending)
+
+
+class WorkerPool:
+    """Screening worker processes, one shard of the sender numbers each
+
+    With the fork start method the screeners are loaded once here and the
+    workers inherit them; elsewhere, or when share is off (SQLite
+    connections must not cross a fork), every worker runs loader itself.
+    Each worker has at most max_pending requests in flight so neither
+    side of its pipe can fill up.
+    """
+
+    def __init__(self, workers, loader=load_screeners, share=True, max_pending=64):
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        forked = context.get_start_method() == 'fork'
+        screeners = loader() if share and forked else None
+        self._workers = []
+        self._loop = None
+        for _ in range(max(1, workers)):
+            conn, child_conn = context.Pipe()
+            inherited = [worker.conn for worker in self._workers] if forked else []
+            process = context.Process(target=_worker_main, args=(child_conn, screeners, loader, inherited),
+                                      daemon=True)
+            process.start()
+            child_conn.close()
+            self._workers.append(_Worker(process, conn, max_pending))
+
+    def __len__(self):
+        return len(self._workers)
+
+    def alive(self):
+        """Number of workers still running"""
+        return sum(worker.process.is_alive() for worker in self._workers)
+
+    def start(self):
+        """Start taking replies on the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        for worker in self._workers:
+            self._loop.add_reader(worker.conn.fileno(), self._receive, worker)
+
+    def _receive(self, worker):
+        try:
+            while worker.conn.poll():
+                ok, value = worker.conn.recv()
+                future = worker.pending.popleft()
+                if future.cancelled():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(RuntimeError(value))
+        except (EOFError, OSError):
+            self._loop.remove_reader(worker.conn.fileno())
+            while worker.pending:
+                future = worker.pending.popleft()
+                if not future.done():
+                    future.set_exception(RuntimeError("Screening worker exited"))
+
+    def shard(self, number):
+        """Index of the worker that screens a sender"""
+        key = default_normalizer.normalize(number).encode('utf-8')
+        return crc32(key) % len(self._workers)
+
+    async def call(self, index, operation, *args):
+        """Run an operation on one worker and return its result"""
+        worker = self._workers[index]
+        async with worker.slots:
+            if not worker.process.is_alive():
+                raise RuntimeError("Screening worker exited")
+            future = self._loop.create_future()
+            worker.pending.append(future)
+            worker.conn.send((operation, args))
+            return await future
+
+    async def run(self, operation, number, *args):
+        """Run an operation on the worker for a sender number"""
+        return await self.call(self.shard(number), operation, number, *args)
+
+    async def broadcast(self, operation, *args):
+        return await asyncio.gather(*(self.call(index, operation, *args)
+                                      for index in range(len(self._workers))))
+
+    def stop(self):
+        """Stop taking replies, before the event loop closes"""
+        if self._loop is not None:
+            for worker in self._workers:
+                if not worker.conn.closed:
+                    self._loop.remove_reader(worker.conn.fileno())
+            self._loop = None
+
+    def close(self, timeout=5):
+        """Shut the workers down"""
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.conn.close()
+        for worker in self._workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+
+class DaemonMetrics:
+    """Request counts, latency histograms and throughput per endpoint"""
+
+    def __init__(self, window=60, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self.started = clock()
+        self.latency = {}
+        self.errors = Counter()
+        self.verdicts = Counter()
+        self.screened = 0
+        self._recent = deque()  # [second, items screened] for the last window seconds
+
+    def record(self, route, seconds, verdicts=()):
+        self.latency.setdefault(route, LatencyHistogram()).record(seconds)
+        items = 0
+        for should_block, reason in verdicts:
+            self.verdicts[reason if should_block else 'allowed'] += 1
+            items += 1
+        if not items:
+            return
+        self.screened += items
+        second = int(self.clock())
+        if self._recent and self._recent[-1][0] == second:
+            self._recent[-1][1] += items
+        else:
+            self._recent.append([second, items])
+
+    def record_error(self, route):
+        self.errors[route] += 1
+
+    def snapshot(self):
+        now = self.clock()
+        uptime = now - self.started
+        while self._recent and self._recent[0][0] <= now - self.window:
+            self._recent.popleft()
+        recent_span = min(self.window, uptime) or 1.0
+        return {
+            'uptime_s': uptime,
+            'screened': self.screened,
+            'screened_per_s': self.screened / uptime if uptime else 0.0,
+            'recent_screened_per_s': sum(items for _, items in self._recent) / recent_span,
+            'verdicts': dict(self.verdicts),
+            'errors': dict(self.errors),
+            'latency': {route: histogram.snapshot() for route, histogram in self.latency.items()},
+        }
+
+
+class ScreeningServer:
+    """Minimal HTTP/1.1 front end for a WorkerPool, with keep-alive
+
+    Endpoint handlers return (JSON payload, verdicts given) so the
+    metrics can count verdicts by reason.
+    """
+
+    def __init__(self, pool, metrics=None):
+        self.pool = pool
+        self.metrics = metrics or DaemonMetrics()
+        self.server = None
+        self._connections = set()
+        self._routes = {
+            '/sms': ('POST', self._sms),
+            '/call': ('POST', self._call),
+            '/sms/batch': ('POST', self._sms_batch),
+            '/metrics': ('GET', self._metrics),
+            '/health': ('GET', self._health),
+        }
+
+    async def start(self, socket_path=None, host='127.0.0.1', port=None):
+        self.pool.start()
+        if port is not None:
+            self.server = await asyncio.start_server(self._handle, host, port)
+        else:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)  # Left over from a previous run
+            self.server = await asyncio.start_unix_server(self._handle, socket_path)
+        return self.server
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        # Idle keep-alive connections would otherwise be cancelled mid-read
+        for writer in list(self._connections):
+            writer.close()
+        while self._connections:
+            await asyncio.sleep(0.01)
+        self.pool.stop()
+
+    async def _handle(self, reader, writer):
+        self._connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode('latin-1').split(None, 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {'error': 'request body too large'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and not version.strip().endswith('1.0'))
+                status, payload = await self._dispatch(method, path.split('?', 1)[0], body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def _dispatch(self, method, path, body):
+        route = self._routes.get(path)
+        if route is None:
+            return 404, {'error': f'no such endpoint {path}'}
+        allowed, handler = route
+        if method != allowed:
+            return 405, {'error': f'{path} takes {allowed}'}
+        try:
+            request = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {'error': 'body is not valid JSON'}
+        started = time.perf_counter()
+        try:
+            payload, verdicts = await handler(request)
+        except (KeyError, TypeError, AttributeError) as e:
+            self.metrics.record_error(path)
+            return 400, {'error': f'bad request: {e}'}
+        except RuntimeError as e:
+            self.metrics.record_error(path)
+            return 500, {'error': str(e)}
+        except Exception as e:
+            # Anything else is a bug; answer it rather than drop the connection
+            self.metrics.record_error(path)
+            print(f"Error handling {method} {path}: {e!r}")
+            return 500, {'error': 'internal error'}
+        self.metrics.record(path, time.perf_counter() - started, verdicts)
+        return 200, payload
+
+    @staticmethod
+    def _verdict(verdict):
+        should_block, reason = verdict
+        return {'block': should_block, 'reason': reason}
+
+    async def _sms(self, request):
+        verdict = await self.pool.run('sms', str(request['number']), str(request['message']))
+        return self._verdict(verdict), [verdict]
+
+    async def _call(self, request):
+        verdict = await self.pool.run('call', str(request['number']))
+        return self._verdict(verdict), [verdict]
+
+    async def _sms_batch(self, request):
+        messages = [(str(item['number']), str(item['message'])) for item in request['messages']]
+        shards = {}
+        for position, (number, message) in enumerate(messages):
+            shards.setdefault(self.pool.shard(number), []).append(position)
+        results = await asyncio.gather(*(
+            self.pool.call(index, 'sms_batch', [messages[position] for position in positions])
+            for index, positions in shards.items()
+        ))
+        verdicts = [None] * len(messages)
+        for positions, shard_verdicts in zip(shards.values(), results):
+            for position, verdict in zip(positions, shard_verdicts):
+                verdicts[position] = verdict
+        return {'verdicts': [self._verdict(verdict) for verdict in verdicts]}, verdicts
+
+    async def _metrics(self, request):
+        metrics = self.metrics.snapshot()
+        metrics['workers'] = await self.pool.broadcast('stats')
+        return metrics, ()
+
+    async def _health(self, request):
+        alive = self.pool.alive()
+        status = 'ok' if alive == len(self.pool) else 'degraded'
+        return {'status': status, 'workers': len(self.pool), 'alive': alive}, ()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ScreeningClient:
+    """Blocking client for the daemon, over its Unix socket or TCP port"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, host='127.0.0.1', port=None, timeout=10):
+        if port is not None:
+            self._connection = http.client.HTTPConnection(host, port, timeout=timeout)
+        else:
+            self._connection = _UnixHTTPConnection(socket_path, timeout)
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload) if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        self._connection.request(method, path, body, headers)
+        response = self._connection.getresponse()
+        data = json.loads(response.read())
+        if response.status != 200:
+            raise RuntimeError(f"Screening daemon error {response.status}: {data.get('error')}")
+        return data
+
+    def check_sms(self, number, message):
+        """Return (should_block, reason) for an incoming SMS"""
+        data = self._request('POST', '/sms', {'number': number, 'message': message})
+        return data['block'], data['reason']
+
+    def check_call(self, number):
+        """Return (should_block, reason) for an incoming call"""
+        data = self._request('POST', '/call', {'number': number})
+        return data['block'], data['reason']
+
+    def screen_sms(self, messages):
+        """Return (should_block, reason) for each (number, message) pair"""
+        payload = {'messages': [{'number': number, 'message': message} for number, message in messages]}
+        data = self._request('POST', '/sms/batch', payload)
+        return [(verdict['block'], verdict['reason']) for verdict in data['verdicts']]
+
+    def metrics(self):
+        return self._request('GET', '/metrics')
+
+    def health(self):
+        return self._request('GET', '/health')
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+async def serve(pool, socket_path=DEFAULT_SOCKET, host='127.0.0.1', port=None):
+    """Serve until SIGINT or SIGTERM"""
+    server = ScreeningServer(pool)
+    await server.start(socket_path, host, port)
+    address = f'{host}:{port}' if port is not None else socket_path
+    print(f"Screening daemon listening on {address} with {len(pool)} workers")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    await stop.wait()
+    await server.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve call and SMS screening verdicts without the app")
+    parser.add_argument('--data-dir', default='.', help="Directory holding the app's settings files")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help="Unix socket path, relative to --data-dir")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help="Listen on TCP instead of the Unix socket")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--database', help="SQLite file for the number lists, if the app uses one")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.chdir(args.data_dir)
+    if args.database:
+        # Migrate here, once, rather than in every worker at the same time
+        load_screeners(args.database, read_only=False)
+        close_database(args.database)
+    # Workers are forked here, before the event loop or any thread exists
+    pool = WorkerPool(args.workers, partial(load_screeners, args.database), share=not args.database)
+    try:
+        asyncio.run(serve(pool, args.socket, args.host, args.port))
+    finally:
+        pool.close()
+        if args.port is None and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == '__main__':
+    main()
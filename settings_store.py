@@ -0,0 +1,116 @@
+import json
+import os
+
+
+class JournaledStore:
+    """JSON settings snapshot plus an append-only journal of mutations
+
+    Mutations append one small JSON line to <path>.journal instead of
+    rewriting the whole file. Once enough records pile up the owner writes
+    a fresh snapshot with compact(), which goes through a temporary file and
+    an atomic rename so a crash never leaves a half-written snapshot.
+    Records carry a sequence number and the snapshot remembers the last one
+    it includes, so replaying a journal that outlived its compaction is
+    harmless. A read_only store leaves the files alone, even a torn journal
+    tail that another process may still be writing.
+
+    Journal operations:
+        set      data[key] = value
+        add      add value to the set stored under key
+        discard  remove value from the set stored under key
+        append   append value to the list stored under key
+        remove   remove value from the list stored under key
+    """
+
+    def __init__(self, path, compact_every=500, read_only=False):
+        self.path = path
+        self.read_only = read_only
+        self.journal_path = path + '.journal'
+        self.compact_every = compact_every
+        self._seq = 0
+        self._pending = 0
+
+    @property
+    def sequence(self):
+        """Number of the last journaled mutation"""
+        return self._seq
+
+    def load(self):
+        """Return the snapshot with the journal tail replayed on top"""
+        data = {}
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        self._seq = data.pop('_seq', 0)
+        snapshot_seq = self._seq
+        self._pending = 0
+
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb') as f:
+                raw = f.read()
+            valid = 0
+            for line in raw.splitlines(keepends=True):
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("unterminated record")
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash mid-append can leave a torn final record
+                    break
+                valid += len(line)
+                if record['n'] <= snapshot_seq:
+                    continue
+                self._apply(data, record)
+                self._seq = record['n']
+                self._pending += 1
+            if valid < len(raw) and not self.read_only:
+                # Cut the torn tail so later appends start on a clean line
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(valid)
+        return data
+
+    def _apply(self, data, record):
+        op, key, value = record['op'], record['key'], record.get('value')
+        if op == 'set':
+            data[key] = value
+        elif op in ('add', 'discard'):
+            values = data.get(key)
+            if not isinstance(values, set):
+                values = data[key] = set(values or [])
+            if op == 'add':
+                values.add(value)
+            else:
+                values.discard(value)
+        elif op == 'append':
+            data.setdefault(key, []).append(value)
+        elif op == 'remove':
+            values = data.get(key, [])
+            if value in values:
+                values.remove(value)
+
+    def append(self, op, key, value=None):
+        """Append one mutation record to the journal"""
+        self._seq += 1
+        record = {'n': self._seq, 'op': op, 'key': key}
+        if value is not None:
+            record['value'] = value
+        with open(self.journal_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        self._pending += 1
+
+    def needs_compaction(self):
+        return self._pending >= self.compact_every
+
+    def compact(self, data):
+        """Atomically replace the snapshot with data and reset the journal"""
+        data = dict(data, _seq=self._seq)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # Records up to _seq are now in the snapshot, so the journal can go
+        with open(self.journal_path, 'w'):
+            pass
+        self._pending = 0
@@ -1,17 +1,50 @@
-from kivy.utils import platform
-from plyer import notification
-import json
-import os
-import re
-from datetime import datetime
-
-class SMSScreener:
-    def __init__(self):
+import threading
+
+from bloom_filter import BlocklistFilter
+from contacts import shared_contacts_index
+from domain_reputation import ALLOW, DENY, DomainReputation, url_host
+from event_history import shared_history
+from instrumentation import ScreeningStats
+from matchers import AhoCorasick, CategoryMatcher
+from notifications import shared_dispatcher
+from number_store import SQLiteNumberSet, members
+from phone_numbers import default_normalizer
+from pipeline import Check, CheckPipeline
+from quiet_schedule import ALL_DAYS, EXEMPTIONS, MINUTES_PER_DAY, QuietSchedule
+from rate_limiter import SenderRateLimiter
+from screener_base import ScreenerBase
+from settings_store import JournaledStore
+from spam_classifier import SpamClassifier
+from text_normalizer import fold_text, normalize_message
+from verdict_cache import MISSING, VerdictCache, content_key
+
+RATE_LIMITS_FILE = 'sms_rate_limits.bin'
+CLASSIFIER_FILE = 'sms_classifier.bin'
+
+class SMSScreener(ScreenerBase):
+    _decision_method = 'should_block_sms'
+
+    def __init__(self, normalizer=None, contacts=None, database=None, notifier=None, history=None,
+                 defer_load=False, read_only=False):
+        self.normalizer = normalizer or default_normalizer
+        self.database = database  # Optional SQLite file for the number lists
+        self.read_only = read_only  # Never write settings, caches or the database
+        self.contacts = contacts if contacts is not None else shared_contacts_index()
+        self.notifier = notifier if notifier is not None else shared_dispatcher()
+        self.history = history if history is not None else shared_history()
         self.is_active = False
         self.block_non_contacts = False
         self.blocked_numbers = set()
+        self.blocklist_version = 0  # Bumped by every change to a blocked list kept in JSON
         self.whitelist = set()
+        self.shared_blocklists = {}  # Read-only packed feeds by path
         self.keyword_filters = []
+        self.keyword_matcher = AhoCorasick()
+
+        # Allow/deny rules for link domains, from the user and from feed files
+        self.link_rules = []
+        self.link_feeds = []
+        self.link_reputation = DomainReputation()
         
         # Categorized spam patterns
         self.spam_patterns = {
@@ -54,84 +87,216 @@ class SMSScreener:
         # Initialize filter categories
         self.filter_categories = list(self.spam_patterns.keys())
         self.active_categories = set(self.filter_categories)  # All categories active by default
+        self.category_matcher = CategoryMatcher()
+        self._categories_dirty = True
         
-        # Time-based patterns (messages at odd hours)
-        self.time_restrictions = {
-            'enabled': False,
-            'quiet_hours': {
-                'start': 22,  # 10 PM
-                'end': 7      # 7 AM
-            }
-        }
+        # Weekly quiet hours, 10 PM to 7 AM every day by default
+        self.quiet_schedule = QuietSchedule.from_hours(False, 22, 7)
         
         # Message frequency limits
         self.frequency_limits = {
             'enabled': False,
             'max_per_hour': 5,
-            'max_per_day': 20,
-            'message_history': {}  # Tracks message frequency per number
+            'max_per_day': 20
         }
+        self.rate_limiter = SenderRateLimiter()  # Tracks message frequency per number
+
+        # Learned spam score, trained from the user's spam / not spam feedback
+        self.classifier_settings = {
+            'enabled': True,
+            'threshold': 0.9
+        }
+        self.spam_classifier = SpamClassifier()
+        self._classifier_dirty = False
         
-        self.load_settings()
+        # Sender checks give verdicts cached per number. Whitelisted senders
+        # are always allowed, so that check stays first; the blocking checks
+        # commute and are reordered by measured cost.
+        self.sender_checks = CheckPipeline([
+            Check('whitelist', self._whitelist_check, cost=0.2),
+            [
+                Check('blocklist', self._blocklist_check, cost=1.0),
+                Check('contacts', self._contacts_check, cost=1.0),
+            ],
+        ])
+        # Message checks run for senders those let through. The frequency
+        # check counts every message that reaches it, so the order is fixed.
+        self.message_checks = CheckPipeline([
+            Check('quiet_hours', self._quiet_hours_check, cost=1.0),
+            Check('frequency', self._frequency_check, cost=1.0),
+            Check('content', self._content_check, cost=20.0),
+        ])
+        self.store = JournaledStore('sms_filters.json', read_only=read_only)
+        self.number_filter = BlocklistFilter(self.store.path + '.bloom')
+        self.settings_version = 0  # Bumped by every change that can alter a verdict
+        self.verdict_cache = VerdictCache()
+        self.stats = ScreeningStats()  # Off until enable_stats()
+        self._stats_dumper = None
+        self.ready = threading.Event()  # Set once load_settings() has finished
+        self.ready_timeout = 0.5  # How long an early decision waits for settings
+        if not defer_load:
+            self.load_settings()
 
     def load_settings(self):
         """Load blocked numbers and filters from storage"""
+        migrated = False
         try:
-            if os.path.exists('sms_filters.json'):
-                with open('sms_filters.json', 'r') as f:
-                    data = json.load(f)
-                    self.blocked_numbers = set(data.get('blocked', []))
-                    self.whitelist = set(data.get('whitelist', []))
-                    self.keyword_filters = data.get('keywords', [])
-                    self.block_non_contacts = data.get('block_non_contacts', False)
-                    self.time_restrictions = data.get('time_restrictions', self.time_restrictions)
-                    self.frequency_limits = data.get('frequency_limits', self.frequency_limits)
-                    self.active_categories = set(data.get('active_categories', self.filter_categories))
+            data = self.store.load()
+            if self.database:
+                self.blocked_numbers = SQLiteNumberSet(self.database, 'sms_blocked')
+                self.whitelist = SQLiteNumberSet(self.database, 'sms_whitelist')
+                # Move lists left in the JSON store into the database once
+                if (data.get('blocked') or data.get('whitelist')) and not self.read_only:
+                    self.blocked_numbers.update(self.normalize(n) for n in data.get('blocked', []))
+                    self.whitelist.update(self.normalize(n) for n in data.get('whitelist', []))
+                    migrated = True
+            else:
+                self.blocked_numbers = {self.normalize(n) for n in data.get('blocked', [])}
+                self.whitelist = {self.normalize(n) for n in data.get('whitelist', [])}
+            self.blocklist_version = data.get('blocklist_version', 0)
+            self.keyword_filters = data.get('keywords', [])
+            self.link_rules = data.get('link_rules', [])
+            self.link_feeds = data.get('link_feeds', [])
+            self.block_non_contacts = data.get('block_non_contacts', False)
+            if 'quiet_schedule' in data:
+                self.quiet_schedule = QuietSchedule.from_dict(data['quiet_schedule'])
+            elif 'time_restrictions' in data:
+                # Older versions had a single daily start/end hour
+                restrictions = data['time_restrictions']
+                self.quiet_schedule = QuietSchedule.from_hours(
+                    restrictions.get('enabled', False),
+                    restrictions['quiet_hours']['start'], restrictions['quiet_hours']['end']
+                )
+            self.frequency_limits.update(data.get('frequency_limits', {}))
+            self.classifier_settings.update(data.get('classifier', {}))
+            # Older versions kept per-sender timestamps in the settings file
+            self.frequency_limits.pop('message_history', None)
+            self.active_categories = set(data.get('active_categories', self.filter_categories))
+            self._open_shared_blocklists(data.get('blocklist_files', []))
         except Exception as e:
             print(f"Error loading settings: {e}")
+        if migrated:
+            self.save_settings()
+        if not self.number_filter.load(self._number_filter_fingerprint()):
+            self.rebuild_number_filter()
+        self._settings_changed()
+        try:
+            self.rate_limiter.load(RATE_LIMITS_FILE)
+        except Exception as e:
+            print(f"Error loading rate limits: {e}")
+        try:
+            self.spam_classifier.load(CLASSIFIER_FILE)
+        except Exception as e:
+            print(f"Error loading spam classifier: {e}")
+        self._categories_dirty = True
+        self.keyword_matcher.clear()
+        for filter_rule in self.keyword_filters:
+            self.keyword_matcher.add(fold_text(filter_rule['keyword']), filter_rule['is_spam'])
+        self._load_link_reputation()
+        # The first contact lookup would otherwise run the full provider query
+        self.contacts.refresh()
+        self.ready.set()
 
     def save_settings(self):
         """Save blocked numbers and filters to storage"""
         try:
-            with open('sms_filters.json', 'w') as f:
-                json.dump({
-                    'blocked': list(self.blocked_numbers),
-                    'whitelist': list(self.whitelist),
-                    'keywords': self.keyword_filters,
-                    'block_non_contacts': self.block_non_contacts,
-                    'time_restrictions': self.time_restrictions,
-                    'frequency_limits': self.frequency_limits,
-                    'active_categories': list(self.active_categories)
-                }, f)
+            self.store.compact({
+                'blocked': self._snapshot_numbers(self.blocked_numbers),
+                'blocklist_version': self.blocklist_version,
+                'whitelist': self._snapshot_numbers(self.whitelist),
+                'blocklist_files': list(self.shared_blocklists),
+                'keywords': self.keyword_filters,
+                'link_rules': self.link_rules,
+                'link_feeds': self.link_feeds,
+                'block_non_contacts': self.block_non_contacts,
+                'quiet_schedule': self.quiet_schedule.to_dict(),
+                'frequency_limits': self.frequency_limits,
+                'classifier': self.classifier_settings,
+                'active_categories': list(self.active_categories)
+            })
         except Exception as e:
             print(f"Error saving settings: {e}")
 
+    def save_rate_limits(self):
+        """Save the per-sender message counters"""
+        try:
+            self.rate_limiter.save(RATE_LIMITS_FILE)
+        except Exception as e:
+            print(f"Error saving rate limits: {e}")
+
+    def save_classifier(self):
+        """Save the spam classifier if feedback has changed it"""
+        if not self._classifier_dirty:
+            return
+        try:
+            self.spam_classifier.save(CLASSIFIER_FILE)
+            self._classifier_dirty = False
+        except Exception as e:
+            print(f"Error saving spam classifier: {e}")
+
+    def _save_quiet_schedule(self):
+        self.quiet_schedule.compile()
+        self._record('set', 'quiet_schedule', self.quiet_schedule.to_dict())
+
     def toggle_time_restrictions(self, enabled=None):
         """Toggle time-based message restrictions"""
         if enabled is None:
-            self.time_restrictions['enabled'] = not self.time_restrictions['enabled']
+            self.quiet_schedule.enabled = not self.quiet_schedule.enabled
         else:
-            self.time_restrictions['enabled'] = enabled
-        self.save_settings()
-        return self.time_restrictions['enabled']
-
-    def set_quiet_hours(self, start_hour=None, end_hour=None):
-        """Set quiet hours for message blocking"""
-        current_start = self.time_restrictions['quiet_hours']['start']
-        current_end = self.time_restrictions['quiet_hours']['end']
+            self.quiet_schedule.enabled = enabled
+        self._save_quiet_schedule()
+        return self.quiet_schedule.enabled
+
+    def set_quiet_hours(self, start_hour=None, end_hour=None, start_minute=0, end_minute=0):
+        """Set one quiet window for every day, replacing any per-day windows"""
+        current_start, current_end = self.quiet_schedule.daily_window()
         
         # Update only the provided values
         if start_hour is not None:
-            if 0 <= start_hour <= 23:
-                current_start = start_hour
+            if 0 <= start_hour <= 23 and 0 <= start_minute <= 59:
+                current_start = start_hour * 60 + start_minute
         if end_hour is not None:
-            if 0 <= end_hour <= 23:
-                current_end = end_hour
+            if 0 <= end_hour <= 23 and 0 <= end_minute <= 59:
+                current_end = end_hour * 60 + end_minute
         
-        # Update settings
-        self.time_restrictions['quiet_hours']['start'] = current_start
-        self.time_restrictions['quiet_hours']['end'] = current_end
-        self.save_settings()
+        self.quiet_schedule.windows = [{'days': list(ALL_DAYS), 'start': current_start, 'end': current_end}]
+        self._save_quiet_schedule()
+
+    def add_quiet_window(self, days, start, end):
+        """Add quiet hours from start to end (minutes after midnight) on the given weekdays"""
+        days = sorted({day for day in days if day in ALL_DAYS})
+        if not days or not (0 <= start < MINUTES_PER_DAY and 0 <= end <= MINUTES_PER_DAY):
+            return False
+        self.quiet_schedule.windows.append({'days': days, 'start': start, 'end': end})
+        self._save_quiet_schedule()
+        return True
+
+    def clear_quiet_windows(self):
+        """Remove every weekly quiet window"""
+        self.quiet_schedule.windows = []
+        self._save_quiet_schedule()
+
+    def set_holiday(self, date, windows=()):
+        """Use these [start, end] quiet windows instead of the weekly ones on a 'YYYY-MM-DD' date"""
+        self.quiet_schedule.holidays[date] = [list(window) for window in windows]
+        self._save_quiet_schedule()
+
+    def remove_holiday(self, date):
+        if self.quiet_schedule.holidays.pop(date, None) is None:
+            return False
+        self._save_quiet_schedule()
+        return True
+
+    def set_quiet_exemption(self, exemption, exempt=True):
+        """Let 'contacts' or 'short_codes' senders through during quiet hours"""
+        if exemption not in EXEMPTIONS:
+            return False
+        if exempt:
+            self.quiet_schedule.exempt.add(exemption)
+        else:
+            self.quiet_schedule.exempt.discard(exemption)
+        self._save_quiet_schedule()
+        return True
 
     def toggle_frequency_limits(self, enabled=None):
         """Toggle message frequency limiting"""
@@ -139,7 +304,7 @@ class SMSScreener:
             self.frequency_limits['enabled'] = not self.frequency_limits['enabled']
         else:
             self.frequency_limits['enabled'] = enabled
-        self.save_settings()
+        self._record('set', 'frequency_limits', self.frequency_limits)
         return self.frequency_limits['enabled']
 
     def set_frequency_limits(self, per_hour=None, per_day=None):
@@ -148,99 +313,238 @@ class SMSScreener:
             self.frequency_limits['max_per_hour'] = per_hour
         if per_day is not None:
             self.frequency_limits['max_per_day'] = per_day
-        self.save_settings()
+        self._record('set', 'frequency_limits', self.frequency_limits)
 
     def check_message_frequency(self, number):
         """Check if a number has exceeded message frequency limits"""
         if not self.frequency_limits['enabled']:
             return False
 
-        current_time = datetime.now()
-        if number not in self.frequency_limits['message_history']:
-            self.frequency_limits['message_history'][number] = []
-
-        # Clean up old messages
-        self.frequency_limits['message_history'][number] = [
-            timestamp for timestamp in self.frequency_limits['message_history'][number]
-            if (current_time - timestamp).total_seconds() < 86400  # 24 hours
-        ]
-
-        # Check frequency limits
-        messages_last_hour = sum(
-            1 for timestamp in self.frequency_limits['message_history'][number]
-            if (current_time - timestamp).total_seconds() < 3600  # 1 hour
-        )
-        messages_last_day = len(self.frequency_limits['message_history'][number])
-
-        # Add current message timestamp
-        self.frequency_limits['message_history'][number].append(current_time)
+        # Counts exclude the current message, which is recorded now
+        messages_last_hour, messages_last_day = self.rate_limiter.record(number)
 
         return (messages_last_hour >= self.frequency_limits['max_per_hour'] or 
                 messages_last_day >= self.frequency_limits['max_per_day'])
 
     def is_quiet_hours(self):
         """Check if current time is within quiet hours"""
-        if not self.time_restrictions['enabled']:
+        return self.quiet_schedule.is_quiet()
+
+    def is_quiet_exempt(self, number):
+        """Check if a normalized sender may message during quiet hours"""
+        exempt = self.quiet_schedule.exempt
+        if not exempt:
             return False
+        # Short codes stay bare digits; full numbers carry a '+'
+        if 'short_codes' in exempt and number.isdigit():
+            return True
+        return 'contacts' in exempt and self.is_contact(number)
+
+    def check_content(self, message_content):
+        """Return (should_block, reason) for what the message body alone decides
+
+        A link to a denied domain blocks the message even if an allow
+        keyword matches, since phishing texts copy trusted wording.
+        """
+        message = normalize_message(message_content)
+        link = self.check_links(message)
+        if link is not None and link['verdict'] == DENY:
+            return True, 'blocked_link'
+        is_spam, category = self.is_spam_content(message)
+        if is_spam:
+            return True, f'spam_{category}'
+        return False, None
+
+    def check_links(self, message_content):
+        """Return the first denied link, else an allowed one when all links are allowed
 
-        current_hour = datetime.now().hour
-        start = self.time_restrictions['quiet_hours']['start']
-        end = self.time_restrictions['quiet_hours']['end']
+        The result is a dict as given by DomainReputation.check_url, or None
+        when the message has no links or some are not covered by any rule.
+        """
+        return self._check_links(normalize_message(message_content))
 
-        if start <= end:
-            return start <= current_hour < end
-        else:  # Handle case where quiet hours span midnight
-            return current_hour >= start or current_hour < end
+    def _check_links(self, message):
+        # Kept apart from check_links so the 'links' stage timer does not also
+        # run inside the 'content' stage
+        if not message.urls or not len(self.link_reputation):
+            return None
+        return self.link_reputation.check_urls(message.urls)
 
     def is_spam_content(self, message_content):
-        """Check if message content matches spam patterns"""
-        message_lower = message_content.lower()
+        """Check if message content matches spam patterns
+
+        A matching allow keyword (is_spam=False) overrides every other
+        content check, so trusted phrases can exempt a message. The message
+        is normalized once and every check shares the result.
+        """
+        message = normalize_message(message_content)
         
-        # Check custom keyword filters
-        for filter_rule in self.keyword_filters:
-            if filter_rule['keyword'] in message_lower and filter_rule['is_spam']:
-                return True, 'custom_keyword'
+        # Check custom keyword filters in one pass
+        keyword_hits = self.keyword_matcher.find_all(message.text)
+        if False in keyword_hits:
+            return False, None
+        if keyword_hits:
+            return True, 'custom_keyword'
         
-        # Check categorized spam patterns
-        for category, patterns in self.spam_patterns.items():
-            if category in self.active_categories:
-                for pattern in patterns:
-                    if re.search(pattern, message_lower):
-                        return True, category
+        # Check categorized spam patterns in one pass
+        category = self._get_category_matcher().first(message)
+        if category == 'suspicious_links':
+            # Links to allowed domains, such as the user's bank, are not suspicious
+            link = self._check_links(message)
+            if link is not None and link['verdict'] == ALLOW:
+                category = self._get_category_matcher().first(message, exclude=('suspicious_links',))
+        if category is not None:
+            return True, category
+
+        # Score what the patterns missed with the trained classifier
+        if self.is_likely_spam(message):
+            return True, 'classifier'
                 
         return False, None
 
+    def spam_score(self, message_content):
+        """Classifier probability that a message is spam, or None while untrained"""
+        return self.spam_classifier.score(normalize_message(message_content).words)
+
+    def is_likely_spam(self, message_content):
+        """Check if the classifier scores a message at or above the threshold"""
+        if not self.classifier_settings['enabled'] or not self.spam_classifier.is_trained():
+            return False
+        score = self.spam_score(message_content)
+        return score is not None and score >= self.classifier_settings['threshold']
+
+    def report_sms(self, message_content, is_spam):
+        """Train the classifier with the user's spam / not spam verdict on a message"""
+        self.spam_classifier.learn(normalize_message(message_content).words, is_spam)
+        self._classifier_dirty = True
+        self._settings_changed()
+
+    def toggle_classifier(self, enabled=None):
+        """Toggle blocking on the classifier score"""
+        if enabled is None:
+            self.classifier_settings['enabled'] = not self.classifier_settings['enabled']
+        else:
+            self.classifier_settings['enabled'] = enabled
+        self._record('set', 'classifier', self.classifier_settings)
+        return self.classifier_settings['enabled']
+
+    def set_classifier_threshold(self, threshold):
+        """Set the spam probability, between 0 and 1, at which messages are blocked"""
+        if not 0 <= threshold <= 1:
+            return False
+        self.classifier_settings['threshold'] = threshold
+        self._record('set', 'classifier', self.classifier_settings)
+        return True
+
+    def spam_categories(self, message_content):
+        """Return every active spam category the message matches"""
+        return self._get_category_matcher().all(message_content)
+
+    def _get_category_matcher(self):
+        """Recompile the category regex if the patterns or active set changed"""
+        if self._categories_dirty:
+            self.category_matcher.compile(self.spam_patterns, self.active_categories)
+            self._categories_dirty = False
+        return self.category_matcher
+
+    def set_spam_patterns(self, category, patterns):
+        """Replace the patterns of a spam category, adding it if new"""
+        if category not in self.spam_patterns:
+            self.filter_categories.append(category)
+            self.active_categories.add(category)
+        self.spam_patterns[category] = list(patterns)
+        self._categories_dirty = True
+        self._settings_changed()
+
     def should_block_sms(self, number, message_content):
-        """Determine if an SMS should be blocked"""
+        """Determine if an SMS should be blocked
+
+        The sender and content verdicts are cached, per normalized number and
+        per message digest, until the settings next change. Quiet hours and
+        frequency limits depend on the clock and traffic, so they always run.
+        """
         if not self.is_active:
             return False, None
-        
-        # Always allow whitelisted numbers
-        if number in self.whitelist:
+        if not self.settings_ready():
             return False, None
-            
-        # Block if number is in blocked list
-        if number in self.blocked_numbers:
-            return True, 'blocked_number'
-            
-        # Block non-contacts if enabled
-        if self.block_non_contacts and not self.is_contact(number):
-            return True, 'unknown_number'
-            
-        # Check quiet hours
-        if self.is_quiet_hours():
+
+        number = self.normalize(number)
+        version = self._verdict_version()
+        cache = self.verdict_cache
+
+        sender_key = ('number', number)
+        verdict = cache.get(sender_key, version)
+        if verdict is MISSING:
+            verdict = self._check_sender(number)
+            cache.put(sender_key, verdict, version)
+        if verdict is not None:
+            return verdict
+
+        return self.message_checks.run(number, message_content, version) or (False, None)
+
+    def _check_sender(self, number):
+        """Return the verdict the sender alone decides, or None to keep checking"""
+        return self.sender_checks.run(number)
+
+    def _quiet_hours_check(self, number, message_content, version):
+        if self.is_quiet_hours() and not self.is_quiet_exempt(number):
             return True, 'quiet_hours'
-            
-        # Check message frequency
+        return None
+
+    def _frequency_check(self, number, message_content, version):
         if self.check_message_frequency(number):
             return True, 'frequency_limit'
-            
-        # Check message content for spam
-        is_spam, category = self.is_spam_content(message_content)
-        if is_spam:
-            return True, f'spam_{category}'
-                
-        return False, None
+        return None
+
+    def _content_check(self, number, message_content, version):
+        """Scan the message for spam, reusing the verdict for repeated bodies"""
+        key = ('content', content_key(message_content))
+        verdict = self.verdict_cache.get(key, version)
+        if verdict is MISSING:
+            should_block, reason = self.check_content(message_content)
+            verdict = (True, reason) if should_block else None
+            self.verdict_cache.put(key, verdict, version)
+        return verdict
+
+    def screen_sms(self, messages, check_frequency=False):
+        """Screen many messages at once, returning (should_block, reason) for each
+
+        messages yields (number, message_content) pairs, e.g. an inbox being
+        re-screened after a rules change. Number checks run once per distinct
+        sender in bulk and quiet hours are evaluated once for the whole
+        batch. Message bodies share the content verdict cache with single
+        messages, so a repeated body is only scanned once. Frequency limits
+        are skipped unless check_frequency is set, since replayed messages
+        are not new traffic. Like single messages, the batch fails open while
+        settings are still loading.
+        """
+        messages = [(self.normalize(number), content) for number, content in messages]
+        if not self.is_active or not self.settings_ready():
+            return [(False, None)] * len(messages)
+
+        unique = {number for number, _ in messages}
+        whitelisted = members(self.whitelist, unique)
+        candidates = unique - whitelisted
+        blocked = self.blocked_among(candidates)
+        contacts = self.contacts.contacts_among(candidates - blocked) if self.block_non_contacts else None
+        quiet_hours = self.is_quiet_hours()
+        version = self._verdict_version()
+
+        verdicts = []
+        for number, content in messages:
+            if number in whitelisted:
+                verdicts.append((False, None))
+            elif number in blocked:
+                verdicts.append((True, 'blocked_number'))
+            elif contacts is not None and number not in contacts:
+                verdicts.append((True, 'unknown_number'))
+            elif quiet_hours and not self.is_quiet_exempt(number):
+                verdicts.append((True, 'quiet_hours'))
+            elif check_frequency and self.check_message_frequency(number):
+                verdicts.append((True, 'frequency_limit'))
+            else:
+                verdicts.append(self._content_check(number, content, version) or (False, None))
+        return verdicts
 
     def handle_incoming_sms(self, number, message_content):
         """Handle an incoming SMS"""
@@ -251,31 +555,39 @@ class SMSScreener:
                 'unknown_number': 'unknown number',
                 'quiet_hours': 'received during quiet hours',
                 'frequency_limit': 'too many messages',
-                'custom_keyword': 'matched blocked keyword'
+                'custom_keyword': 'matched blocked keyword',
+                'spam_classifier': 'likely spam'
             }
             
+            if reason == 'blocked_link':
+                reason_message = self._describe_blocked_link(message_content)
             # Handle spam categories
-            if reason and reason.startswith('spam_'):
+            elif reason in reason_messages:
+                reason_message = reason_messages[reason]
+            elif reason and reason.startswith('spam_'):
                 category = reason.split('_', 1)[1]
                 reason_message = f'detected {category.replace("_", " ")}'
             else:
-                reason_message = reason_messages.get(reason, reason)
+                reason_message = reason
             
-            self.show_notification(f"Blocked SMS from {number} ({reason_message})")
+            message = f"Blocked SMS from {number} ({reason_message})"
+            self.show_notification(message, reason)
+            self.history.record('sms', self.normalize(number), reason, message)
             return True  # Block the SMS
         return False  # Allow the SMS
 
-    def show_notification(self, message):
-        """Show a notification when an SMS is blocked"""
-        try:
-            notification.notify(
-                title='SMS Screener',
-                message=message,
-                app_icon=None,
-                timeout=10,
-            )
-        except Exception as e:
-            print(f"Error showing notification: {e}")
+    def _describe_blocked_link(self, message_content):
+        """Name the denied domain and the rule that matched it"""
+        link = self.check_links(message_content)
+        if link is None:
+            return 'blocked link'
+        if link['source'] == 'user':
+            return f"link to blocked domain {link['rule']}"
+        return f"link to {link['domain']}, listed in {link['source']}"
+
+    def show_notification(self, message, reason=None):
+        """Queue a notification that an SMS was blocked; bursts are merged"""
+        self.notifier.post('SMS Screener', message, reason, 'SMS')
 
     def toggle_screening(self):
         """Toggle SMS screening on/off"""
@@ -285,34 +597,100 @@ class SMSScreener:
     def toggle_block_non_contacts(self):
         """Toggle blocking of messages from non-contacts"""
         self.block_non_contacts = not self.block_non_contacts
-        self.save_settings()
+        self._record('set', 'block_non_contacts', self.block_non_contacts)
         return self.block_non_contacts
 
-    def add_blocked_number(self, number):
-        """Add a number to the blocked list"""
-        self.blocked_numbers.add(number)
-        self.save_settings()
+    def add_keyword_filter(self, keyword, is_spam=True):
+        """Add a keyword filter, or change whether an existing one is spam"""
+        keyword = fold_text(keyword)
+        for filter_rule in [f for f in self.keyword_filters if f['keyword'] == keyword]:
+            self.keyword_filters.remove(filter_rule)
+            self._record('remove', 'keywords', filter_rule)
+        filter_rule = {
+            'keyword': keyword,
+            'is_spam': is_spam
+        }
+        self.keyword_filters.append(filter_rule)
+        self.keyword_matcher.add(keyword, is_spam)
+        self._record('append', 'keywords', filter_rule)
 
-    def remove_blocked_number(self, number):
-        """Remove a number from the blocked list"""
-        if number in self.blocked_numbers:
-            self.blocked_numbers.remove(number)
-            self.save_settings()
+    def remove_keyword_filter(self, keyword):
+        """Remove a keyword filter"""
+        keyword = fold_text(keyword)
+        if self.keyword_matcher.remove(keyword):
+            for filter_rule in [f for f in self.keyword_filters if f['keyword'] == keyword]:
+                self.keyword_filters.remove(filter_rule)
+                self._record('remove', 'keywords', filter_rule)
+            return True
+        return False
 
-    def add_to_whitelist(self, number):
-        """Add a number to the whitelist"""
-        self.whitelist.add(number)
-        if number in self.blocked_numbers:
-            self.blocked_numbers.remove(number)
-        self.save_settings()
+    def _load_link_reputation(self):
+        """Rebuild the domain index from the attached feeds and the user's rules"""
+        self.link_reputation.clear()
+        for feed in self.link_feeds:
+            try:
+                self.link_reputation.load_feed(feed['path'], feed['verdict'])
+            except Exception as e:
+                print(f"Error loading link feed {feed['path']}: {e}")
+        # User rules come last so they override feed entries for the same domain
+        for rule in self.link_rules:
+            self.link_reputation.add(rule['domain'], rule['verdict'])
 
-    def add_keyword_filter(self, keyword, is_spam=True):
-        """Add a keyword filter"""
-        self.keyword_filters.append({
-            'keyword': keyword.lower(),
-            'is_spam': is_spam
-        })
-        self.save_settings()
+    def add_link_rule(self, domain, verdict=DENY):
+        """Allow or deny links to a domain and its subdomains"""
+        domain = url_host(domain)
+        if verdict not in (ALLOW, DENY) or not domain:
+            return False
+        for link_rule in [r for r in self.link_rules if r['domain'] == domain]:
+            self.link_rules.remove(link_rule)
+            self._record('remove', 'link_rules', link_rule)
+        self.link_reputation.add(domain, verdict)
+        link_rule = {
+            'domain': domain,
+            'verdict': verdict
+        }
+        self.link_rules.append(link_rule)
+        self._record('append', 'link_rules', link_rule)
+        return True
+
+    def remove_link_rule(self, domain):
+        """Remove the user's rule for a domain"""
+        domain = url_host(domain)
+        link_rules = [r for r in self.link_rules if r['domain'] == domain]
+        if not link_rules:
+            return False
+        for link_rule in link_rules:
+            self.link_rules.remove(link_rule)
+            self._record('remove', 'link_rules', link_rule)
+        if self.link_feeds:
+            # A feed may list the same domain; reload so its entry comes back
+            self._load_link_reputation()
+        else:
+            self.link_reputation.remove(domain)
+        return True
+
+    def attach_link_feed(self, path, verdict=DENY):
+        """Load every domain in a feed file as allowed or denied"""
+        if verdict not in (ALLOW, DENY) or any(f['path'] == path for f in self.link_feeds):
+            return False
+        try:
+            self.link_reputation.load_feed(path, verdict)
+        except Exception as e:
+            print(f"Error loading link feed {path}: {e}")
+            return False
+        self.link_feeds.append({'path': path, 'verdict': verdict})
+        self._record('set', 'link_feeds', self.link_feeds)
+        return True
+
+    def detach_link_feed(self, path):
+        """Stop using a feed file"""
+        feeds = [f for f in self.link_feeds if f['path'] != path]
+        if len(feeds) == len(self.link_feeds):
+            return False
+        self.link_feeds = feeds
+        self._load_link_reputation()
+        self._record('set', 'link_feeds', self.link_feeds)
+        return True
 
     def toggle_filter_category(self, category):
         """Toggle a specific filter category on/off"""
@@ -321,7 +699,8 @@ class SMSScreener:
                 self.active_categories.remove(category)
             else:
                 self.active_categories.add(category)
-            self.save_settings()
+            self._categories_dirty = True
+            self._record('set', 'active_categories', list(self.active_categories))
             return True
         return False
 
@@ -331,5 +710,21 @@ class SMSScreener:
 
     def is_contact(self, number):
         """Check if a number is a contact"""
-        # TO DO: implement contact checking logic
-        pass
+        return self.contacts.is_contact(number)
+
+    def _stat_stages(self):
+        return [
+            ('whitelist', self, 'is_whitelisted'),
+            ('blocklist', self, 'is_blocked_number'),
+            ('contacts', self, 'is_contact'),
+            ('quiet_hours', self, 'is_quiet_hours'),
+            ('frequency', self, 'check_message_frequency'),
+            ('links', self, 'check_links'),
+            ('content', self, 'is_spam_content'),
+        ]
+
+    def _pipeline_stats(self):
+        return {
+            'sender': self.sender_checks.snapshot(),
+            'message': self.message_checks.snapshot(),
+        }
\ No newline at end of file
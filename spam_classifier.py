@@ -0,0 +1,135 @@
+from array import array
+from functools import lru_cache
+from zlib import crc32
+import math
+import os
+import re
+import struct
+
+_MAGIC = b'CSNB'
+# Magic, table bits, spam messages, ham messages, spam features, ham features
+_HEADER = struct.Struct('<4sHIIQQ')
+_WORD = re.compile(r"\w+(?:'\w+)?")
+
+# Seeds keep words, word pairs and character trigrams apart in the tables
+_WORD_SEED = 1
+_PAIR_SEED = 2
+_CHAR_SEED = 3
+
+
+class SpamClassifier:
+    """Naive Bayes spam scorer over hashed text features
+
+    A message is reduced to the set of its words, adjacent word pairs and
+    the character trigrams of each word, each hashed into one of 2**bits slots of a spam
+    and a ham count table. Learning a message adds one to each of its
+    slots in the table for its class, so feedback trains the model
+    incrementally; scoring is one pass over the same features. Scores are
+    only given once at least min_examples messages of each class have
+    been learned.
+    """
+
+    def __init__(self, bits=16, min_examples=5):
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.min_examples = min_examples
+        self.spam_counts = array('I', [0]) * (1 << bits)
+        self.ham_counts = array('I', [0]) * (1 << bits)
+        self.spam_messages = 0
+        self.ham_messages = 0
+        self.spam_features = 0
+        self.ham_features = 0
+        # Most words recur across messages, so their slots are hashed once
+        self._word_slots = lru_cache(maxsize=8192)(self._hash_word)
+
+    def _hash_word(self, word):
+        """Slots of a word and its trigrams, padded so prefixes and suffixes count"""
+        mask = self.mask
+        data = word.encode('utf-8')
+        slots = [crc32(data, _WORD_SEED) & mask]
+        padded = b' ' + data + b' '
+        for i in range(len(padded) - 2):
+            slots.append(crc32(padded[i:i + 3], _CHAR_SEED) & mask)
+        return tuple(slots)
+
+    def features(self, text):
+        """Return the set of table slots a message, or its list of words, hits"""
+        words = _WORD.findall(text.lower()) if isinstance(text, str) else text
+        mask = self.mask
+        word_slots = self._word_slots
+        slots = set()
+        for word in set(words):
+            slots.update(word_slots(word))
+        for first, second in zip(words, words[1:]):
+            slots.add(crc32(f'{first} {second}'.encode('utf-8'), _PAIR_SEED) & mask)
+        return slots
+
+    def learn(self, text, is_spam):
+        """Count a message as spam or not spam"""
+        slots = self.features(text)
+        counts = self.spam_counts if is_spam else self.ham_counts
+        for slot in slots:
+            counts[slot] += 1
+        if is_spam:
+            self.spam_messages += 1
+            self.spam_features += len(slots)
+        else:
+            self.ham_messages += 1
+            self.ham_features += len(slots)
+
+    def is_trained(self):
+        return min(self.spam_messages, self.ham_messages) >= self.min_examples
+
+    def score(self, text):
+        """Probability that a message is spam, or None while untrained"""
+        if not self.is_trained():
+            return None
+        slots = self.features(text)
+        size = self.mask + 1
+        log = math.log
+        # Laplace-smoothed log likelihood ratio of every feature, plus the prior
+        log_odds = log((self.spam_messages + 1) / (self.ham_messages + 1))
+        log_odds += len(slots) * (log(self.ham_features + size) - log(self.spam_features + size))
+        spam_counts = self.spam_counts
+        ham_counts = self.ham_counts
+        for slot in slots:
+            spam = spam_counts[slot]
+            ham = ham_counts[slot]
+            if spam != ham:
+                log_odds += log(spam + 1) - log(ham + 1)
+        if log_odds < -30:
+            return 0.0
+        if log_odds > 30:
+            return 1.0
+        return 1 / (1 + math.exp(-log_odds))
+
+    def save(self, path):
+        """Write the count tables atomically"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, self.bits, self.spam_messages, self.ham_messages,
+                                 self.spam_features, self.ham_features))
+            self.spam_counts.tofile(f)
+            self.ham_counts.tofile(f)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Replace the model with one written by save, if the file exists"""
+        if not os.path.exists(path):
+            return False
+        with open(path, 'rb') as f:
+            magic, bits, spam_messages, ham_messages, spam_features, ham_features = \
+                _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not a classifier file")
+            spam_counts = array('I')
+            ham_counts = array('I')
+            spam_counts.fromfile(f, 1 << bits)
+            ham_counts.fromfile(f, 1 << bits)
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self._word_slots.cache_clear()
+        self.spam_counts, self.ham_counts = spam_counts, ham_counts
+        self.spam_messages, self.ham_messages = spam_messages, ham_messages
+        self.spam_features, self.ham_features = spam_features, ham_features
+        return True
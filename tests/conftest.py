@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contacts import ContactsIndex, FileContactsProvider
+from event_history import EventHistory
+from notifications import NotificationDispatcher
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory, where the screeners keep their files"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def screener_args(workdir):
+    """Contacts, notifier and history private to one test"""
+    return {
+        'contacts': ContactsIndex(FileContactsProvider(str(workdir / 'contacts.json'))),
+        'notifier': NotificationDispatcher(notify=lambda title, message: None),
+        'history': EventHistory(str(workdir / 'history')),
+    }
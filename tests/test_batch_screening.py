@@ -0,0 +1,41 @@
+import time
+
+from call_screener import CallScreener
+from sms_screener import SMSScreener
+
+
+def test_batches_fail_open_while_settings_load(screener_args):
+    calls = CallScreener(defer_load=True, **screener_args)
+    sms = SMSScreener(defer_load=True, **screener_args)
+    for screener in (calls, sms):
+        screener.is_active = True
+        screener.ready_timeout = 0.05
+
+    started = time.monotonic()
+    assert calls.screen_calls(['5551110001']) == [(False, None)]
+    assert sms.screen_sms([('5551110001', 'win cash now')]) == [(False, None)]
+    assert time.monotonic() - started < 1
+
+
+def test_batch_matches_single_calls(screener_args):
+    calls = CallScreener(**screener_args)
+    calls.is_active = True
+    calls.add_blocked_numbers(['5551110001'])
+    calls.add_to_whitelist('5552220002')
+    calls.add_rule('prefix', '+1900')
+    numbers = ['5551110001', '5552220002', '9005550000', '5553330003']
+    assert calls.screen_calls(numbers) == [calls.check_call(number) for number in numbers]
+
+
+def test_batch_reuses_cached_content_verdicts(screener_args, monkeypatch):
+    sms = SMSScreener(**screener_args)
+    sms.is_active = True
+    scanned = []
+    check_content = sms.check_content
+    monkeypatch.setattr(sms, 'check_content', lambda content: scanned.append(content) or check_content(content))
+
+    single = sms.should_block_sms('5551110001', 'win cash now')
+    batch = sms.screen_sms([('5552220002', 'win cash now'), ('5553330003', 'win cash now'),
+                            ('5554440004', 'see you at lunch')])
+    assert batch == [single, single, (False, None)]
+    assert scanned == ['win cash now', 'see you at lunch']
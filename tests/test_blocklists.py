@@ -0,0 +1,59 @@
+import pytest
+
+from call_screener import CallScreener
+from sms_screener import SMSScreener
+
+
+@pytest.mark.parametrize('screener_class', [CallScreener, SMSScreener])
+def test_batch_added_numbers_survive_restart(screener_args, screener_class):
+    screener = screener_class(**screener_args)
+    screener.add_blocked_number('5550000001')
+    screener.save_number_filter()
+    # A batch add saves through compact(), without a journal record
+    screener.add_blocked_numbers(['5551110001', '5551110002'])
+
+    restarted = screener_class(**screener_args)
+    assert restarted.is_blocked_number(restarted.normalize('5551110001'))
+    assert restarted.is_blocked_number(restarted.normalize('5550000001'))
+
+
+@pytest.mark.parametrize('screener_class', [CallScreener, SMSScreener])
+def test_batch_removed_numbers_survive_restart(screener_args, screener_class):
+    screener = screener_class(**screener_args)
+    screener.add_blocked_numbers(['5551110001', '5551110002'])
+    screener.save_number_filter()
+    screener.remove_blocked_numbers(['5551110001'])
+
+    restarted = screener_class(**screener_args)
+    assert not restarted.is_blocked_number(restarted.normalize('5551110001'))
+    assert restarted.is_blocked_number(restarted.normalize('5551110002'))
+
+
+@pytest.mark.parametrize('screener_class', [CallScreener, SMSScreener])
+def test_unrelated_changes_keep_the_saved_filter(screener_args, screener_class, monkeypatch):
+    screener = screener_class(**screener_args)
+    screener.add_blocked_numbers(['5551110001', '5551110002'])
+    screener.save_number_filter()
+    screener.toggle_block_non_contacts()
+    screener.save_settings()
+
+    rebuilds = []
+    monkeypatch.setattr(screener_class, 'rebuild_number_filter', lambda self: rebuilds.append(self))
+    restarted = screener_class(**screener_args)
+    assert not rebuilds
+    assert restarted.is_blocked_number(restarted.normalize('5551110001'))
+
+
+@pytest.mark.parametrize('screener_class', [CallScreener, SMSScreener])
+def test_single_changes_rebuild_a_worn_filter(screener_args, screener_class):
+    screener = screener_class(**screener_args)
+    capacity = screener.number_filter.bloom.capacity
+    for i in range(capacity + 1):
+        screener.add_blocked_number(f'555{i:07d}')
+    assert screener.number_filter.bloom.capacity > capacity
+
+    capacity = screener.number_filter.bloom.capacity
+    for i in range(capacity // 4 + 1):
+        screener.remove_blocked_number(f'555{i:07d}')
+    assert not screener.number_filter.needs_rebuild()
+    assert screener.is_blocked_number(screener.normalize(f'555{capacity // 4 + 1:07d}'))
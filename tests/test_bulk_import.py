@@ -0,0 +1,16 @@
+import pytest
+
+from bulk_import import iter_feed_numbers
+
+
+def test_csv_numbers_come_from_the_named_column(tmp_path):
+    feed = tmp_path / 'feed.csv'
+    feed.write_text('id,phone\n1,+15550001111\n2,+15550002222\n')
+    assert list(iter_feed_numbers(str(feed), 'phone')) == ['+15550001111', '+15550002222']
+
+
+def test_a_missing_csv_column_is_an_error(tmp_path):
+    feed = tmp_path / 'feed.csv'
+    feed.write_text('id,phone\n1,+15550001111\n')
+    with pytest.raises(ValueError, match="'number'"):
+        list(iter_feed_numbers(str(feed), 'number'))
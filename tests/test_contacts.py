@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+
+import pytest
+
+from call_screener import CallScreener
+from contacts import ContactsIndex, FileContactsProvider
+from sms_screener import SMSScreener
+
+
+class CountingProvider(FileContactsProvider):
+    full_loads = 0
+
+    def load_all(self):
+        self.full_loads += 1
+        return super().load_all()
+
+
+@pytest.mark.parametrize('screener_class', [CallScreener, SMSScreener])
+def test_contacts_load_with_the_settings(screener_args, workdir, screener_class):
+    with open(workdir / 'contacts.json', 'w') as f:
+        json.dump({'1': ['5550001111']}, f)
+    provider = CountingProvider(str(workdir / 'contacts.json'))
+    screener_args['contacts'] = ContactsIndex(provider)
+
+    screener = screener_class(**screener_args)
+    assert screener.contacts.loaded
+    assert provider.full_loads == 1
+
+    assert screener.is_contact('+15550001111')
+    assert not screener.is_contact('+15550002222')
+    assert provider.full_loads == 1
+
+
+class DeniedProvider(FileContactsProvider):
+    """Fails like the platform provider does before the permission is granted"""
+    granted = False
+    threads = []
+
+    def load_all(self):
+        self.threads.append(threading.current_thread().name)
+        if not self.granted:
+            raise PermissionError("READ_CONTACTS has not been granted")
+        return super().load_all()
+
+
+def test_contacts_fail_open_until_loaded(workdir):
+    with open(workdir / 'contacts.json', 'w') as f:
+        json.dump({'1': ['5550001111']}, f)
+    provider = DeniedProvider(str(workdir / 'contacts.json'))
+    index = ContactsIndex(provider)
+    assert not index.load()
+
+    provider.threads = []
+    assert index.is_contact('+15550002222')
+    assert index.contacts_among(['+15550002222']) == {'+15550002222'}
+    # The lookup did not retry the load itself
+    assert 'MainThread' not in provider.threads
+
+    provider.granted = True
+    index.refresh_in_background().join()
+    assert index.loaded
+    assert not index.is_contact('+15550002222')
+    assert index.is_contact('+15550001111')
+
+
+def test_file_provider_sees_edits_within_one_mtime_tick(workdir):
+    path = workdir / 'contacts.json'
+    with open(path, 'w') as f:
+        json.dump({'1': ['5550001111']}, f)
+    stat = os.stat(path)
+    index = ContactsIndex(FileContactsProvider(str(path)))
+    index.load()
+
+    with open(path, 'w') as f:
+        json.dump({'1': ['5550009999']}, f)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    index.refresh()
+    assert index.is_contact('+15550009999')
+    assert not index.is_contact('+15550001111')
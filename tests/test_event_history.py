@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+
+from event_history import EventHistory
+
+
+def test_events_recorded_before_load_follow_stored_ones(workdir):
+    history = EventHistory('history')
+    for i in range(3):
+        history.record('call', f'+1555000000{i}', 'blocked_number')
+    history.flush()
+
+    restarted = EventHistory('history')
+    event = restarted.record('sms', '+15550000009', 'spam_financial_scams')
+    assert not restarted.loaded
+    assert event['seq'] is None
+
+    restarted.load()
+    assert event['seq'] == 3
+    events, total = restarted.recent()
+    assert total == 4
+    assert events[0]['number'] == '+15550000009'
+
+    restarted.flush()
+    assert EventHistory('history').for_number('+15550000009')[1] == 1
+
+
+def test_record_does_not_wait_for_the_scan(workdir):
+    history = EventHistory('history')
+    scanning = threading.Event()
+    finish = threading.Event()
+
+    def scan():
+        # Stand in for a slow scan by holding the lock load() runs under
+        with history._lock:
+            scanning.set()
+            finish.wait(5)
+        history.load()
+
+    loader = threading.Thread(target=scan)
+    loader.start()
+    scanning.wait(5)
+    recorder = threading.Thread(target=history.record, args=('call', '+15550000001', 'blocked_number'))
+    recorder.start()
+    recorder.join(1)
+    recorded = not recorder.is_alive()
+    finish.set()
+    loader.join()
+    assert recorded
+    assert history.counts_by_reason() == {'blocked_number': 1}
+
+
+def _history_with_segments(count=9):
+    history = EventHistory('history', segment_size=3, flush_every=1)
+    for i in range(count):
+        history.record('call', f'+1555000000{i % 2}', 'blocked_number')
+    history.flush()
+    return sorted(os.listdir('history'))
+
+
+def _rewrite_line(path, index, text):
+    with open(path, 'rb') as f:
+        lines = f.readlines()
+    lines[index] = text
+    with open(path, 'wb') as f:
+        f.writelines(lines)
+
+
+def test_history_with_an_unreadable_segment(workdir):
+    segments = _history_with_segments()
+    _rewrite_line(os.path.join('history', segments[1]), 0, b'{not json\n')
+
+    history = EventHistory('history', segment_size=3)
+    events, total = history.recent(limit=10)
+    assert total == 6
+    assert [event['seq'] for event in events] == [8, 7, 6, 2, 1, 0]
+    assert [event['seq'] for event in history.for_number('+15550000001')[0]] == [7, 1]
+
+
+def test_history_with_a_misnumbered_segment(workdir):
+    segments = _history_with_segments()
+    path = os.path.join('history', segments[1])
+    with open(path, 'rb') as f:
+        bad = json.loads(f.readlines()[2])
+    bad['seq'] = 99
+    _rewrite_line(path, 2, json.dumps(bad).encode('utf-8') + b'\n')
+
+    history = EventHistory('history', segment_size=3)
+    # Events read before the bad record are not indexed either
+    assert [event['seq'] for event in history.for_number('+15550000000')[0]] == [8, 6, 2, 0]
+    assert history.recent(limit=10)[1] == 6
+    history.record('sms', '+15550000009', 'spam_financial_scams')
+    assert history.recent(limit=1)[0][0]['seq'] == 9
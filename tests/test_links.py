@@ -0,0 +1,24 @@
+from domain_reputation import ALLOW, DENY
+from sms_screener import SMSScreener
+from text_normalizer import normalize_message
+
+# "paypal" spelled with Cyrillic а, р and у
+LOOKALIKE = 'раураl.com'
+
+
+def test_urls_keep_lookalike_letters():
+    message = normalize_message(f'Verify at https://{LOOKALIKE}/login or {LOOKALIKE} today')
+    assert message.urls == [f'https://{LOOKALIKE}/login', LOOKALIKE]
+    # The folded text still sees through the look-alikes for the content checks
+    assert 'paypal.com' in message.text
+
+
+def test_lookalike_host_is_not_the_real_domain(screener_args):
+    screener = SMSScreener(**screener_args)
+    screener.add_link_rule('paypal.com', ALLOW)
+    assert screener.check_links(f'Verify at https://{LOOKALIKE}/login') is None
+
+    screener.add_link_rule('xn--l-7sba6dbr.com', DENY)
+    link = screener.check_links(f'Verify at https://{LOOKALIKE}/login')
+    assert link['verdict'] == DENY
+    assert link['host'] == 'xn--l-7sba6dbr.com'
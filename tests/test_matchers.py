@@ -0,0 +1,87 @@
+from call_screener import CallScreener
+from matchers import AhoCorasick, DigitTrie, RuleMatcher
+from sms_screener import SMSScreener
+
+
+def test_digit_trie_yields_every_stored_prefix_shortest_first():
+    trie = DigitTrie()
+    trie.add('+1555', 'area')
+    trie.add('+1', 'country')
+    trie.add('+1555000', 'exchange')
+    trie.add('+1555', 'area again')
+
+    assert list(trie.iter_prefixes('+15550001111')) == ['country', 'area', 'area again', 'exchange']
+    assert list(trie.iter_prefixes('+4420')) == []
+    assert len(trie) == 3
+
+
+def test_automaton_finds_overlapping_and_nested_patterns():
+    automaton = AhoCorasick()
+    for pattern in ('he', 'she', 'his', 'hers'):
+        automaton.add(pattern, pattern.upper())
+
+    matches = [(end, pattern) for end, pattern, _ in automaton.iter_matches('ushers')]
+    assert matches == [(3, 'she'), (3, 'he'), (5, 'hers')]
+    assert automaton.find_all('ushers') == ['SHE', 'HE', 'HERS']
+
+
+def test_first_listed_rule_wins_whichever_structure_matches():
+    matcher = RuleMatcher([
+        {'type': 'pattern', 'value': '0001'},
+        {'type': 'prefix', 'value': '+1555'},
+        {'type': 'prefix', 'value': '+1'},
+    ])
+    assert matcher.match('+15550001111') == {'type': 'pattern', 'value': '0001'}
+    assert matcher.match('+15559998888') == {'type': 'prefix', 'value': '+1555'}
+    assert matcher.match('+12125550000') == {'type': 'prefix', 'value': '+1'}
+    assert matcher.match('+442071234567') is None
+
+
+def test_an_empty_pattern_matches_every_number():
+    matcher = RuleMatcher([{'type': 'prefix', 'value': '+44'}, {'type': 'pattern', 'value': ''}])
+    assert matcher.match('+15550001111') == {'type': 'pattern', 'value': ''}
+    assert matcher.match('+442071234567') == {'type': 'prefix', 'value': '+44'}
+
+
+def test_call_rules_match_however_the_values_were_typed(screener_args):
+    calls = CallScreener(**screener_args)
+    calls.is_active = True
+    calls.add_rule('prefix', '555')
+    calls.add_rule('pattern', '999-88')
+
+    assert calls.check_call('(555) 000-1111') == (True, 'custom_rule')
+    assert calls.match_rule('+1 212 999 8800') == {'type': 'pattern', 'value': '999-88'}
+    assert calls.check_call('+1 212 000 1111') == (False, None)
+
+    calls.remove_rule('prefix', '555')
+    assert calls.check_call('(555) 000-1111') == (False, None)
+
+
+def test_removed_patterns_stop_matching_and_dead_nodes_are_reclaimed():
+    automaton = AhoCorasick()
+    for pattern in ('free', 'freedom', 'prize', 'winner'):
+        automaton.add(pattern, True)
+    assert automaton.remove('free')
+    assert not automaton.remove('free')
+    assert automaton.find_all('freedom prize') == [True, True]
+    assert [pattern for _, pattern, _ in automaton.iter_matches('free stuff')] == []
+
+    nodes = len(automaton._goto)
+    automaton.remove('freedom')
+    automaton.remove('winner')
+    assert len(automaton._goto) < nodes
+    assert [pattern for _, pattern, _ in automaton.iter_matches('a prize for the winner')] == ['prize']
+
+
+def test_keyword_filters_match_folded_text_and_allow_keywords_win(screener_args):
+    sms = SMSScreener(**screener_args)
+    sms.add_keyword_filter('Lottery')
+    sms.add_keyword_filter('order shipped', is_spam=False)
+
+    assert sms.is_spam_content('You won the LOTTERY') == (True, 'custom_keyword')
+    assert sms.is_spam_content('Lottery ticket order shipped') == (False, None)
+
+    sms.add_keyword_filter('lottery', is_spam=False)
+    assert sms.is_spam_content('You won the lottery') == (False, None)
+    sms.remove_keyword_filter('LOTTERY')
+    assert sms.keyword_filters == [{'keyword': 'order shipped', 'is_spam': False}]
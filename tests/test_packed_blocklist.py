@@ -0,0 +1,69 @@
+import pytest
+
+from call_screener import CallScreener
+from packed_blocklist import PackedBlocklist, decode_number, encode_number, write_packed_blocklist
+
+
+@pytest.fixture
+def packed(tmp_path):
+    """Every tenth number of a range, with a small stride so lookups cross many fences"""
+    path = str(tmp_path / 'feed.cspb')
+    numbers = [f'+1555{i:07d}' for i in range(0, 10000, 10)]
+    write_packed_blocklist(numbers, path, normalize=str, fence_stride=16)
+    blocklist = PackedBlocklist(path)
+    yield blocklist
+    blocklist.close()
+
+
+def test_encoding_keeps_short_codes_and_leading_zeros_apart():
+    for number in ('+12345', '12345', '012345', '+447700900123'):
+        assert decode_number(encode_number(number)) == number
+    assert encode_number('+12345') != encode_number('12345')
+    assert encode_number('1-800-FLOWERS') is None
+    assert encode_number('+' + '9' * 19) is None
+
+
+def test_lookups_find_every_entry_and_nothing_between(packed):
+    assert len(packed) == 1000
+    for i in range(10000):
+        assert (f'+1555{i:07d}' in packed) == (i % 10 == 0)
+
+
+def test_lookups_outside_the_range_miss(packed):
+    # Before the first entry, after the last, between two and not numeric at all
+    assert '+1554999999' not in packed
+    assert '+15560000000' not in packed
+    assert '+15550009991' not in packed
+    assert 'unknown' not in packed
+
+
+def test_entries_come_back_sorted_and_deduplicated(tmp_path):
+    path = str(tmp_path / 'feed.cspb')
+    assert write_packed_blocklist(['+15550000002', '+15550000001', '+15550000002', 'n/a'],
+                                  path, normalize=str) == 2
+    blocklist = PackedBlocklist(path)
+    try:
+        assert list(blocklist) == ['+15550000001', '+15550000002']
+    finally:
+        blocklist.close()
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / 'feed.cspb'
+    path.write_bytes(b'not a blocklist at all')
+    with pytest.raises(ValueError):
+        PackedBlocklist(str(path))
+
+
+def test_screeners_block_numbers_in_an_attached_feed(screener_args, workdir):
+    write_packed_blocklist(['+15550001111'], str(workdir / 'feed.cspb'))
+    calls = CallScreener(**screener_args)
+    calls.is_active = True
+    assert calls.attach_blocklist(str(workdir / 'feed.cspb'))
+    assert calls.check_call('555 000 1111') == (True, 'blocked_number')
+
+    restarted = CallScreener(**screener_args)
+    restarted.is_active = True
+    assert restarted.check_call('555 000 1111') == (True, 'blocked_number')
+    assert restarted.detach_blocklist(str(workdir / 'feed.cspb'))
+    assert restarted.check_call('555 000 1111') == (False, None)
@@ -0,0 +1,87 @@
+from call_screener import CallScreener
+from pipeline import Check, CheckPipeline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def timed_check(clock, name, seconds, verdict=None):
+    """A check that takes the given time on the clock and returns verdict"""
+    def run(number):
+        clock.now += seconds
+        return verdict
+    return Check(name, run)
+
+
+def test_checks_run_in_order_until_one_decides():
+    ran = []
+
+    def check(name, verdict):
+        return Check(name, lambda number: ran.append(name) or verdict)
+
+    pipeline = CheckPipeline([
+        check('first', None),
+        [check('second', (True, 'second')), check('third', (True, 'third'))],
+    ])
+    assert pipeline.run('+15550001111') == (True, 'second')
+    assert ran == ['first', 'second']
+    assert [check['runs'] for check in pipeline.snapshot()] == [1, 1, 0]
+
+
+def test_commuting_checks_are_sorted_by_cost_per_decision():
+    clock = FakeClock()
+    pipeline = CheckPipeline([
+        timed_check(clock, 'fixed', 1e-3),
+        [
+            timed_check(clock, 'slow', 1e-3, (True, 'slow')),
+            timed_check(clock, 'never', 1e-6),
+            timed_check(clock, 'cheap', 1e-6, (True, 'cheap')),
+        ],
+        timed_check(clock, 'last', 1e-6),
+    ], sample_every=1, reorder_every=8, clock=clock)
+
+    for _ in range(7):
+        assert pipeline.run('+15550001111') == (True, 'slow')
+    # The eighth run reorders first; checks that never ran rank by their estimate
+    assert pipeline.run('+15550001111') == (True, 'cheap')
+    assert [check.name for check in pipeline.order] == ['fixed', 'never', 'cheap', 'slow', 'last']
+
+    # A check that rarely decides drops behind one that usually does
+    for _ in range(8):
+        assert pipeline.run('+15550001111') == (True, 'cheap')
+    assert [check.name for check in pipeline.order] == ['fixed', 'cheap', 'never', 'slow', 'last']
+
+
+def test_reordering_decays_old_counts():
+    pipeline = CheckPipeline([[Check('a', lambda number: None), Check('b', lambda number: None)]],
+                             sample_every=1000, reorder_every=4)
+    for _ in range(3):
+        pipeline.run('+15550001111')
+    assert [check.runs for check in pipeline.order] == [3, 3]
+    pipeline.run('+15550001111')
+    assert [check.runs for check in pipeline.order] == [2.5, 2.5]
+
+
+def test_an_untimed_check_ranks_by_its_estimate():
+    check = Check('estimate', lambda number: None, cost=4.0)
+    assert check.mean_cost() == 4.0
+    assert check.rank() == 4.0 / 0.5
+
+
+def test_the_whitelist_stays_ahead_of_reordered_checks(screener_args):
+    calls = CallScreener(**screener_args)
+    calls.is_active = True
+    calls.add_to_whitelist('5550001111')
+    calls.add_blocked_number('5550002222')
+    calls.pipeline.reorder_every = 4
+    for i in range(20):
+        calls._evaluate_call(calls.normalize(f'555000{i:04d}'))
+
+    assert calls.pipeline.order[0].name == 'whitelist'
+    assert calls._evaluate_call(calls.normalize('5550001111')) == (False, None)
+    assert calls._evaluate_call(calls.normalize('5550002222')) == (True, 'blocked_number')
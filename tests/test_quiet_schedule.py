@@ -0,0 +1,66 @@
+import time
+
+from quiet_schedule import ALL_DAYS, QuietSchedule
+
+NIGHTS = {'days': list(ALL_DAYS), 'start': 22 * 60, 'end': 7 * 60}
+
+
+def at(date, hour, minute=0, second=0):
+    """Local timestamp of a 'YYYY-MM-DD' date and time of day"""
+    year, month, day = (int(part) for part in date.split('-'))
+    return time.mktime((year, month, day, hour, minute, second, 0, 0, -1))
+
+
+def test_a_nightly_window_covers_midnight_up_to_its_end():
+    schedule = QuietSchedule(True, [NIGHTS])
+    assert not schedule.is_quiet(at('2026-12-23', 21, 59))
+    assert schedule.is_quiet(at('2026-12-23', 22, 0))
+    assert schedule.is_quiet(at('2026-12-24', 0, 0))
+    assert schedule.is_quiet(at('2026-12-24', 6, 59))
+    assert not schedule.is_quiet(at('2026-12-24', 7, 0))
+
+
+def test_a_weekly_window_spills_into_the_next_weekday_only():
+    # Thursday night only; the week wraps from Sunday night into Monday
+    schedule = QuietSchedule(True, [
+        {'days': [3], 'start': 22 * 60, 'end': 7 * 60},
+        {'days': [6], 'start': 23 * 60, 'end': 60},
+    ])
+    assert schedule.is_quiet(at('2026-12-25', 6, 59))
+    assert not schedule.is_quiet(at('2026-12-25', 22, 0))
+    assert not schedule.is_quiet(at('2026-12-24', 6, 59))
+    assert schedule.is_quiet(at('2026-12-28', 0, 30))
+    assert not schedule.is_quiet(at('2026-12-28', 1, 0))
+
+
+def test_a_remembered_answer_ends_when_the_window_starts():
+    schedule = QuietSchedule(True, [NIGHTS])
+    assert not schedule.is_quiet(at('2026-12-23', 21, 59, 30))
+    assert schedule.is_quiet(at('2026-12-23', 22, 0, 0))
+    assert not schedule.is_quiet(at('2026-12-24', 7, 0, 0))
+
+
+def test_a_holiday_window_past_midnight_runs_into_the_next_day():
+    schedule = QuietSchedule(True, holidays={'2026-12-24': [[22 * 60, 7 * 60]]})
+    assert not schedule.is_quiet(at('2026-12-24', 3, 0))
+    assert schedule.is_quiet(at('2026-12-24', 23, 0))
+    assert schedule.is_quiet(at('2026-12-25', 3, 0))
+    assert not schedule.is_quiet(at('2026-12-25', 7, 0))
+
+
+def test_a_holiday_keeps_the_previous_night_and_replaces_its_own():
+    schedule = QuietSchedule(True, [NIGHTS], holidays={'2026-12-25': []})
+    assert schedule.is_quiet(at('2026-12-25', 6, 0))
+    assert not schedule.is_quiet(at('2026-12-25', 23, 0))
+    assert not schedule.is_quiet(at('2026-12-26', 3, 0))
+    assert schedule.is_quiet(at('2026-12-26', 23, 0))
+
+
+def test_a_whole_day_holiday_and_a_disabled_schedule():
+    schedule = QuietSchedule(True, holidays={'2026-12-25': [[0, 1440]]})
+    assert schedule.is_quiet(at('2026-12-25', 0, 0))
+    assert schedule.is_quiet(at('2026-12-25', 23, 59))
+    assert not schedule.is_quiet(at('2026-12-26', 0, 0))
+
+    schedule.enabled = False
+    assert not schedule.is_quiet(at('2026-12-25', 12, 0))
@@ -0,0 +1,86 @@
+from rate_limiter import HOUR_SLOTS, SLOT_SECONDS, SenderRateLimiter
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_limiter(**kwargs):
+    clock = FakeClock()
+    limiter = SenderRateLimiter(clock=clock, **kwargs)
+    limiter._offset = 0  # Slot boundaries fall on multiples of SLOT_SECONDS
+    return limiter, clock
+
+
+def test_messages_leave_the_hourly_window_before_the_daily_one():
+    limiter, clock = make_limiter()
+    for _ in range(3):
+        limiter.record('+15550001111')
+    assert limiter.counts('+15550001111') == (3, 3)
+
+    clock.now += HOUR - SLOT_SECONDS
+    assert limiter.counts('+15550001111') == (3, 3)
+    clock.now += SLOT_SECONDS
+    assert limiter.counts('+15550001111') == (0, 3)
+    clock.now += DAY - HOUR
+    assert limiter.counts('+15550001111') == (0, 0)
+
+
+def test_record_returns_the_counts_before_the_message():
+    limiter, clock = make_limiter()
+    assert limiter.record('+15550001111') == (0, 0)
+    clock.now += 2 * HOUR
+    assert limiter.record('+15550001111') == (0, 1)
+    assert limiter.record('+15550001111') == (1, 2)
+
+
+def test_counts_do_not_keep_an_idle_sender_alive():
+    limiter, clock = make_limiter()
+    limiter.record('+15550001111')
+    clock.now += DAY
+    assert limiter.counts('+15550001111') == (0, 0)
+
+    limiter.record('+15550002222')
+    assert len(limiter) == 1
+    assert limiter.counts('+15550001111') == (0, 0)
+
+
+def test_oldest_senders_are_evicted_past_the_cap():
+    limiter, clock = make_limiter(max_senders=2)
+    for sender in ('+15550001111', '+15550002222', '+15550001111', '+15550003333'):
+        limiter.record(sender)
+    assert limiter.counts('+15550002222') == (0, 0)
+    assert limiter.counts('+15550001111') == (2, 2)
+    assert len(limiter) == 2
+
+
+def test_a_clock_set_back_counts_in_the_latest_slot():
+    limiter, clock = make_limiter()
+    clock.now = 100 * SLOT_SECONDS
+    limiter.record('+15550001111')
+    clock.now -= SLOT_SECONDS
+    limiter.record('+15550001111')
+
+    # The second message belongs with the first, not in the counter of the
+    # slot an hour ahead, which would be cleared as soon as that slot arrives
+    clock.now = (100 + HOUR_SLOTS - 1) * SLOT_SECONDS
+    assert limiter.counts('+15550001111') == (2, 2)
+
+
+def test_counters_survive_a_save_and_load(tmp_path):
+    limiter, clock = make_limiter()
+    limiter.record('+15550001111')
+    limiter.record('+15550001111')
+    limiter.save(str(tmp_path / 'rate_limits.bin'))
+
+    restored, restored_clock = make_limiter()
+    restored_clock.now = clock.now + SLOT_SECONDS
+    assert restored.load(str(tmp_path / 'rate_limits.bin'))
+    assert restored.counts('+15550001111') == (2, 2)
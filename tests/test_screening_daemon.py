@@ -0,0 +1,84 @@
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from call_screener import CallScreener
+from screening_daemon import ScreeningClient, ScreeningServer, load_screeners
+from sms_screener import SMSScreener
+
+DAEMON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'screening_daemon.py')
+
+
+def _file_state(directory):
+    return {name: os.path.getmtime(directory / name) for name in sorted(os.listdir(directory))}
+
+
+@pytest.fixture
+def daemon(workdir, screener_args):
+    """Start the daemon on settings the app wrote to JSON, with --database"""
+    calls = CallScreener(**screener_args)
+    calls.add_blocked_number('5551110001')
+    sms = SMSScreener(**screener_args)
+    sms.add_blocked_number('5552220002')
+
+    process = subprocess.Popen(
+        [sys.executable, DAEMON, '--data-dir', str(workdir), '--socket', 'test.sock',
+         '--workers', '2', '--database', 'numbers.db'],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + 20
+    while not os.path.exists(workdir / 'test.sock'):
+        assert process.poll() is None, process.stdout.read().decode()
+        assert time.monotonic() < deadline, "daemon did not start"
+        time.sleep(0.05)
+    try:
+        yield ScreeningClient(str(workdir / 'test.sock'))
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(10)
+
+
+def test_client_gets_verdicts_from_the_daemon(daemon, workdir):
+    with daemon as client:
+        assert client.health() == {'status': 'ok', 'workers': 2, 'alive': 2}
+        assert client.check_call('+15551110001') == (True, 'blocked_number')
+        assert client.check_call('+15553330003') == (False, None)
+        assert client.check_sms('+15552220002', 'hello') == (True, 'blocked_number')
+        assert client.screen_sms([('+15552220002', 'hi'), ('+15553330003', 'see you at lunch')]) == [
+            (True, 'blocked_number'), (False, None)]
+        assert client.metrics()['screened'] == 5
+    # The lists moved into the database, once, before the workers started
+    assert '5551110001' not in (workdir / 'blocked_numbers.json').read_text()
+
+
+def test_read_only_screeners_leave_the_files_alone(workdir, screener_args):
+    CallScreener(**screener_args).add_blocked_numbers(['5551110001'])
+    SMSScreener(**screener_args).add_blocked_numbers(['5552220002'])
+    # A stale number filter would be rebuilt and saved by a writable load
+    for name in os.listdir(workdir):
+        if name.endswith('.bloom'):
+            os.remove(workdir / name)
+    before = _file_state(workdir)
+
+    calls, sms = load_screeners(read_only=True)
+    assert calls.check_call('+15551110001') == (True, 'blocked_number')
+    assert sms.is_blocked_number('+15552220002')
+    assert _file_state(workdir) == before
+
+
+class BrokenPool:
+    async def run(self, kind, *args):
+        raise OSError("worker pipe closed")
+
+
+def test_an_unexpected_handler_error_is_a_server_error():
+    server = ScreeningServer(BrokenPool())
+    status, payload = asyncio.run(server._dispatch('POST', '/call', b'{"number": "5551110001"}'))
+    assert status == 500
+    assert payload == {'error': 'internal error'}
+    assert server.metrics.errors['/call'] == 1
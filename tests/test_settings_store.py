@@ -0,0 +1,74 @@
+import json
+
+from call_screener import CallScreener
+from settings_store import JournaledStore
+
+
+def test_journal_replays_every_operation_over_the_snapshot(tmp_path):
+    store = JournaledStore(str(tmp_path / 'settings.json'))
+    store.load()
+    store.compact({'rules': ['a', 'b'], 'enabled': False})
+    store.append('set', 'enabled', True)
+    store.append('add', 'numbers', '+15550001111')
+    store.append('add', 'numbers', '+15550002222')
+    store.append('discard', 'numbers', '+15550001111')
+    store.append('append', 'rules', 'c')
+    store.append('remove', 'rules', 'a')
+
+    reloaded = JournaledStore(str(tmp_path / 'settings.json'))
+    assert reloaded.load() == {'rules': ['b', 'c'], 'enabled': True, 'numbers': {'+15550002222'}}
+    assert reloaded.sequence == 6
+
+
+def test_a_torn_record_is_dropped_and_cut_off(tmp_path):
+    store = JournaledStore(str(tmp_path / 'settings.json'))
+    store.load()
+    store.append('set', 'enabled', True)
+    with open(store.journal_path, 'a') as f:
+        f.write('{"n": 2, "op": "set", "key": "ena')
+
+    reader = JournaledStore(str(tmp_path / 'settings.json'), read_only=True)
+    assert reader.load() == {'enabled': True}
+    assert (tmp_path / 'settings.json.journal').read_text().endswith('"ena')
+
+    writer = JournaledStore(str(tmp_path / 'settings.json'))
+    assert writer.load() == {'enabled': True}
+    writer.append('set', 'mode', 'strict')
+    assert JournaledStore(str(tmp_path / 'settings.json')).load() == {'enabled': True, 'mode': 'strict'}
+
+
+def test_a_journal_outliving_its_compaction_is_not_replayed_twice(tmp_path):
+    store = JournaledStore(str(tmp_path / 'settings.json'))
+    store.load()
+    store.append('append', 'rules', 'a')
+    journal = (tmp_path / 'settings.json.journal').read_text()
+    store.compact({'rules': ['a']})
+    # A crash between the rename and the truncation leaves the old records
+    (tmp_path / 'settings.json.journal').write_text(journal)
+
+    reloaded = JournaledStore(str(tmp_path / 'settings.json'))
+    assert reloaded.load() == {'rules': ['a']}
+    reloaded.append('append', 'rules', 'b')
+    assert JournaledStore(str(tmp_path / 'settings.json')).load() == {'rules': ['a', 'b']}
+
+
+def test_screener_changes_survive_a_restart_and_compact(workdir, screener_args):
+    calls = CallScreener(**screener_args)
+    calls.store.compact_every = 4
+    calls.add_blocked_number('5550001111')  # Journals the list version, then the number
+    calls.add_rule('prefix', '+1900')
+    assert (workdir / 'blocked_numbers.json.journal').read_text().count('\n') == 3
+
+    restarted = CallScreener(**screener_args)
+    assert restarted.is_blocked_number('+15550001111')
+    assert restarted.rules == [{'type': 'prefix', 'value': '+1900'}]
+
+    # The fourth record folds the journal into a fresh snapshot
+    calls.toggle_block_non_contacts()
+    assert (workdir / 'blocked_numbers.json.journal').read_text() == ''
+    assert json.loads((workdir / 'blocked_numbers.json').read_text())['block_non_contacts'] is True
+
+    calls.remove_blocked_number('5550001111')
+    restarted = CallScreener(**screener_args)
+    assert not restarted.is_blocked_number('+15550001111')
+    assert restarted.block_non_contacts
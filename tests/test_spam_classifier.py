@@ -0,0 +1,80 @@
+import pytest
+
+from sms_screener import SMSScreener
+from spam_classifier import SpamClassifier
+
+SPAM = [
+    'parcel held at depot pay customs fee today',
+    'your parcel is held pay the customs fee',
+    'customs fee unpaid parcel held at depot',
+    'depot holding parcel customs fee due',
+    'parcel on hold pay fee to release from depot',
+]
+HAM = [
+    'running late see you at dinner',
+    'dinner at mine tonight bring the kids',
+    'see you at the game later',
+    'can you pick up milk on the way home',
+    'the kids loved dinner see you soon',
+]
+
+
+@pytest.fixture
+def trained():
+    classifier = SpamClassifier(bits=12)
+    for text in SPAM:
+        classifier.learn(text, True)
+    for text in HAM:
+        classifier.learn(text, False)
+    return classifier
+
+
+def test_no_score_until_both_classes_have_enough_examples():
+    classifier = SpamClassifier(bits=12, min_examples=2)
+    classifier.learn(SPAM[0], True)
+    classifier.learn(SPAM[1], True)
+    classifier.learn(HAM[0], False)
+    assert classifier.score('parcel held pay fee') is None
+    classifier.learn(HAM[1], False)
+    assert classifier.score('parcel held pay fee') is not None
+
+
+def test_scores_follow_what_was_learned(trained):
+    assert trained.score('pay the fee to get your parcel from the depot') > 0.9
+    assert trained.score('see you at dinner with the kids') < 0.1
+
+    message = 'pick up the parcel at the depot'
+    before = trained.score(message)
+    for _ in range(5):
+        trained.learn(message, False)
+    assert trained.score(message) < before
+
+
+def test_a_saved_model_scores_the_same_after_loading(trained, tmp_path):
+    path = str(tmp_path / 'classifier.bin')
+    trained.save(path)
+    restored = SpamClassifier()
+    assert restored.load(path)
+    assert restored.bits == 12
+    for text in ('customs fee for your parcel', 'dinner later'):
+        assert restored.score(text) == trained.score(text)
+
+    (tmp_path / 'other.bin').write_bytes(b'\0' * 64)
+    with pytest.raises(ValueError):
+        restored.load(str(tmp_path / 'other.bin'))
+
+
+def test_reported_messages_train_the_screener(screener_args):
+    sms = SMSScreener(**screener_args)
+    sms.is_active = True
+    sms.toggle_classifier(True)
+    message = 'parcel held at the depot pay the customs fee'
+    assert sms.should_block_sms('+15550001111', message) == (False, None)
+
+    for text in SPAM:
+        sms.report_sms(text, True)
+    for text in HAM:
+        sms.report_sms(text, False)
+    # The verdict given before training is not served from the cache
+    assert sms.should_block_sms('+15550001111', message) == (True, 'spam_classifier')
+    assert sms.should_block_sms('+15550002222', 'see you at dinner') == (False, None)
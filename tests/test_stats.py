@@ -0,0 +1,35 @@
+import pytest
+
+from call_screener import CallScreener
+from sms_screener import SMSScreener
+
+
+def test_link_check_is_timed_once_per_message(screener_args):
+    sms = SMSScreener(**screener_args)
+    sms.is_active = True
+    sms.add_link_rule('mybank.com', 'allow')
+    sms.enable_stats()
+    # A suspicious-looking link makes the content check look the link up again
+    sms.should_block_sms('+15550001111', 'your statement is ready at http://mybank.com/statements')
+
+    stages = sms.get_stats()['stages']
+    assert stages['links']['count'] == 1
+    assert stages['content']['count'] == 1
+
+
+@pytest.mark.parametrize('screener_class, decide', [
+    (CallScreener, lambda screener: screener.check_call('+15550001111')),
+    (SMSScreener, lambda screener: screener.should_block_sms('+15550001111', 'hi')),
+])
+def test_stats_can_be_turned_off_again(screener_args, screener_class, decide):
+    screener = screener_class(**screener_args)
+    screener.is_active = True
+    screener.enable_stats()
+    decide(screener)
+    screener.disable_stats()
+    decide(screener)
+
+    stats = screener.get_stats()
+    assert stats['stages']['whitelist']['count'] == 1
+    assert set(stats['caches']) == {'verdicts', 'number_filter', 'normalizer'}
+    assert 'pipeline' in stats
@@ -0,0 +1,53 @@
+from matchers import CategoryMatcher
+from text_normalizer import fold_text, normalize_message
+
+
+def test_folding_undoes_width_accents_look_alikes_and_invisible_characters():
+    assert fold_text('ＦＲＥＥ') == 'free'
+    assert fold_text('Café Crème') == 'cafe creme'
+    assert fold_text('Рaураl') == 'paypal'
+    assert fold_text('fr​ee') == 'free'
+    assert fold_text('Plain ASCII') == 'plain ascii'
+
+
+def test_words_undo_letters_written_as_digits_and_punctuation():
+    message = normalize_message("Claim your fr33 pr.ize, don't c@ll")
+    assert message.words == ['claim', 'your', 'free', 'prize', 'dont', 'call']
+    assert {'fr33', 'free', 'pr.ize', 'prize', 'pr', 'ize'} <= message.tokens
+    assert message.has_phrase('free prize')
+    assert not message.has_phrase('your prize')
+
+
+def test_spaced_out_letters_join_into_a_token():
+    message = normalize_message('f r e e gift, a b')
+    assert 'free' in message.tokens
+    assert 'ab' not in message.tokens
+
+
+def test_urls_keep_their_real_host_and_drop_trailing_punctuation():
+    message = normalize_message('Visit www.example.com/x, or https://bit.ly/abc).')
+    assert message.urls == ['www.example.com/x', 'https://bit.ly/abc']
+
+    # Folding would turn the Cyrillic host into paypal.com
+    message = normalize_message('Log in at раураl.com now')
+    assert message.urls == ['раураl.com']
+    assert 'paypal' in message.tokens
+
+
+def test_a_normalized_message_is_passed_through():
+    message = normalize_message('hello')
+    assert normalize_message(message) is message
+
+
+def test_categories_match_on_normalized_words_in_priority_order():
+    matcher = CategoryMatcher({
+        'prizes': [r'\b(prize|gift card|winner)\b'],
+        'urgent': [r'\b(urgent|act now)\b', r'\d{3} ?minutes'],
+    })
+    assert matcher.first('You are a W1NNER') == 'prizes'
+    assert matcher.first('g.i.f.t card inside') == 'prizes'
+    assert matcher.first('Your g1ft card awaits') == 'prizes'
+    assert matcher.first('a gift for the card') is None
+    assert matcher.first('act  NOW, 120 minutes left') == 'urgent'
+    assert matcher.all('URGENT: claim your prize') == ['prizes', 'urgent']
+    assert matcher.first('URGENT: claim your prize', exclude=('prizes',)) == 'urgent'
@@ -0,0 +1,117 @@
+import re
+import unicodedata
+
+# Characters that render as nothing and are used to split words invisibly
+_ZERO_WIDTH = ('\u00ad\u034f\u061c\u115f\u1160\u17b4\u17b5\u180e\u200b\u200c\u200d'
+               '\u200e\u200f\u2060\u2061\u2062\u2063\u2064\ufeff')
+
+# Non-Latin letters that look like Latin ones, after case folding
+_CONFUSABLES = {
+    # Cyrillic
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'і': 'i', 'ї': 'i', 'ј': 'j', 'к': 'k',
+    'м': 'm', 'н': 'h', 'о': 'o', 'п': 'n', 'р': 'p', 'с': 'c', 'т': 't', 'у': 'y', 'х': 'x',
+    'ѕ': 's', 'ь': 'b', 'ԁ': 'd', 'ԛ': 'q', 'ԝ': 'w', 'һ': 'h', 'ӏ': 'l',
+    # Greek
+    'α': 'a', 'β': 'b', 'ε': 'e', 'η': 'n', 'ι': 'i', 'κ': 'k', 'ν': 'v', 'ο': 'o', 'ρ': 'p',
+    'τ': 't', 'υ': 'u', 'χ': 'x', 'ω': 'w',
+    # Others
+    'ı': 'i', 'օ': 'o', 'ߋ': 'o',
+}
+_FOLD = str.maketrans({**_CONFUSABLES, **dict.fromkeys(_ZERO_WIDTH)})
+_INVISIBLE = str.maketrans(dict.fromkeys(_ZERO_WIDTH))
+
+# Digits and symbols standing in for letters inside words ("fr33", "c@rd")
+_LEET = str.maketrans({'0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't',
+                       '@': 'a', '$': 's', '.': None, "'": None, '*': None, '_': None, '-': None})
+
+# A word, including punctuation used to break it up ("fr.ee", "f-r-e-e")
+_TOKEN = re.compile(r"\w+(?:[.'*@$-]+\w+)*")
+_SEPARATORS = re.compile(r"[.'*_@$-]+")
+
+_TLDS = ('com|net|org|info|biz|io|co|ly|me|us|uk|ca|de|ru|cn|in|xyz|top|app|site|online|club|shop|'
+         'link|live|store|click|win|vip|icu|tk|ml|ga|cf|gq|cc|ws|to|gl|su|pw')
+_URL = re.compile(
+    r'(?:https?://|www\.)[^\s<>"]+'
+    r'|\b(?:[^\W_](?:[\w-]*[^\W_])?\.)+(?:' + _TLDS + r')\b(?:/[^\s<>"]*)?'
+)
+_URL_TRAILING = '.,;:!?)]}\'"'
+
+
+def fold_text(text):
+    """Lower-case text with compatibility forms, accents, look-alike letters
+    and invisible characters folded away, for matching rather than display"""
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return text.casefold().translate(_FOLD)
+
+
+def _link_text(text):
+    """Lower-case text with invisible characters removed but look-alike
+    letters kept, so a link's host is the name it really resolves to"""
+    if text.isascii():
+        return text.lower()
+    return unicodedata.normalize('NFC', text).lower().translate(_INVISIBLE)
+
+
+class NormalizedMessage:
+    """A message folded, tokenized and scanned for URLs once for every check
+
+    text is the folded message, for substring and regex checks. words are
+    its words in order, with punctuation and digits used as letters inside
+    a word undone ("fr.ee" and "fr33" become "free"). tokens is the set of
+    the words as written, their undone forms, their parts and runs of
+    spaced-out letters joined ("f r e e"), for word-list lookups. urls are
+    the links in the message, taken from _link_text() rather than the folded
+    text so a Cyrillic "раураl.com" is not mistaken for paypal.com.
+    """
+
+    __slots__ = ('original', 'text', 'words', 'tokens', 'phrase_text', 'urls')
+
+    def __init__(self, message):
+        self.original = message
+        self.text = text = fold_text(message)
+
+        words = []
+        tokens = set()
+        for token in _TOKEN.findall(text):
+            tokens.add(token)
+            if token.isalpha():
+                words.append(token)
+                continue
+            parts = _SEPARATORS.split(token)
+            if len(parts) > 1:
+                tokens.update(parts)
+            if any(char.isalpha() for char in token):
+                token = token.translate(_LEET)
+                tokens.add(token)
+            words.append(token)
+
+        # Letters spaced out one by one ("f r e e")
+        run = []
+        for word in words + ['']:
+            if len(word) == 1 and word.isalpha():
+                run.append(word)
+                continue
+            if len(run) >= 3:
+                tokens.add(''.join(run))
+            run = []
+
+        self.words = words
+        self.tokens = tokens
+        # Words between single spaces, so phrases are found with one substring test
+        self.phrase_text = f" {' '.join(words)} "
+        links = text if message.isascii() else _link_text(message)
+        self.urls = [url.rstrip(_URL_TRAILING) for url in _URL.findall(links)]
+
+    def has_phrase(self, phrase):
+        """Check for consecutive words, given as one space-separated string"""
+        return f' {phrase} ' in self.phrase_text
+
+
+def normalize_message(message):
+    """Return a NormalizedMessage, passing one through unchanged"""
+    if isinstance(message, NormalizedMessage):
+        return message
+    return NormalizedMessage(message)
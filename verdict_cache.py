@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from hashlib import blake2b
+
+MISSING = object()
+
+
+def content_key(message_content):
+    """Compact digest of a message body for use as a cache key"""
+    return blake2b(message_content.encode('utf-8'), digest_size=16).digest()
+
+
+class VerdictCache:
+    """Bounded LRU of screening verdicts tied to a settings version
+
+    Every lookup passes the current version; when it differs from the one
+    the entries were computed under, the whole cache is dropped. Mutations
+    therefore only need to bump a counter, never to find affected entries.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        """Return the cached verdict, or MISSING"""
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+        verdict = self._entries.get(key, MISSING)
+        if verdict is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return verdict
+
+    def put(self, key, verdict, version):
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+        self._entries[key] = verdict
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.version = None
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0